@@ -60,20 +60,28 @@ def calc_p(r, delta_t, u, d):
 
 # To improve convergence gamma = e^((2/M)*log(K/S_0)) is a good choice
 
-def generate_tree(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = 1): 
+def backward_induction(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = 1, keep_tree = False):
     """
-    Calculate the Binomial Tree for American or European option 
+    Vectorized backward induction over the Binomial Tree for American or European option
+
+    Each time level is computed as one array operation on a single rolling value vector,
+    so only O(M) memory is used unless the full tree is requested.
+
     : param r            : Risk-free interest rate 
     : param sigma        : Volatility 
     : param S_0          : Spot price of the underlying stock 
+    : param K            : Strike price
     : param T            : Expiration time 
-    : K                  : Strike price
-    : param call_or_pit  : Put ('P') or Call ('C') 
+    : param call_or_put  : Put ('P') or Call ('C') 
     : param optionType   : Is it an European ('E') or American ('A') option? 
     : param M            : Number of steps in the binomial tree 
     : param gamma_par    : Gamma parameter in binomial option pricing (default value: 1) 
-    : return             : Tree
+    : param keep_tree    : Boolean indicating whether every level of the tree is kept. If False only levels 0, 1 and 2 are kept (default value: False)
+    : return             : V, S. Lists of numpy arrays where V[i][j] and S[i][j] are the value and stock price at node j of level i 
     """
+    if optionType not in ('E', 'A'):
+        raise ValueError ("optionType has to be European ('E') or American ('A')")
+
     # Compute delta_t 
     delta_t = T / M 
     
@@ -81,43 +89,131 @@ def generate_tree(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = 1
     u = calc_u(beta, gamma_par = gamma_par ) 
     d = calc_d (beta, gamma_par = gamma_par) 
     p = calc_p (r, delta_t, u, d)
+    disc = np.exp(-r*delta_t)
 
+    # Levels stored when keep_tree is False (enough for the greeks in main.py)
+    kept_levels = M if keep_tree else min(M, 2)
+    V_levels = [None]*(kept_levels + 1)
+    S_levels = [None]*(kept_levels + 1)
 
-    S= [[0 for _ in range (i+1)] for i in range (M+1)] 
-    V = [[0 for _ in range (i+1)] for i in range (M+1)]
-    V_cont = [[0 for _ in range(i+1)] for i in range(M+1)]
-    
-    
-    # Boundary values
+    j = np.arange(M+1)
+    S_i = S_0 * u**j * d**(M-j)
+    V_i = payOff(S_i, K, call_or_put)
+    if M <= kept_levels:
+        V_levels[M], S_levels[M] = V_i, S_i
 
-    S[0][0] = S_0
-    for j in range (M+1): 
-        S[M][j] = S[0][0] * (u**j) * (d** (M-j)) 
-        
-    
-    for j in range (M+1):
-        
-        V[M][j]   = payOff(S[M][j], K, call_or_put)
+    for i in reversed(range(M)):
+        V_i = disc*(p*V_i[1:] + (1-p)*V_i[:-1])
+        if optionType == 'A' or i <= kept_levels:
+            S_i = S_0 * u**j[:i+1] * d**(i-j[:i+1])
+        if optionType == 'A':
+            np.maximum(V_i, payOff(S_i, K, call_or_put), out = V_i)
+        if i <= kept_levels:
+            V_levels[i], S_levels[i] = V_i, S_i
 
-    if optionType == 'E':
-        for i in reversed(range (M)):
-            for j in range(i+1):
-                S[i][j] = S[0][0] * (u**j) * (d** (i-j))
-                V[i][j] = np.exp(-r*delta_t)*(p*V[i+1][j+1] + (1-p)*V[i+1][j])
+    return V_levels, S_levels
 
-    
-    elif optionType == 'A':
-        for i in reversed(range(M)):
-            for j in range(i+1):
-                S[i][j] = S[0][0] * (u**j) * (d** (i-j))
-                
-                V_cont[i][j] = np.exp(-r*delta_t) *(p*(V[i+1][j+1]) + (1-p)*V[i+1][j])
-                V[i][j]      = max(payOff (S[i][j],K, call_or_put), V_cont[i][j])       
-
-    else:
-        raise ValueError ("optionType has to be European ('E') or American ('A')")
+def generate_tree(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = 1): 
+    """
+    Calculate the Binomial Tree for American or European option 
+    : param r            : Risk-free interest rate 
+    : param sigma        : Volatility 
+    : param S_0          : Spot price of the underlying stock 
+    : param T            : Expiration time 
+    : K                  : Strike price
+    : param call_or_pit  : Put ('P') or Call ('C') 
+    : param optionType   : Is it an European ('E') or American ('A') option? 
+    : param M            : Number of steps in the binomial tree 
+    : param gamma_par    : Gamma parameter in binomial option pricing (default value: 1) 
+    : return             : Tree
+    """
+    V, S = backward_induction(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = gamma_par, keep_tree = True)
     return V, S 
 
 def valueBinOp(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = 1): 
-    V, S = generate_tree(r, sigma, S_0, K, T,  call_or_put, optionType, M, gamma_par = gamma_par)
+    V, S = backward_induction(r, sigma, S_0, K, T,  call_or_put, optionType, M, gamma_par = gamma_par)
     return V[0][0]
+
+def _batch_payOff(S, K, is_call):
+    """
+    Calculate the payoff of a batch of options at some moment
+
+    : param S            : 2-D numpy array (contract x node) of stock prices 
+    : param K            : Column array of strike prices 
+    : param is_call      : Column boolean array, True for calls and False for puts 
+    : return             : 2-D numpy array of payoffs 
+    """
+    return np.maximum(np.where(is_call, S-K, K-S), 0)
+
+def valueBinOpBatch(r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = 1):
+    """
+    Value a whole book of American or European options with the binomial method 
+
+    All parameters may be arrays (broadcast against each other). Contracts are grouped by 
+    number of steps and each group is rolled back on a 2-D (contract x node) array, so the 
+    Python overhead is paid once per time level instead of once per option. 
+
+    : param r            : Risk-free interest rates 
+    : param sigma        : Volatilities 
+    : param S_0          : Spot prices of the underlying stocks 
+    : param K            : Strike prices
+    : param T            : Expiration times 
+    : param call_or_put  : Put ('P') or Call ('C') for each contract 
+    : param optionType   : European ('E') or American ('A') for each contract 
+    : param M            : Number of steps in the binomial tree of each contract 
+    : param gamma_par    : Gamma parameter in binomial option pricing (default value: 1) 
+    : return             : Dictionary of numpy arrays with keys 'value', 'delta', 'gamma' and 'theta'. Greeks are nan for contracts with M < 2 
+    """
+    r, sigma, S_0, K, T, call_or_put, optionType, M, gamma_par = np.broadcast_arrays(
+        r, sigma, S_0, K, T, np.asarray(call_or_put), np.asarray(optionType), M, gamma_par)
+
+    if not np.all(np.isin(call_or_put, ('C', 'P'))):
+        raise ValueError ("Please choose a valid value for put_or_call: Put ('P') or Call ('C')")
+    if not np.all(np.isin(optionType, ('E', 'A'))):
+        raise ValueError ("optionType has to be European ('E') or American ('A')")
+
+    shape = r.shape
+    result = {key: np.full(shape, np.nan) for key in ('value', 'delta', 'gamma', 'theta')}
+
+    for steps in np.unique(M):
+        idx = (M == steps)
+        steps = int(steps)
+
+        # Column vectors so every contract parameter broadcasts against the nodes
+        r_g, sigma_g, S_g, K_g, T_g, gamma_g = (x[idx].astype(float)[:, None] for x in (r, sigma, S_0, K, T, gamma_par))
+        is_call     = (call_or_put[idx] == 'C')[:, None]
+        is_american = (optionType[idx] == 'A')[:, None]
+
+        delta_t = T_g / steps 
+        beta = calc_beta(r_g, sigma_g, delta_t, gamma_par = gamma_g)
+        u = calc_u(beta, gamma_par = gamma_g) 
+        d = calc_d(beta, gamma_par = gamma_g) 
+        p = calc_p(r_g, delta_t, u, d)
+        disc = np.exp(-r_g*delta_t)
+
+        j = np.arange(steps+1)
+        S_i = S_g * u**j * d**(steps-j)
+        V_i = _batch_payOff(S_i, K_g, is_call)
+        levels = {steps: (V_i, S_i)}
+
+        for i in reversed(range(steps)):
+            V_i = disc*(p*V_i[:, 1:] + (1-p)*V_i[:, :-1])
+            # S_i[j] = S_0 u^j d^(i-j) is the node below-right of S_{i+1}[j]
+            S_i = S_i[:, :-1] / d
+            if is_american.any():
+                V_i = np.where(is_american, np.maximum(V_i, _batch_payOff(S_i, K_g, is_call)), V_i)
+            if i <= 2:
+                levels[i] = (V_i, S_i)
+
+        result['value'][idx] = levels[0][0][:, 0]
+
+        if steps >= 2:
+            V_1, S_1 = levels[1]
+            V_2, S_2 = levels[2]
+            delta_up   = (V_2[:, 2] - V_2[:, 1])/(S_2[:, 2] - S_2[:, 1])
+            delta_down = (V_2[:, 1] - V_2[:, 0])/(S_2[:, 1] - S_2[:, 0])
+            result['delta'][idx] = (V_1[:, 1] - V_1[:, 0])/(S_1[:, 1] - S_1[:, 0])
+            result['gamma'][idx] = (delta_up - delta_down)/((S_2[:, 2] - S_2[:, 0])/2)
+            result['theta'][idx] = -(V_2[:, 1] - levels[0][0][:, 0])/(2*delta_t[:, 0])
+
+    return result
@@ -14,7 +14,7 @@ class BinOption:
         self.OT        = option_type
         self.M         = M 
 
-        self.values, self.prices = BinOP.generate_tree(self.r, self.sigma, self.S, self.K, self.T, self.CoP, self.OT, self.M, gamma_par = self.gamma_par)
+        self.values, self.prices = BinOP.backward_induction(self.r, self.sigma, self.S, self.K, self.T, self.CoP, self.OT, self.M, gamma_par = self.gamma_par)
 
     def value(self): 
         """
@@ -43,7 +43,7 @@ class BinOption:
         : return : Vega of the option
         """
         new_sigma = 1.01*self.sigma
-        new_values, new_prices = BinOP.generate_tree(self.r, new_sigma, self.S, self.K, self.T, self.CoP, self.OT, self.M, gamma_par = self.gamma_par)
+        new_values, new_prices = BinOP.backward_induction(self.r, new_sigma, self.S, self.K, self.T, self.CoP, self.OT, self.M, gamma_par = self.gamma_par)
 
         return (new_values[0][0] - self.values[0][0])/(new_sigma - self.sigma) 
      
@@ -53,7 +53,7 @@ class BinOption:
         : return : Rho of the option 
         """
         new_r = 1.01*self.r
-        new_values, new_prices = BinOP.generate_tree(new_r, self.sigma, self.S, self.K, self.T, self.CoP, self.OT, self.M, gamma_par = self.gamma_par) 
+        new_values, new_prices = BinOP.backward_induction(new_r, self.sigma, self.S, self.K, self.T, self.CoP, self.OT, self.M, gamma_par = self.gamma_par) 
 
         return (new_values[0][0] - self.values[0][0])/(new_r - self.r) 
      
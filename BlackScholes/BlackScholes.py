@@ -1,6 +1,6 @@
 import numpy as np 
 
-import scipy.stats as stats
+from special import norm_cdf, norm_pdf
 
 def calc_d_1(r, sigma, S, K, T, div = 0):
     """
@@ -47,9 +47,9 @@ def delta(r, sigma, S, K, T, call_or_put, div = 0):
     """
     d_1 = calc_d_1(r, sigma, S, K, T,  div = div)
     if (call_or_put == 'C'):
-        return np.exp(-div*(T))*stats.norm.cdf(d_1)
+        return np.exp(-div*(T))*norm_cdf(d_1)
     else:
-        return -np.exp(-div*(T))*stats.norm.cdf(-d_1) 
+        return -np.exp(-div*(T))*norm_cdf(-d_1) 
 
 
 def vega(r, sigma, S, K, T, call_or_put, div = 0):
@@ -67,7 +67,7 @@ def vega(r, sigma, S, K, T, call_or_put, div = 0):
     """
     d_1 = calc_d_1(r, sigma, S, K, T,  div = div)
 
-    return S*np.exp(-div*(T))*stats.norm.pdf(d_1)*np.sqrt(T)
+    return S*np.exp(-div*(T))*norm_pdf(d_1)*np.sqrt(T)
 
 
 def theta(r, sigma, S, K, T, call_or_put, div = 0):
@@ -86,12 +86,12 @@ def theta(r, sigma, S, K, T, call_or_put, div = 0):
     d_1 = calc_d_1(r, sigma, S, K, T,  div = div)
     d_2 = calc_d_2(r, sigma, S, K, T,  div = div) 
     # Obviamente esta función puede mejorar mucho,y lo hará 
-    term_1 = -S*stats.norm.pdf(d_1)*sigma/(2*np.sqrt(T))
+    term_1 = -S*norm_pdf(d_1)*sigma/(2*np.sqrt(T))
     if (call_or_put == 'C'):
-        term_2 = -r*K*np.exp(-r*T)*stats.norm.cdf(d_2) 
+        term_2 = -r*K*np.exp(-r*T)*norm_cdf(d_2) 
  
     elif (call_or_put == 'P'):
-        term_2 = r*K*np.exp(-r*T)*stats.norm.cdf(-d_2) 
+        term_2 = r*K*np.exp(-r*T)*norm_cdf(-d_2) 
     else: 
         raise ValueError("Please choose an appropiate value")
     return (term_1 + term_2 )
@@ -110,7 +110,7 @@ def gamma(r, sigma, S, K, T, call_or_put, div = 0):
     : returns           : gamma of the option 
     """
     d_1 = calc_d_1(r, sigma, S, K, T,  div = div) 
-    return stats.norm.pdf(d_1)/(S*sigma*np.sqrt(T)) 
+    return norm_pdf(d_1)/(S*sigma*np.sqrt(T)) 
 
 def rho(r, sigma, S, K, T, call_or_put, div = 0): 
     """
@@ -127,9 +127,9 @@ def rho(r, sigma, S, K, T, call_or_put, div = 0):
     """
     d_2 = calc_d_2(r, sigma, S, K, T,  div = div) 
     if (call_or_put == 'C'): 
-        return K* (T)*np.exp(-r*T) * stats.norm.cdf(d_2) 
+        return K* (T)*np.exp(-r*T) * norm_cdf(d_2) 
     elif call_or_put == 'P': 
-        return -K* (T)*np.exp(-r*T) * stats.norm.cdf(-d_2) 
+        return -K* (T)*np.exp(-r*T) * norm_cdf(-d_2) 
     else: 
         #error message
         pass 
@@ -151,10 +151,143 @@ def BSprice (r, sigma, S, K, T, call_or_put, div = 0):
     d_1 = calc_d_1(r, sigma, S, K, T,  div = div) 
     d_2 = calc_d_2(r, sigma, S, K, T, div = div) 
     if (call_or_put == 'C'):
-        V = S*np.exp(-div*(T))*stats.norm.cdf(d_1)-K*np.exp(-r*(T))*stats.norm.cdf(d_2) 
+        V = S*np.exp(-div*(T))*norm_cdf(d_1)-K*np.exp(-r*(T))*norm_cdf(d_2) 
     elif (call_or_put == 'P'):
-        V = -S*np.exp(-div*(T))*stats.norm.cdf(-d_1)+K*np.exp(-r*(T))*stats.norm.cdf(-d_2)
+        V = -S*np.exp(-div*(T))*norm_cdf(-d_1)+K*np.exp(-r*(T))*norm_cdf(-d_2)
     
     return V 
 
 
+def BSgreeks(r, sigma, S, K, T, call_or_put, div = 0):
+    """
+    Calculate the value and all the greeks of European options (Black-Scholes model) in a single pass
+
+    All parameters may be numpy arrays (broadcast against each other). d1, d2, the discount 
+    factors and the normal pdf/cdf are computed only once and shared by every output. 
+
+    : param r           : Risk-free interest rate 
+    : param sigma       : Volatility 
+    : param S           : Spot price of the underlying stock 
+    : param K           : Strike price of the option
+    : param T           : Time for maturity  
+    : param call_or_put : Type of option: Call ('C') or Put ('P'). May be an array 
+    : param div         : Dividends 
+    : returns           : Dictionary of arrays with keys 'price', 'delta', 'gamma', 'vega', 'theta' and 'rho'
+    """
+    call_or_put = np.asarray(call_or_put)
+    if not np.all((call_or_put == 'C') | (call_or_put == 'P')):
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))")
+    # +1 for calls and -1 for puts, so that both are handled by the same formulas
+    w = np.where(call_or_put == 'C', 1.0, -1.0)
+
+    sqrt_T    = np.sqrt(T)
+    sig_sqrtT = sigma*sqrt_T
+    d_1 = (np.log(S/K) + (r-div+sigma**2/2)*T)/sig_sqrtT
+    d_2 = d_1 - sig_sqrtT
+
+    disc_r = np.exp(-r*T)
+    disc_q = np.exp(-div*T)
+    pdf_d1 = norm_pdf(d_1)
+    cdf_d1 = norm_cdf(w*d_1)
+    cdf_d2 = norm_cdf(w*d_2)
+
+    S_term = S*disc_q*cdf_d1
+    K_term = K*disc_r*cdf_d2
+
+    return {
+        'price' : w*(S_term - K_term), 
+        'delta' : w*disc_q*cdf_d1, 
+        'gamma' : disc_q*pdf_d1/(S*sig_sqrtT), 
+        'vega'  : S*disc_q*pdf_d1*sqrt_T, 
+        'theta' : -S*disc_q*pdf_d1*sigma/(2*sqrt_T) - w*r*K_term + w*div*S_term, 
+        'rho'   : w*T*K_term, 
+    }
+
+def implied_vol(price, r, S, K, T, call_or_put, div = 0, tol = 1e-8, vol_tol = 1e-6, max_iter = 50, sigma_min = 1e-4, sigma_max = 5):
+    """
+    Calculate the implied volatility of European options (Black-Scholes model) for a whole chain at once
+
+    Starts from the Corrado-Miller rational approximation and takes Newton steps using vega. 
+    Every element keeps a [sigma_min, sigma_max] bracket, and whenever a Newton step leaves it 
+    (or vega vanishes) a bisection step is taken instead. Converged elements are masked out 
+    of the following iterations. An element only converges when both the price is within tol and 
+    the volatility is pinned down to vol_tol, either by the Newton correction |price error|/vega or by 
+    the width of the bracket. Far from the money or close to maturity vega vanishes, and a price within 
+    tol may leave the volatility undetermined: those quotes get their own status. 
+
+    : param price       : Market price of the option 
+    : param r           : Risk-free interest rate 
+    : param S           : Spot price of the underlying stock 
+    : param K           : Strike price of the option
+    : param T           : Time for maturity  
+    : param call_or_put : Type of option: Call ('C') or Put ('P'). May be an array 
+    : param div         : Dividends 
+    : param tol         : Absolute tolerance on the price (default value: 1e-8) 
+    : param vol_tol     : Absolute tolerance on the volatility (default value: 1e-6) 
+    : param max_iter    : Maximum number of iterations (default value: 50) 
+    : param sigma_min   : Lower bound of the volatility (default value: 1e-4) 
+    : param sigma_max   : Upper bound of the volatility (default value: 5) 
+    : returns           : vols, status. status is 0 if converged, 1 if max_iter was reached, 2 if the price is outside the no-arbitrage bounds (vol is nan) 
+                          and 3 if the price is matched within tol but vega is too small for the price to determine the vol within vol_tol 
+    """
+    price, r, S, K, T, call_or_put, div = np.broadcast_arrays(price, r, S, K, T, np.asarray(call_or_put), div)
+    price, r, S, K, T, div = (np.asarray(x, dtype = float).ravel() for x in (price, r, S, K, T, div))
+    shape = call_or_put.shape
+    call_or_put = call_or_put.ravel()
+    if not np.all((call_or_put == 'C') | (call_or_put == 'P')):
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))")
+    is_call = call_or_put == 'C'
+
+    # Discounted spot and strike. Puts are turned into calls through put-call parity 
+    S_disc = S*np.exp(-div*T)
+    K_disc = K*np.exp(-r*T)
+    call_price = np.where(is_call, price, price + S_disc - K_disc)
+
+    vols   = np.full(price.shape, np.nan)
+    status = np.full(price.shape, 2, dtype = int)
+
+    valid = (call_price > np.maximum(S_disc - K_disc, 0)) & (call_price < S_disc) & (T > 0)
+
+    # Corrado-Miller initial guess
+    half_moneyness = (S_disc - K_disc)/2
+    disc = np.maximum((call_price - half_moneyness)**2 - (S_disc - K_disc)**2/np.pi, 0)
+    guess = np.sqrt(2*np.pi/np.where(valid, T, 1))/(S_disc + K_disc)*(call_price - half_moneyness + np.sqrt(disc))
+    vols[valid] = np.clip(guess[valid], sigma_min, sigma_max)
+
+    lower = np.full(price.shape, float(sigma_min))
+    upper = np.full(price.shape, float(sigma_max))
+
+    active = np.nonzero(valid)[0]
+    status[active] = 1
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        sig = vols[active]
+        greeks_ = BSgreeks(r[active], sig, S[active], K[active], T[active], 'C', div = div[active])
+        diff = greeks_['price'] - call_price[active]
+
+        vega_ = greeks_['vega']
+        lo, hi = lower[active], upper[active]
+        # A price within tol only determines the vol if vega is large enough, or if the bracket is already narrow.
+        # Prices are only resolved to rounding error, so a vanishing diff does not pin the vol by itself
+        price_ok = np.abs(diff) < tol
+        resolution = np.finfo(float).eps*(S_disc[active] + K_disc[active])
+        converged = price_ok & ((np.abs(diff) + resolution < vol_tol*vega_) | (hi - lo < vol_tol))
+        status[active] = np.where(converged, 0, np.where(price_ok, 3, 1))
+
+        # Shrink the bracket: the price is increasing in sigma. The sign of a diff below the resolution is noise
+        lower[active] = np.where(diff < -resolution, sig, lower[active])
+        upper[active] = np.where(diff > resolution, sig, upper[active])
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            newton = sig - diff/vega_
+        lo, hi = lower[active], upper[active]
+        use_newton = (vega_ > 0) & (newton > lo) & (newton < hi)
+        new_sig = np.where(use_newton, newton, (lo + hi)/2)
+
+        vols[active] = np.where(converged, sig, new_sig)
+        active = active[~converged]
+
+    return vols.reshape(shape), status.reshape(shape)
+
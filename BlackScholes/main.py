@@ -1,5 +1,4 @@
 import numpy as np 
-import scipy.stats as stats
 from BlackScholes import * 
 
 
@@ -46,41 +45,43 @@ class BlackScholesOption:
         Calculates the delta of the option
         : returns : Delta 
         """
-        d1 = self._d1() 
-        if self.CoP == 'C':
-            delta = stats.norm.cdf(d1) 
-        elif self.CoP == 'P':
-            delta = -stats.norm.cdf(-d1) 
-        return delta 
+        return self.greeks()['delta'] 
 
     def gamma(self): 
         """
         Calculates the gamma of the option 
         : returns : Gamma 
         """
-        gamma_ = gamma(self.r, self.sigma, self.S, self.K, self.T, self.CoP, div = self.div)
-        return gamma_ 
+        return self.greeks()['gamma'] 
     
     def vega(self): 
         """ 
         Calculates the vega of the option 
         : return : Vega 
         """
-        vega_ = vega(self.r, self.sigma, self.S, self.K, self.T, self.CoP, div = self.div)
-        return vega_
+        return self.greeks()['vega'] 
     
     def theta(self):
         """
-        Calculates the theta of the option 
+        Calculates the theta of the option (sign convention of greeks) 
         : return : Theta 
         """
-        theta_ = theta(self.r, self.sigma, self.S, self.K, self.T, self.CoP, div = self.div) 
-        return -theta_ 
+        return self.greeks()['theta'] 
 
     def rho(self):
         """
         Calculates the rho of the option 
         : return : rho 
         """
-        rho_    = rho(self.r, self.sigma, self.S, self.K, self.T, self.CoP, div = self.div) 
-        return rho_
+        return self.greeks()['rho'] 
+
+    def greeks(self): 
+        """
+        Calculates the value and all the greeks of the option in a single pass. The single greek methods 
+        read from it, so they all take the dividends into account 
+        : return : Dictionary with keys 'price', 'delta', 'gamma', 'vega', 'theta' and 'rho' 
+        """
+        greeks_ = BSgreeks(self.r, self.sigma, self.S, self.K, self.T, self.CoP, div = self.div) 
+        # Theta as the time decay -dV/dt, the convention of the option classes
+        greeks_['theta'] = -greeks_['theta']
+        return greeks_
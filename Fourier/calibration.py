@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import numpy as np
+
+import characteristic
+import cos
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'BlackScholes'))
+import BlackScholes
+
+
+# Heston parameters, in the order used by the calibration vectors, and their default bounds
+PARAMETERS = ('sigma_0', 'kappa', 'theta', 'xi', 'corr_index')
+BOUNDS = {
+    'sigma_0'   : (1e-4, 2),
+    'kappa'     : (1e-3, 20),
+    'theta'     : (1e-4, 2),
+    'xi'        : (1e-2, 5),
+    'corr_index': (-0.999, 0.999),
+}
+
+
+class HestonSurface:
+    """
+    Price a surface of European options under Heston model with the COS method, caching everything that
+    does not depend on the model parameters
+
+    For each maturity the cosine frequencies, the payoff coefficients and the strike terms exp(i u_k (x_j - a))
+    are computed once and kept in a (strikes x N) matrix, so pricing the surface for new parameters only takes
+    one characteristic function evaluation per maturity and a matrix-vector product. The truncation range of a
+    maturity is only rebuilt when the parameters move it by more than half of its width in standard deviations.
+    """
+    def __init__(self, r, S_0, K, T, call_or_put = 'C', N = 160, L = 12):
+        """
+        : param r           : Risk-free interest rate
+        : param S_0         : Spot price
+        : param K           : Numpy array of strike prices of the quotes
+        : param T           : Numpy array of maturities of the quotes
+        : param call_or_put : Call ('C') or Put ('P') for each quote (default value: 'C')
+        : param N           : Number of cosine terms (default value: 160)
+        : param L           : Width of the truncation range in standard deviations (default value: 12)
+        """
+        K, T, call_or_put = np.broadcast_arrays(np.asarray(K, dtype = float), np.asarray(T, dtype = float), np.asarray(call_or_put))
+        if not np.all((call_or_put == 'C') | (call_or_put == 'P')):
+            raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))")
+        self.r, self.S_0, self.N, self.L = r, S_0, N, L
+        self.K, self.T, self.call_or_put = K.ravel(), T.ravel(), call_or_put.ravel()
+        # Calls are puts plus S_0 - K exp(-rT), which does not depend on the parameters
+        self._parity = np.where(self.call_or_put == 'C', S_0 - self.K*np.exp(-r*self.T), 0)
+        self._maturities = {T_i: np.nonzero(self.T == T_i)[0] for T_i in np.unique(self.T)}
+        self._terms = {}
+        self.rebuilds = 0
+
+    def _cf(self, u, params, T):
+        return characteristic.heston_cf(u, self.r, params[0], 1, params[1], params[2], params[3], T, corr_index = params[4])
+
+    def _range(self, params, T, L):
+        x = np.log(self.S_0/self.K[self._maturities[T]])
+        return cos._truncation_range(x, *characteristic.cumulants(lambda u: self._cf(u, params, T)), L)
+
+    def _maturity_terms(self, params, T):
+        """
+        Cached terms of a maturity, rebuilt if the range at params is no longer covered
+        """
+        terms = self._terms.get(T)
+        if terms is not None:
+            a, b = self._range(params, T, self.L/2)
+            if a >= terms['a'] and b <= terms['b']:
+                return terms
+
+        a, b = self._range(params, T, self.L)
+        K = self.K[self._maturities[T]]
+        u = np.arange(self.N)*np.pi/(b - a)
+        V = cos._payOff_coefficients(u, a, b, a, 0, 'P')
+        V[0] = V[0]/2
+        M = (K*np.exp(-self.r*T))[:, None]*np.exp(1j*np.multiply.outer(np.log(self.S_0/K) - a, u))*V
+        terms = self._terms[T] = {'a': a, 'b': b, 'u': u, 'M': M}
+        self.rebuilds += 1
+        return terms
+
+    def prices(self, params):
+        """
+        Prices of the quotes
+
+        : param params : Sequence of parameters, in the order of PARAMETERS
+        : return       : numpy array of prices
+        """
+        P = np.empty(self.K.size)
+        for T, index in self._maturities.items():
+            terms = self._maturity_terms(params, T)
+            P[index] = np.real(terms['M'] @ self._cf(terms['u'], params, T))
+        return P + self._parity
+
+    def prices_and_jacobian(self, params):
+        """
+        Prices of the quotes and their analytic derivatives with respect to the parameters
+
+        : param params : Sequence of parameters, in the order of PARAMETERS
+        : return       : numpy array of prices, numpy array of derivatives with shape (number of quotes, 5)
+        """
+        P = np.empty(self.K.size)
+        J = np.empty((self.K.size, len(PARAMETERS)))
+        for T, index in self._maturities.items():
+            terms = self._maturity_terms(params, T)
+            cf, grad = characteristic.heston_cf_gradient(terms['u'], self.r, params[0], 1, params[1], params[2], params[3], T, corr_index = params[4])
+            P[index] = np.real(terms['M'] @ cf)
+            J[index] = np.real(terms['M'] @ grad.T)
+        return P + self._parity, J
+
+
+def _levenberg_marquardt(fun, p, lower, upper, max_iter, tol):
+    """
+    Minimize the sum of squares of fun(p) inside the box [lower, upper] with the Levenberg-Marquardt method
+
+    Steps are scaled by the diagonal of J^T J (Marquardt), so parameters of different magnitudes are treated
+    alike, and projected back into the box.
+
+    : param fun : Function returning the residuals and their Jacobian
+    : return    : parameters, residuals, number of iterations, number of evaluations, whether it converged
+    """
+    res, J = fun(p)
+    cost = res @ res
+    damping, evaluations, converged = 1e-3, 1, False
+    for iteration in range(1, max_iter + 1):
+        g = J.T @ res
+        H = J.T @ J
+        scale = np.maximum(np.diag(H), 1e-12)
+        while True:
+            step = np.linalg.solve(H + damping*np.diag(scale), -g)
+            p_new = np.clip(p + step, lower, upper)
+            res_new, J_new = fun(p_new)
+            evaluations += 1
+            cost_new = res_new @ res_new
+            if np.isfinite(cost_new) and cost_new <= cost:
+                damping = max(damping/3, 1e-10)
+                break
+            damping *= 4
+            # No step lowers the cost (or every trial cost is nan): the fit has stalled, it has not converged
+            if damping > 1e10:
+                return p, res, iteration, evaluations, False
+        small_step = np.all(np.abs(p_new - p) <= tol*(np.abs(p) + tol))
+        converged = cost - cost_new <= tol*cost or small_step
+        p, res, J, cost = p_new, res_new, J_new, cost_new
+        if converged:
+            break
+    return p, res, iteration, evaluations, converged
+
+
+def calibrate_heston(r, S_0, K, T, implied_vols, call_or_put = 'C', initial = None, weights = None, bounds = None, surface = None, N = 160, L = 12,
+                     max_iter = 100, tol = 1e-10):
+    """
+    Calibrate the Heston parameters (as in MC.heston.heston) to a surface of implied volatilities
+
+    The model is priced with a cached COS pricer (see HestonSurface) and its analytic parameter gradients, and
+    fitted with Levenberg-Marquardt on price errors divided by the Black-Scholes vega of each quote, which
+    approximates implied volatility errors without inverting the model prices at each iteration.
+
+    : param r            : Risk-free interest rate
+    : param S_0          : Spot price
+    : param K            : Numpy array of strike prices of the quotes
+    : param T            : Numpy array of maturities of the quotes
+    : param implied_vols : Numpy array of market implied volatilities of the quotes. Quotes with nan are ignored
+    : param call_or_put  : Call ('C') or Put ('P') for each quote (default value: 'C')
+    : param initial      : Starting parameters: a dictionary with the keys of PARAMETERS (e.g. the 'params' of a previous calibration, to warm start from it)
+                           (default value: None, a guess from the at-the-money volatility)
+    : param weights      : Weight of each quote (default value: None, equal weights)
+    : param bounds       : Dictionary overriding some of the BOUNDS (default value: None)
+    : param surface      : HestonSurface of the same quotes to reuse its cache, e.g. when recalibrating to new prices (default value: None, a new one)
+    : param N            : Number of cosine terms (default value: 160)
+    : param L            : Width of the truncation range in standard deviations (default value: 12)
+    : param max_iter     : Maximum number of iterations (default value: 100)
+    : param tol          : Relative tolerance on the objective and on the parameters (default value: 1e-10)
+    : return             : Dictionary with 'params' (dictionary), 'iv_rmse', 'iv_errors', 'price_rmse', 'iterations', 'evaluations',
+                           'converged', 'elapsed' and 'surface'
+    """
+    start = time.perf_counter()
+    if surface is None:
+        surface = HestonSurface(r, S_0, K, T, call_or_put, N = N, L = L)
+    K, T, cop = surface.K, surface.T, surface.call_or_put
+    implied_vols = np.ravel(np.asarray(implied_vols, dtype = float))
+    if implied_vols.size == 1:
+        implied_vols = np.full(K.size, implied_vols[0])
+    elif implied_vols.size != K.size:
+        raise ValueError("Please choose implied_vols with one value per quote")
+    weights = np.ones(K.size) if weights is None else np.broadcast_to(np.asarray(weights, dtype = float), K.shape)
+    # Quotes without a volatility (nan) are left out 
+    valid = np.isfinite(implied_vols) 
+    weights = np.where(valid, weights, 0) 
+    implied_vols = np.where(valid, implied_vols, np.median(implied_vols[valid])) 
+
+    bounds = dict(BOUNDS, **(bounds or {}))
+    lower = np.array([bounds[name][0] for name in PARAMETERS])
+    upper = np.array([bounds[name][1] for name in PARAMETERS])
+    if initial is None:
+        atm_var = implied_vols[np.argmin(np.abs(np.log(K/S_0)) + T/1e3)]**2
+        initial = {'sigma_0': atm_var, 'kappa': 2, 'theta': atm_var, 'xi': 0.5, 'corr_index': -0.5}
+    p = np.clip([initial[name] for name in PARAMETERS], lower, upper)
+
+    calls = BlackScholes.BSprice(r, implied_vols, S_0, K, T, 'C')
+    market = np.where(cop == 'C', calls, calls - S_0 + K*np.exp(-r*T))
+    vega = BlackScholes.vega(r, implied_vols, S_0, K, T, 'C')
+    # Far from the money vega vanishes, and with it the price sensitivity to the volatility
+    scale = weights/np.maximum(vega, 1e-2*np.max(vega))
+
+    def fun(params):
+        prices, J = surface.prices_and_jacobian(params)
+        return scale*(prices - market), scale[:, None]*J
+
+    p, res, iterations, evaluations, converged = _levenberg_marquardt(fun, p, lower, upper, max_iter, tol)
+
+    prices = surface.prices(p)
+    model_vols = BlackScholes.implied_vol(prices, r, S_0, K, T, cop)[0]
+    iv_errors = np.where(valid, model_vols - implied_vols, np.nan) 
+    return {
+        'params'     : dict(zip(PARAMETERS, (float(x) for x in p))),
+        'iv_rmse'    : float(np.sqrt(np.nanmean(iv_errors**2))),
+        'iv_errors'  : iv_errors,
+        'price_rmse' : float(np.sqrt(np.mean((prices - market)[valid]**2))),
+        'iterations' : iterations,
+        'evaluations': evaluations,
+        'converged'  : converged,
+        'elapsed'    : time.perf_counter() - start,
+        'surface'    : surface,
+    }
@@ -0,0 +1,111 @@
+import numpy as np 
+
+
+def heston_cf(u, r, sigma_0, S_0, kappa, theta, xi, T, corr_index = 0): 
+    """
+    Calculate the characteristic function of the log-price at maturity under Heston model 
+
+    Uses the formulation of Albrecher et al. ("little Heston trap"), which has no branch cut 
+    discontinuities in the complex logarithm. Parameters follow MC.heston.heston. 
+
+    : param u          : Numpy array of (complex) arguments 
+    : param r          : Risk-free interest rate 
+    : param sigma_0    : The initial variance 
+    : param S_0        : Spot price 
+    : param kappa      : Kappa parameter in Heston model 
+    : param theta      : Theta parameter in Heston model 
+    : param xi         : Xi parameter in Heston model 
+    : param T          : Maturity 
+    : param corr_index : Correlation index between the two Wiener processes (default value: 0) 
+    : return           : E[exp(i u log S_T)] 
+    """
+    u  = np.asarray(u, dtype = complex) 
+    iu = 1j*u 
+    beta = kappa - corr_index*xi*iu 
+    d = np.sqrt(beta**2 + xi**2*(iu + u**2)) 
+    g = (beta - d)/(beta + d) 
+    exp_dT = np.exp(-d*T) 
+
+    C = kappa*theta/xi**2*((beta - d)*T - 2*np.log((1 - g*exp_dT)/(1 - g))) 
+    D = (beta - d)/xi**2*(1 - exp_dT)/(1 - g*exp_dT) 
+    return np.exp(iu*(np.log(S_0) + r*T) + C + D*sigma_0) 
+
+
+def heston_cf_gradient(u, r, sigma_0, S_0, kappa, theta, xi, T, corr_index = 0): 
+    """
+    Calculate the characteristic function of the log-price at maturity under Heston model and its 
+    analytic derivatives with respect to the model parameters (same formulation as heston_cf) 
+
+    : param u          : Numpy array of (complex) arguments 
+    : param others     : As in heston_cf 
+    : return           : cf (shape of u), numpy array of derivatives with respect to (sigma_0, kappa, theta, xi, corr_index) (shape (5,) + shape of u) 
+    """
+    u  = np.asarray(u, dtype = complex) 
+    iu = 1j*u 
+    beta = kappa - corr_index*xi*iu 
+    d = np.sqrt(beta**2 + xi**2*(iu + u**2)) 
+    A, B = beta - d, beta + d 
+    g = A/B 
+    exp_dT = np.exp(-d*T) 
+    q = 1 - g*exp_dT 
+    log_q = np.log(q/(1 - g)) 
+
+    C = kappa*theta/xi**2*(A*T - 2*log_q) 
+    D = A/xi**2*(1 - exp_dT)/q 
+    cf = np.exp(iu*(np.log(S_0) + r*T) + C + D*sigma_0) 
+
+    # Derivatives of beta, xi and of the prefactors kappa*theta/xi**2 and 1/xi**2 with respect to kappa, xi and corr_index 
+    zero = np.zeros_like(u) 
+    partials = { 
+        'kappa'     : (1 + zero, 0, theta/xi**2, 0), 
+        'xi'        : (-corr_index*iu, 1, -2*kappa*theta/xi**3, -2/xi**3), 
+        'corr_index': (-xi*iu, 0, 0, 0), 
+    } 
+    grad = np.empty((5,) + u.shape, dtype = complex) 
+    grad[0] = D 
+    grad[2] = kappa/xi**2*(A*T - 2*log_q) 
+    for i, p in ((1, 'kappa'), (3, 'xi'), (4, 'corr_index')): 
+        beta_p, xi_p, prefactor_p, inv_xi2_p = partials[p] 
+        d_p = (beta*beta_p + xi*xi_p*(iu + u**2))/d 
+        A_p, B_p = beta_p - d_p, beta_p + d_p 
+        g_p = (A_p*B - A*B_p)/B**2 
+        exp_dT_p = -T*d_p*exp_dT 
+        q_p = -(g_p*exp_dT + g*exp_dT_p) 
+        log_q_p = q_p/q + g_p/(1 - g) 
+        C_p = prefactor_p*(A*T - 2*log_q) + kappa*theta/xi**2*(A_p*T - 2*log_q_p) 
+        D_p = (A_p/xi**2 + A*inv_xi2_p)*(1 - exp_dT)/q - A/xi**2*(exp_dT_p/q + (1 - exp_dT)*q_p/q**2) 
+        grad[i] = C_p + sigma_0*D_p 
+    return cf, cf*grad 
+
+
+def gbm_cf(u, r, sigma, S_0, T, div = 0): 
+    """
+    Calculate the characteristic function of the log-price at maturity under GBM (Black-Scholes model) 
+
+    : param u     : Numpy array of (complex) arguments 
+    : param r     : Risk-free interest rate 
+    : param sigma : Volatility 
+    : param S_0   : Spot price 
+    : param T     : Maturity 
+    : param div   : Dividends (default value: 0) 
+    : return      : E[exp(i u log S_T)] 
+    """
+    u  = np.asarray(u, dtype = complex) 
+    mu = np.log(S_0) + (r - div - sigma**2/2)*T 
+    return np.exp(1j*u*mu - sigma**2*T*u**2/2) 
+
+
+
+def cumulants(cf, h = 1e-3): 
+    """
+    Calculate the first two cumulants of a distribution from its characteristic function by central differences 
+    of log(cf) at the origin 
+
+    : param cf : Characteristic function, taking a numpy array of arguments 
+    : param h  : Step of the differences (default value: 1e-3) 
+    : return   : c_1 (mean), c_2 (variance) 
+    """
+    log_cf = np.log(cf(np.array([-h, 0, h]))) 
+    c_1 = np.imag(log_cf[2] - log_cf[0])/(2*h) 
+    c_2 = -np.real(log_cf[2] - 2*log_cf[1] + log_cf[0])/h**2 
+    return c_1, c_2 
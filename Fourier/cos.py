@@ -0,0 +1,265 @@
+import numpy as np 
+
+import characteristic 
+
+
+def _chi_psi(u, a, c, d): 
+    """
+    Calculate the integrals of exp(y)*cos(u*(y - a)) (chi) and cos(u*(y - a)) (psi) over [c, d] 
+
+    : param u : Numpy array of frequencies k*pi/(b - a) 
+    : param a : Lower end of the truncation range 
+    : param c : Lower integration limit 
+    : param d : Upper integration limit 
+    : return  : chi, psi 
+    """
+    chi = (np.cos(u*(d - a))*np.exp(d) - np.cos(u*(c - a))*np.exp(c) 
+           + u*(np.sin(u*(d - a))*np.exp(d) - np.sin(u*(c - a))*np.exp(c)))/(1 + u**2) 
+    psi = np.empty_like(u) 
+    psi[0] = d - c 
+    psi[1:] = (np.sin(u[1:]*(d - a)) - np.sin(u[1:]*(c - a)))/u[1:] 
+    return chi, psi 
+
+
+def _payOff_coefficients(u, a, b, c, d, call_or_put): 
+    """
+    Calculate the cosine coefficients of the unit strike payoff on [c, d] ((e^y - 1)^+ for calls, (1 - e^y)^+ for puts) 
+    """
+    chi, psi = _chi_psi(u, a, c, d) 
+    if call_or_put == 'C': 
+        return 2/(b - a)*(chi - psi) 
+    return 2/(b - a)*(psi - chi) 
+
+
+def _truncation_range(x, c_1, c_2, L): 
+    """
+    Truncation range [a, b] covering x + log(S_T/S_0) for every x 
+    """
+    width = L*np.sqrt(c_2) 
+    return np.min(x) + c_1 - width, np.max(x) + c_1 + width 
+
+
+def cos_price(cf, r, S_0, K, T, call_or_put = 'C', N = 256, L = 10): 
+    """
+    Price European options for a vector of strikes with the COS method (Fang and Oosterlee, 2008) 
+
+    Puts are expanded on the cosine basis (their payoff is bounded) and calls follow from 
+    put-call parity, so all strikes share one set of characteristic function values. 
+
+    : param cf          : Characteristic function of log(S_T/S_0), taking a numpy array of arguments 
+    : param r           : Risk-free interest rate 
+    : param S_0         : Spot price 
+    : param K           : Strike price or numpy array of strike prices 
+    : param T           : Maturity 
+    : param call_or_put : Call ('C') or Put ('P'), may be an array (default value: 'C') 
+    : param N           : Number of cosine terms (default value: 256) 
+    : param L           : Width of the truncation range in standard deviations (default value: 10) 
+    : return            : Option values 
+    """
+    call_or_put = np.asarray(call_or_put) 
+    if not np.all((call_or_put == 'C') | (call_or_put == 'P')): 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))") 
+
+    K = np.asarray(K, dtype = float) 
+    x = np.log(S_0/K) 
+    a, b = _truncation_range(x, *characteristic.cumulants(cf), L) 
+
+    u = np.arange(N)*np.pi/(b - a) 
+    V = _payOff_coefficients(u, a, b, a, 0, 'P') 
+    V[0] = V[0]/2 
+
+    # Sum over k for every strike at once: Re(cf(u_k) exp(i u_k (x - a))) V_k 
+    terms = cf(u)*V 
+    P = K*np.exp(-r*T)*np.real(np.exp(1j*np.multiply.outer(x - a, u)) @ terms) 
+    # Forward from the characteristic function, so that dividends are accounted for 
+    C = P + S_0*np.exp(-r*T)*np.real(cf(-1j)) - K*np.exp(-r*T) 
+    return np.where(call_or_put == 'C', C, P) 
+
+
+def gbm_cos(r, sigma, S_0, K, T, call_or_put = 'C', div = 0, N = 256, L = 10): 
+    """
+    Computes the value of European options under GBM (Black-Scholes model) with the COS method 
+
+    : param r           : Risk-free interest rate 
+    : param sigma       : Volatility 
+    : param S_0         : Spot price 
+    : param K           : Strike price or numpy array of strike prices 
+    : param T           : Maturity 
+    : param call_or_put : Call ('C') or Put ('P'), may be an array (default value: 'C') 
+    : param div         : Dividends (default value: 0) 
+    : param N           : Number of cosine terms (default value: 256) 
+    : param L           : Width of the truncation range in standard deviations (default value: 10) 
+    : return            : Option values 
+    """
+    cf = lambda u: characteristic.gbm_cf(u, r, sigma, 1, T, div = div) 
+    return cos_price(cf, r, S_0, K, T, call_or_put = call_or_put, N = N, L = L) 
+
+
+def heston_cos(r, sigma_0, S_0, K, kappa, theta, xi, T, call_or_put = 'C', corr_index = 0, N = 256, L = 12): 
+    """
+    Computes the value of European options under Heston model with the COS method 
+
+    Parameters follow MC.heston.eu_heston 
+
+    : param r           : Risk-free interest rate 
+    : param sigma_0     : The initial variance 
+    : param S_0         : Spot price 
+    : param K           : Strike price or numpy array of strike prices 
+    : param kappa       : Kappa parameter in Heston model 
+    : param theta       : Theta parameter in Heston model 
+    : param xi          : Xi parameter in Heston model 
+    : param T           : Maturity 
+    : param call_or_put : Call ('C') or Put ('P'), may be an array (default value: 'C') 
+    : param corr_index  : Correlation index between the two Wiener processes (default value: 0) 
+    : param N           : Number of cosine terms (default value: 256) 
+    : param L           : Width of the truncation range in standard deviations (default value: 12) 
+    : return            : Option values 
+    """
+    cf = lambda u: characteristic.heston_cf(u, r, sigma_0, 1, kappa, theta, xi, T, corr_index = corr_index) 
+    return cos_price(cf, r, S_0, K, T, call_or_put = call_or_put, N = N, L = L) 
+
+
+def _exponential_integrals(N, a, b, c, d): 
+    """
+    Calculate the matrix of integrals of exp(i u_j (y - a))*cos(u_k (y - a)) over [c, d], rows k and columns j 
+
+    With u_k = k*pi/(b - a) the entries only depend on j + k and j - k (a Hankel plus a Toeplitz matrix), 
+    so the integrals are computed once for every frequency and then indexed 
+    """
+    m = np.arange(-(N - 1), 2*N - 1) 
+    w = m*np.pi/(b - a) 
+    safe = np.where(m == 0, 1, w) 
+    integrals = np.where(m == 0, d - c, (np.exp(1j*safe*(d - a)) - np.exp(1j*safe*(c - a)))/(1j*safe)) 
+
+    j = np.arange(N) 
+    return (integrals[j[None, :] + j[:, None] + N - 1] + integrals[j[None, :] - j[:, None] + N - 1])/2 
+
+
+def _exercise_boundary(continuation, payOff, y, a, b, call_or_put, num_bisections = 30): 
+    """
+    Find the log-moneyness where the continuation value equals the exercise value 
+
+    The crossing is bracketed on the grid y and refined by bisection. Puts are exercised below 
+    the boundary and calls above it. If there is no crossing the boundary is set to the end of 
+    the truncation range where the option is never exercised. 
+
+    : param continuation : Function returning the continuation values on the grid (no argument) or at a point 
+    : param payOff       : Exercise value function 
+    : param y            : Grid of log-moneyness 
+    : param a, b         : Truncation range 
+    : param call_or_put  : Call ('C') or Put ('P') 
+    : return             : Log-moneyness of the exercise boundary 
+    """
+    gain = payOff(y) - continuation() 
+    # Exercise only makes sense where the payoff is positive 
+    exercise = (gain > 0) & (payOff(y) > 0) 
+    if not np.any(exercise): 
+        return a if call_or_put == 'P' else b 
+    if call_or_put == 'P': 
+        i = np.nonzero(exercise)[0][-1] 
+        if i == len(y) - 1: 
+            return b 
+        lo, hi = y[i], y[i + 1] 
+    else: 
+        i = np.nonzero(exercise)[0][0] 
+        if i == 0: 
+            return a 
+        lo, hi = y[i - 1], y[i] 
+
+    # Bisection on the sign of the gain, which is positive on the exercise side 
+    for _ in range(num_bisections): 
+        mid = (lo + hi)/2 
+        positive = payOff(mid) - continuation(mid) > 0 
+        if positive == (call_or_put == 'P'): 
+            lo = mid 
+        else: 
+            hi = mid 
+    return (lo + hi)/2 
+
+
+def gbm_bermudan_cos(r, sigma, S_0, K, T, call_or_put, num_exercise, div = 0, N = 128, L = 10): 
+    """
+    Computes the value of Bermudan options under GBM with the COS method (Fang and Oosterlee, 2009) 
+
+    The cosine coefficients of the value are recursed backwards over the exercise dates: at each 
+    date the early exercise boundary is located and the coefficients are split into the exercise 
+    part (payoff) and the continuation part (an N x N matrix product). The value is homogeneous 
+    in the strike, so one recursion prices every strike. 
+
+    : param r            : Risk-free interest rate 
+    : param sigma        : Volatility 
+    : param S_0          : Spot price 
+    : param K            : Strike price or numpy array of strike prices 
+    : param T            : Maturity 
+    : param call_or_put  : Call ('C') or Put ('P') 
+    : param num_exercise : Number of exercise dates, equally spaced up to T 
+    : param div          : Dividends (default value: 0) 
+    : param N            : Number of cosine terms (default value: 128) 
+    : param L            : Width of the truncation range in standard deviations (default value: 10) 
+    : return             : Option values 
+    """
+    if call_or_put not in ('C', 'P'): 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))") 
+
+    K = np.asarray(K, dtype = float) 
+    x = np.log(S_0/K) 
+    delta_t = T/num_exercise 
+    # The range has to hold the log-moneyness at every date, not only at maturity 
+    c_1, c_2 = (r - div - sigma**2/2)*T, sigma**2*T 
+    a, b = _truncation_range(x, min(c_1, 0), c_2, L) 
+    b = max(b, np.max(x) + max(c_1, 0) + L*np.sqrt(c_2)) 
+
+    u = np.arange(N)*np.pi/(b - a) 
+    discounted_cf = np.exp(-r*delta_t)*characteristic.gbm_cf(u, r, sigma, 1, delta_t, div = div) 
+    if call_or_put == 'C': 
+        payOff = lambda y: np.maximum(np.exp(y) - 1, 0) 
+    else: 
+        payOff = lambda y: np.maximum(1 - np.exp(y), 0) 
+
+    # Cosine and sine tables on the grid where the exercise boundary is bracketed. The expansion of the 
+    # continuation value is poor near the ends of the range, so the outer half of the width is left out 
+    width = L*np.sqrt(c_2)/2 
+    y = np.linspace(a + width, b - width, 512) 
+    cos_grid, sin_grid = np.cos(np.multiply.outer(y - a, u)), np.sin(np.multiply.outer(y - a, u)) 
+
+    def continuation_fn(V): 
+        terms = discounted_cf*V 
+        terms[0] = terms[0]/2 
+        def continuation(point = None): 
+            if point is None: 
+                return cos_grid @ terms.real - sin_grid @ terms.imag 
+            return np.real(np.exp(1j*np.multiply.outer(point - a, u)) @ terms) 
+        return continuation 
+
+    # Coefficients at maturity, where the option is exercised on the whole range 
+    if call_or_put == 'C': 
+        V = _payOff_coefficients(u, a, b, 0, b, 'C') 
+    else: 
+        V = _payOff_coefficients(u, a, b, a, 0, 'P') 
+
+    for _ in range(num_exercise - 1): 
+        continuation = continuation_fn(V) 
+        x_star = _exercise_boundary(continuation, payOff, y, a, b, call_or_put) 
+        terms = discounted_cf*V 
+        terms[0] = terms[0]/2 
+        if call_or_put == 'C': 
+            G = _payOff_coefficients(u, a, b, max(x_star, 0), b, 'C') if x_star < b else np.zeros(N) 
+            C = 2/(b - a)*np.real(_exponential_integrals(N, a, b, a, x_star) @ terms) 
+        else: 
+            G = _payOff_coefficients(u, a, b, a, min(x_star, 0), 'P') if x_star > a else np.zeros(N) 
+            C = 2/(b - a)*np.real(_exponential_integrals(N, a, b, x_star, b) @ terms) 
+        V = G + C 
+
+    return K*continuation_fn(V)(x) 
+
+
+def gbm_american_cos(r, sigma, S_0, K, T, call_or_put, num_exercise = 32, div = 0, N = 128, L = 10): 
+    """
+    Approximates the value of American options under GBM by Richardson extrapolation of Bermudan COS prices 
+    with num_exercise and 2*num_exercise exercise dates 
+
+    : return : Option values 
+    """
+    V_1 = gbm_bermudan_cos(r, sigma, S_0, K, T, call_or_put, num_exercise, div = div, N = N, L = L) 
+    V_2 = gbm_bermudan_cos(r, sigma, S_0, K, T, call_or_put, 2*num_exercise, div = div, N = N, L = L) 
+    return 2*V_2 - V_1 
@@ -0,0 +1,90 @@
+import numpy as np 
+
+import characteristic 
+
+
+def carr_madan(cf, r, S_0, T, alpha = 1.5, N = 4096, eta = 0.25): 
+    """
+    Price European calls on a whole grid of strikes with the Carr-Madan FFT method 
+
+    The damped call price is Fourier transformed analytically from the characteristic function 
+    and inverted with one FFT, using Simpson weights. The log-strike grid is centred on log S_0. 
+
+    : param cf    : Characteristic function of the log-price at maturity, taking a numpy array of complex arguments 
+    : param r     : Risk-free interest rate 
+    : param S_0   : Spot price 
+    : param T     : Maturity 
+    : param alpha : Damping factor (default value: 1.5) 
+    : param N     : Number of points, a power of 2 (default value: 4096) 
+    : param eta   : Spacing of the integration grid (default value: 0.25) 
+    : return      : strikes, call prices (numpy arrays of length N) 
+    """
+    lam = 2*np.pi/(N*eta) 
+    k_0 = np.log(S_0) - N*lam/2 
+
+    v = eta*np.arange(N) 
+    psi = np.exp(-r*T)*cf(v - (alpha + 1)*1j)/(alpha**2 + alpha - v**2 + 1j*(2*alpha + 1)*v) 
+
+    simpson = (3 + (-1)**(np.arange(N) + 1))/3 
+    simpson[0] = 1/3 
+
+    x = np.exp(-1j*v*k_0)*psi*eta*simpson 
+    k = k_0 + lam*np.arange(N) 
+    calls = np.exp(-alpha*k)/np.pi*np.real(np.fft.fft(x)) 
+    return np.exp(k), calls 
+
+
+def fft_price(cf, r, S_0, K, T, call_or_put = 'C', div = 0, alpha = 1.5, N = 4096, eta = 0.25): 
+    """
+    Price European options at arbitrary strikes from a single Carr-Madan FFT 
+
+    Prices are interpolated (cubic in log-strike) from the FFT grid, and puts follow from put-call parity 
+
+    : param cf          : Characteristic function of the log-price at maturity 
+    : param r           : Risk-free interest rate 
+    : param S_0         : Spot price 
+    : param K           : Strike price or numpy array of strike prices 
+    : param T           : Maturity 
+    : param call_or_put : Call ('C') or Put ('P'), may be an array (default value: 'C') 
+    : param div         : Dividends, only used in put-call parity (default value: 0) 
+    : param alpha, N, eta : FFT parameters (see carr_madan) 
+    : return            : Option values 
+    """
+    # scipy is only needed for the interpolation 
+    from scipy.interpolate import CubicSpline 
+
+    strikes, calls = carr_madan(cf, r, S_0, T, alpha = alpha, N = N, eta = eta) 
+    log_K = np.log(np.asarray(K, dtype = float)) 
+
+    # Only the central part of the grid is needed, far strikes are numerically noisy 
+    window = np.abs(np.log(strikes/S_0)) < max(np.max(np.abs(log_K - np.log(S_0))), 0.1) + 0.5 
+    C = CubicSpline(np.log(strikes[window]), calls[window])(log_K) 
+
+    call_or_put = np.asarray(call_or_put) 
+    if not np.all((call_or_put == 'C') | (call_or_put == 'P')): 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))") 
+    P = C - S_0*np.exp(-div*T) + np.exp(log_K)*np.exp(-r*T) 
+    return np.where(call_or_put == 'C', C, P) 
+
+
+def heston_fft(r, sigma_0, S_0, K, kappa, theta, xi, T, call_or_put = 'C', corr_index = 0, alpha = 1.5, N = 4096, eta = 0.25): 
+    """
+    Computes the value of European options under Heston model for a whole strike grid with one FFT 
+
+    Parameters follow MC.heston.eu_heston 
+
+    : param r           : Risk-free interest rate 
+    : param sigma_0     : The initial variance 
+    : param S_0         : Spot price 
+    : param K           : Strike price or numpy array of strike prices 
+    : param kappa       : Kappa parameter in Heston model 
+    : param theta       : Theta parameter in Heston model 
+    : param xi          : Xi parameter in Heston model 
+    : param T           : Maturity 
+    : param call_or_put : Call ('C') or Put ('P'), may be an array (default value: 'C') 
+    : param corr_index  : Correlation index between the two Wiener processes (default value: 0) 
+    : param alpha, N, eta : FFT parameters (see carr_madan) 
+    : return            : Option values 
+    """
+    cf = lambda u: characteristic.heston_cf(u, r, sigma_0, S_0, kappa, theta, xi, T, corr_index = corr_index) 
+    return fft_price(cf, r, S_0, K, T, call_or_put = call_or_put, alpha = alpha, N = N, eta = eta) 
@@ -1,8 +1,61 @@
+import functools 
+
 import numpy as np 
-import PayOffs
+import payOffs
+import parallel
+import qmc
+import cache
+import controls
+import adaptive
+import lsm
+
 
+def _step(S, dW, r, sigma, delta_t, integration_method, out = None): 
+    """
+    Advance GBM paths by one time step 
 
-def GBM(r, sigma, S_0, num_steps, T, num_simulations = 10000, integration_method = 'E', ant_variates = False):
+    Euler-Maruyama, Milstein and Runge-Kutta steps are all of the form S*(1 + r*delta_t + sigma*dW + k*(dW**2 - delta_t)), 
+    with k = 0, sigma**2/2 and sigma*(r*delta_t + sigma*sqrt(delta_t))/(2*sqrt(delta_t)) respectively, and are 
+    evaluated in place in out without temporaries 
+
+    : param S                  : Numpy array with the current prices 
+    : param dW                 : Numpy array with the Wiener increments of the step 
+    : param r                  : The drift 
+    : param sigma              : The volatility 
+    : param delta_t            : Time step 
+    : param integration_method : The SDE integration method used. Choose from 'E' (Euler-Maruyama), 'M' (Milstein), 'RK' (Runge-Kutta) or 'exact' (exact log-space sampling) 
+    : param out                : Numpy array to write the prices after the step to, which must not be S (default value: None, a new array) 
+    : returns                  : Numpy array with the prices after the step 
+    """
+    if out is None: 
+        out = np.empty_like(S) 
+
+    if integration_method == 'exact': 
+        np.multiply(dW, sigma, out = out) 
+        out += (r - sigma**2/2)*delta_t 
+        np.exp(out, out = out) 
+        out *= S 
+        return out 
+
+    if integration_method == 'E': 
+        k = 0 
+    elif integration_method == 'M': 
+        k = sigma**2/2 
+    elif integration_method == 'RK': 
+        k = sigma*(r*delta_t + sigma*np.sqrt(delta_t))/(2*np.sqrt(delta_t)) 
+    else: 
+        raise ValueError("Please choose an appropiate SDE integration method (Euler ('E'), Milstein('M'), Rudge-Kutta('RK') or exact ('exact'))")
+
+    # S*(dW*(k*dW + sigma) + 1 + r*delta_t - k*delta_t) 
+    np.multiply(dW, k, out = out) 
+    out += sigma 
+    out *= dW 
+    out += 1 + r*delta_t - k*delta_t 
+    out *= S 
+    return out 
+
+
+def GBM(r, sigma, S_0, num_steps, T, num_simulations = 10000, integration_method = 'E', ant_variates = False, rng = None, sampler = 'random', seed = None, dtype = np.float64):
 
     """
     Calculate sample paths of GBM 
@@ -13,70 +66,217 @@ def GBM(r, sigma, S_0, num_steps, T, num_simulations = 10000, integration_method
     : param num_steps          : Number of steps for the random path generation  
     : param T                  : Time length of the generated path 
     : param num_simulations    : The number of paths generated (default value: 10000) 
-    : param integration_method : The SDE integration method used. Choose from 'E' (Euler-Maruyama), 'M' (Milstein) or 'RK' (Runge-Kutta) (default value: 'E')
-    : param ant_variates       : Boolean indicating whether antithetic variates are to be used 
+    : param integration_method : The SDE integration method used. Choose from 'E' (Euler-Maruyama), 'M' (Milstein), 'RK' (Runge-Kutta) or 'exact' (exact log-space sampling) (default value: 'E')
+    : param ant_variates       : Boolean indicating whether antithetic variates are to be used. If True, the antithetic paths are appended after the original ones 
+    : param rng                : numpy Generator to draw from (default value: None, the global numpy random state) 
+    : param sampler            : 'random' (pseudo-random numbers) or 'sobol' (scrambled Sobol points with Brownian bridge) (default value: 'random') 
+    : param seed               : Seed or numpy SeedSequence, used instead of rng. Seeded path sets are kept in the shared path cache (see cache.py) and are read-only (default value: None) 
+    : param dtype              : Floating point type of the paths, numpy.float32 halves memory and bandwidth (default value: numpy.float64) 
     : returns                  : A numpy array containing the generated paths      
     
     """
+    if seed is not None: 
+        key = ('GBM', r, sigma, S_0, num_steps, T, num_simulations, integration_method, ant_variates, sampler, cache.seed_key(seed), np.dtype(dtype).name) 
+        return cache.cached(key, lambda: GBM(r, sigma, S_0, num_steps, T, num_simulations, integration_method, ant_variates, rng = np.random.default_rng(seed), sampler = sampler, dtype = dtype)) 
 
-    delta_t = T/num_steps 
+    Z = qmc.shock_sampler(num_steps, sampler = sampler, rng = rng)(num_simulations)[0] 
+    return GBM_paths(r, sigma, S_0, T, Z, integration_method = integration_method, ant_variates = ant_variates, dtype = dtype)
 
-    S = np.zeros((num_simulations, num_steps +1))
-    W = np.sqrt(delta_t)*np.random.normal(0,1,(num_simulations, num_steps)) 
 
+def GBM_paths(r, sigma, S_0, T, Z, integration_method = 'E', ant_variates = False, dtype = np.float64): 
+    """
+    Calculate sample paths of GBM from given standard normal shocks 
 
-    for i in range(num_simulations):
-        S[i,0] = S_0 
-    
+    Reusing the same shocks with different parameters gives common random numbers 
+
+    : param r                  : The drift 
+    : param sigma              : The volatility 
+    : param S_0                : The initial price 
+    : param T                  : Time length of the generated path 
+    : param Z                  : Numpy array of standard normal shocks with shape (num_simulations, num_steps) 
+    : param integration_method : The SDE integration method used. Choose from 'E' (Euler-Maruyama), 'M' (Milstein), 'RK' (Runge-Kutta) or 'exact' (exact log-space sampling) (default value: 'E')
+    : param ant_variates       : Boolean indicating whether antithetic variates are to be used. If True, the antithetic paths are appended after the original ones 
+    : param dtype              : Floating point type of the paths (default value: numpy.float64) 
+    : returns                  : A numpy array containing the generated paths      
+    """
+    num_simulations, num_steps = Z.shape
+    delta_t = T/num_steps 
+
+    # The Wiener increments are written in place into the paths array, which is then advanced step by step 
+    S = np.empty((2*num_simulations if ant_variates else num_simulations, num_steps +1), dtype = dtype)
+    W = S[:, 1:] 
+    np.multiply(Z, np.sqrt(delta_t), out = W[:num_simulations]) 
     if ant_variates: 
-        ant_S = S 
+        np.negative(W[:num_simulations], out = W[num_simulations:]) 
+    S[:,0] = S_0 
 
+    if integration_method == 'exact': 
+        # GBM has an exact solution: the log-price is a cumulative sum of normal increments
+        W *= sigma 
+        W += (r - sigma**2/2)*delta_t 
+        np.cumsum(W, axis = 1, out = W) 
+        np.exp(W, out = W) 
+        W *= S_0 
+        return S 
 
+    dW = np.empty(S.shape[0], dtype = dtype) 
     for j in range(num_steps):
-        deterministic_term = r*S[:,j]*delta_t
-        random_term = sigma*S[:,j]*W[:,j]
-    
-        if ant_variates:
-            ant_deterministic_term = r*ant_S[:,j]*delta_t
-            ant_random_term   = sigma*ant_S[:,j]*(-W[:,j])
-        
-        if integration_method == 'E': 
-            S[:,j+1] = S[:,j] + deterministic_term + random_term 
-            
-            if ant_variates: 
-                ant_S[:,j+1] = ant_S[:,j] + ant_deterministic_term + ant_random_term
-            
-        
-        elif integration_method == 'M': 
-            milstein_term = 1/2 * (sigma**2)*S[:,j]*(W[:,j]**2 -delta_t)
-            S[:,j+1] = S[:,j] + deterministic_term + random_term + milstein_term 
+        dW[:] = S[:,j+1] 
+        _step(S[:,j], dW, r, sigma, delta_t, integration_method, out = S[:,j+1])
 
-            if ant_variates: 
-                ant_milstein_term = 1/2 * (sigma**2)*ant_S[:,j]*(W[:,j]**2 -delta_t)
-                ant_S[:,j+1] = ant_S[:,j] + ant_deterministic_term + ant_random_term + ant_milstein_term
-        
+    return S
+
+
+def GBM_chunks(r, sigma, S_0, num_steps, T, num_simulations = 10000, integration_method = 'E', ant_variates = False, chunk_size = 10000, features = ('terminal',), rng = None, sampler = 'random', dtype = np.float64): 
+    """
+    Generate GBM paths in chunks and time steps without storing them, yielding path features 
 
-        elif integration_method == 'RK': 
-            y_hat = S[:,j] + r*S[:,j]*delta_t + sigma*np.sqrt(delta_t) 
-            rk_term = (W[:,j]**2 - delta_t) * sigma*(y_hat - S[:,j])/(2*np.sqrt(delta_t))
-            S[:,j+1] = S[:,j] + deterministic_term + random_term + rk_term 
+    Only the current price and one accumulator per requested feature are kept for each path 
+    of the chunk, so memory depends on chunk_size but not on num_simulations or num_steps. 
 
+    : param r                  : The drift 
+    : param sigma              : The volatility 
+    : param S_0                : The initial price 
+    : param num_steps          : Number of steps for the random path generation  
+    : param T                  : Time length of the generated path 
+    : param num_simulations    : The number of paths generated (default value: 10000) 
+    : param integration_method : The SDE integration method used. Choose from 'E' (Euler-Maruyama), 'M' (Milstein), 'RK' (Runge-Kutta) or 'exact' (exact log-space sampling) (default value: 'E')
+    : param ant_variates       : Boolean indicating whether antithetic variates are to be used. If True, every feature array has a leading axis of size 2 (original, antithetic) 
+    : param chunk_size         : Number of paths advanced together (default value: 10000) 
+    : param features           : Features to accumulate, any of 'terminal', 'average', 'geometric', 'max' and 'min' (default value: ('terminal',)) 
+    : param rng                : numpy Generator to draw from (default value: None, the global numpy random state) 
+    : param sampler            : 'random' (pseudo-random numbers) or 'sobol' (scrambled Sobol points with Brownian bridge). With 'sobol' the shocks of a whole chunk are drawn at once (default value: 'random') 
+    : param dtype              : Floating point type of the simulation (default value: numpy.float64) 
+    : returns                  : Generator of dictionaries mapping each feature to a numpy array with its value on each path of the chunk 
+    """
+    for feature in features: 
+        if feature not in payOffs.FEATURES: 
+            raise ValueError("Please choose features from " + str(payOffs.FEATURES))
+
+    # With exact sampling the terminal price only needs a single draw over the whole maturity
+    if integration_method == 'exact' and set(features) <= {'terminal'}: 
+        num_steps = 1 
+
+    delta_t = T/num_steps 
+    draw = qmc.shock_sampler(num_steps, sampler = sampler, rng = rng) if sampler != 'random' else None 
+    rng = np.random if rng is None else rng 
+
+    for start in range(0, num_simulations, chunk_size): 
+        n = min(chunk_size, num_simulations - start)
+        shape = (2, n) if ant_variates else (n,)
+
+        # Buffers of the chunk, reused at every step: prices before and after the step, increments and work 
+        S = np.full(shape, S_0, dtype = dtype)
+        S_next = np.empty(shape, dtype = dtype) 
+        dW = np.empty(shape, dtype = dtype) 
+        work = np.empty(shape, dtype = dtype) 
+        # Shocks are drawn in float64, so a seeded stream gives the same normals for every dtype 
+        Z_j = (dW[0] if ant_variates else dW) if dW.dtype == np.float64 else np.empty(n) 
+        acc = payOffs.init_features(S, features)
+        if draw is not None: 
+            Z = draw(n)[0]
+
+        for j in range(num_steps): 
+            if draw is None: 
+                qmc.fill_normals(rng, Z_j)
+                if Z_j.dtype != dW.dtype: 
+                    dW[0 if ant_variates else slice(None)] = Z_j
+            else: 
+                dW[0 if ant_variates else slice(None)] = Z[:,j]
             if ant_variates: 
-                ant_y_hat = S[:,j] + r*S[:,j]*delta_t + sigma*np.sqrt(delta_t) 
-                ant_rk_term = (W[:,j]**2 - delta_t) * sigma*(y_hat - ant_S[:,j])/(2*np.sqrt(delta_t))
-                ant_S[:,j+1] = ant_S[:,j] + deterministic_term + random_term + rk_term
-            
-        else: 
-            raise ValueError("Please choose an appropiate SDE integration method (Euler ('E'), Milstein('M') or Rudge-Kutta('RK'))")
+                np.negative(dW[0], out = dW[1])
+            dW *= np.sqrt(delta_t) 
+            _step(S, dW, r, sigma, delta_t, integration_method, out = S_next)
+            S, S_next = S_next, S 
+            payOffs.update_features(acc, S, features, work = work)
 
-        if ant_variates: 
-            return np.vstack((S, ant_S)) 
-    return S
+        yield payOffs.finish_features(acc, S, num_steps, features)
+
+
+def _features_chunk(n, seed_seq, r, sigma, S_0, K, num_steps, T, call_or_put, payOff_features, features, integration_method, ant_variates, sampler, control = None, dtype = np.float64): 
+    """
+    Simulate one chunk of paths with its own random stream and sum its payoffs (see parallel.run_chunks) 
+
+    : param n        : Number of paths of the chunk 
+    : param seed_seq : numpy SeedSequence of the chunk 
+    : return         : running sums, as in payOffs.payOff_sums (or controls.cv_sums if a control is given) 
+    """
+    chunks = GBM_chunks(r, sigma, S_0, num_steps, T, num_simulations = n, integration_method = integration_method, ant_variates = ant_variates, chunk_size = n, features = features, rng = np.random.default_rng(seed_seq), sampler = sampler, dtype = dtype)
+    if control is None: 
+        return payOffs.payOff_sums(chunks, payOff_features, K, call_or_put)
+    return controls.cv_sums(chunks, payOff_features, K, call_or_put, control)
+
+def _paths_chunk(n, seed_seq, r, sigma, S_0, K, num_steps, T, call_or_put, payOff, integration_method, ant_variates, sampler, control = None, dtype = np.float64): 
+    """
+    Simulate one chunk of full paths with its own random stream and sum the payoffs of any payoff function 
+
+    : param n        : Number of paths of the chunk 
+    : param seed_seq : numpy SeedSequence of the chunk 
+    : return         : running sums, as in payOffs.payOff_sums (or controls.cv_sums if a control is given) 
+    """
+    S = GBM(r, sigma, S_0, num_steps, T, num_simulations = n, integration_method = integration_method, ant_variates = ant_variates, sampler = sampler, 
+            rng = np.random.default_rng(seed_seq), dtype = dtype)
+    Y = payOff(S, K, call_or_put).astype(np.float64, copy = False) 
+    X = None if control is None else control['values'](payOffs.path_features(S, control['features'])).astype(np.float64, copy = False) 
+    if ant_variates: 
+        Y = (Y[:n] + Y[n:])/2 
+        X = None if X is None else (X[:n] + X[n:])/2 
+    if X is None: 
+        return Y.size, np.sum(Y), np.sum(Y**2) 
+    return Y.size, np.sum(Y), np.sum(Y**2), np.sum(X), np.sum(X**2), np.sum(X*Y) 
+
+def _control(control, r, sigma, S_0, K, num_steps, T, call_or_put): 
+    """
+    Build a control variate from its name, or return it unchanged if it is already a control dictionary 
+
+    : param control : None, 'terminal', 'european', 'geometric' or a control dictionary (see controls.py) 
+    : return        : Control dictionary or None 
+    """
+    if control is None or isinstance(control, dict): 
+        return control 
+    elif control == 'terminal': 
+        return controls.terminal_control(r, S_0, T) 
+    elif control == 'european': 
+        return controls.european_control(r, sigma, S_0, K, T, 'P' if call_or_put in ('P', 'PP') else 'C') 
+    elif control == 'geometric': 
+        return controls.geometric_asian_control(r, sigma, S_0, K, T, num_steps, call_or_put) 
+    else: 
+        raise ValueError("Please choose an appropiate control variate ('terminal', 'european' or 'geometric')") 
+
+def _price_features(r, sigma, S_0, K, num_steps, T, call_or_put, payOff_features, features, num_simulations, integration_method, ant_variates, seed, num_workers, sampler, control = None, dtype = np.float64): 
+    """
+    Computes the discounted mean payoff and its standard error from streamed path features 
+
+    Without seed and with a single worker the global numpy random state is used, otherwise 
+    the simulation is split in chunks with independent random streams (see parallel.run_chunks) 
+
+    : return : Value of the option, standard error 
+    """
+    control = _control(control, r, sigma, S_0, K, num_steps, T, call_or_put) 
+    if control is not None: 
+        features = tuple(set(features) | set(control['features'])) 
+
+    if seed is None and num_workers == 1: 
+        chunks = GBM_chunks(r, sigma, S_0, num_steps, T, num_simulations = num_simulations, integration_method = integration_method, ant_variates = ant_variates, features = features, sampler = sampler, dtype = dtype)
+        if control is None: 
+            mean, std_error = payOffs.stream_payOff(chunks, payOff_features, K, call_or_put)
+        else: 
+            mean, std_error = controls.stream_cv_payOff(chunks, payOff_features, K, call_or_put, control)
+    else: 
+        chunk_fn = functools.partial(_features_chunk, r = r, sigma = sigma, S_0 = S_0, K = K, num_steps = num_steps, T = T, call_or_put = call_or_put, 
+                                     payOff_features = payOff_features, features = features, integration_method = integration_method, ant_variates = ant_variates, sampler = sampler, control = control, 
+                                     dtype = dtype)
+        if control is None: 
+            finish = payOffs.mean_std_error 
+        else: 
+            finish = functools.partial(controls.cv_mean_std_error, control_mean = control['mean']) 
+        mean, std_error = parallel.run_chunks(chunk_fn, num_simulations, seed = seed, num_workers = num_workers, finish = finish)
+    return np.exp(-r*T)*mean, np.exp(-r*T)*std_error
 
 
-    
 #This function uses the paths generated by the previous function to price european options through 
-def eu_GBM(r, sigma, S_0, K, num_steps, T, call_or_put, num_simulations = 10000, integration_method = 'E', ant_variates = False): 
+def eu_GBM(r, sigma, S_0, K, num_steps, T, call_or_put, num_simulations = 10000, integration_method = 'exact', ant_variates = False, seed = None, num_workers = 1, sampler = 'random', control = None, 
+           dtype = np.float64): 
     """
     Computes the value of an European option under GBM using Monte Carlo method 
 
@@ -88,19 +288,21 @@ def eu_GBM(r, sigma, S_0, K, num_steps, T, call_or_put, num_simulations = 10000,
     : param T                   : Maturity 
     : param call_or_put         : Whether the option is a call ('C') or a put ('P') 
     : param num_simulations     : Number of paths generated for MC 
-    : param integration_method  : SDE integration method to be used in the generation of paths (Euler-Maruyama ('E'), Milstein ('M') or Runge-Kutta ('RK')) 
+    : param integration_method  : SDE integration method to be used in the generation of paths (Euler-Maruyama ('E'), Milstein ('M'), Runge-Kutta ('RK') or exact sampling ('exact')) (default value: 'exact')
     : param ant_variates        : Boolean indicating whether antithetic variates are to be used
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol' (default value: 'random') 
+    : param control             : Control variate: 'terminal', 'european' or a control dictionary from controls.py (default value: None) 
+    : param dtype               : Floating point type of the simulation, numpy.float32 or numpy.float64 (default value: numpy.float64) 
     : returns                   : Value of the option 
     
     """
-
-    
-    S = GBM(r, sigma, S_0, num_steps, T, num_simulations = num_simulations, integration_method = 'E', ant_variates = False)
-    Vs = payOffs.EuPayOff(S, K, call_or_put)
-    V = np.exp(-r*T)*np.mean(Vs) 
+    V, std_error = _price_features(r, sigma, S_0, K, num_steps, T, call_or_put, payOffs.EuPayOffFeatures, ('terminal',), num_simulations, integration_method, ant_variates, seed, num_workers, sampler, control, dtype)
     return V 
 
-def as_GBM(r, sigma, S_0, K, num_steps, T, put_or_call, num_simulations = 10000, integration_method = 'E', ant_variates = False):
+def as_GBM(r, sigma, S_0, K, num_steps, T, put_or_call, num_simulations = 10000, integration_method = 'exact', ant_variates = False, seed = None, num_workers = 1, sampler = 'random', control = None, 
+           dtype = np.float64):
 
     """
     Computes the value of an Asian option under GBM using Monte Carlo method 
@@ -113,15 +315,150 @@ def as_GBM(r, sigma, S_0, K, num_steps, T, put_or_call, num_simulations = 10000,
     : param T                   : Maturity 
     : param call_or_put         : Whether the option is a Price call('PC'), a price put ('PP'), a strike call ('SC') or a strike put ('SP') 
     : param num_simulations     : Number of paths generated for MC 
-    : param integration_method  : SDE integration method to be used in the generation of paths (Euler-Maruyama ('E'), Milstein ('M') or Runge-Kutta ('RK')) 
+    : param integration_method  : SDE integration method to be used in the generation of paths (Euler-Maruyama ('E'), Milstein ('M'), Runge-Kutta ('RK') or exact sampling ('exact')) (default value: 'exact')
     : param ant_variates        : Boolean indicating whether antithetic variates are to be used
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol' (default value: 'random') 
+    : param control             : Control variate: 'geometric' (price calls and puts only), 'terminal', 'european' or a control dictionary from controls.py (default value: None) 
+    : param dtype               : Floating point type of the simulation, numpy.float32 or numpy.float64 (default value: numpy.float64) 
     : returns                   : Value of the option 
     """
-    
-    S  = GBM(r, sigma, S_0, num_steps, T, num_simulations = num_simulations, integration_method = 'E', ant_variates = False)
-    Vs = payOffs.AsPayOff(S, K, call_or_put) 
-    V  = np.exp(-r*T)*np.mean(Vs) 
+    V, std_error = _price_features(r, sigma, S_0, K, num_steps, T, put_or_call, payOffs.AsPayOffFeatures, ('terminal', 'average'), num_simulations, integration_method, ant_variates, seed, num_workers, sampler, control, dtype)
     return V 
 
+def adaptive_GBM(r, sigma, S_0, K, num_steps, T, call_or_put, payOff = payOffs.EuPayOff, target_std_error = None, target_rel_error = None, time_budget = None, 
+                 batch_size = 10000, max_simulations = 10**7, integration_method = 'exact', ant_variates = False, sampler = 'random', control = None, seed = None, dtype = np.float64): 
+    """
+    Computes the value of an option under GBM simulating in batches until a target standard error or a time budget is reached 
+
+    : param r                   : Risk-free interest rate 
+    : param sigma               : Volatility 
+    : param S_0                 : Spot price
+    : param K                   : Strike price 
+    : param num_steps           : Number of steps on the generation of paths
+    : param T                   : Maturity 
+    : param call_or_put         : Type of option, as in payOff 
+    : param payOff              : Payoff function of the paths. Payoffs in payOffs.STREAMING_PAYOFFS are evaluated without storing the paths (default value: payOffs.EuPayOff) 
+    : param target_std_error    : Stop when the standard error of the price is below this value (default value: None) 
+    : param target_rel_error    : Stop when the standard error relative to the price is below this value (default value: None) 
+    : param time_budget         : Stop when this many seconds have elapsed (default value: None) 
+    : param batch_size          : Number of paths per batch (default value: 10000) 
+    : param max_simulations     : Maximum number of paths (default value: 10**7) 
+    : param integration_method  : SDE integration method, as in GBM (default value: 'exact') 
+    : param ant_variates        : Boolean indicating whether antithetic variates are to be used
+    : param sampler             : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+    : param control             : Control variate, as in as_GBM (default value: None) 
+    : param seed                : Seed for reproducible results (default value: None) 
+    : param dtype               : Floating point type of the simulation (default value: numpy.float64) 
+    : returns                   : Dictionary with 'price', 'std_error', 'conf_int', 'num_simulations', 'elapsed' and 'converged' (see adaptive.run_adaptive) 
+    """
+    control = _control(control, r, sigma, S_0, K, num_steps, T, call_or_put) 
+
+    if payOff in payOffs.STREAMING_PAYOFFS: 
+        payOff_features, features = payOffs.STREAMING_PAYOFFS[payOff] 
+        if control is not None: 
+            features = tuple(set(features) | set(control['features'])) 
+        batch_fn = functools.partial(_features_chunk, r = r, sigma = sigma, S_0 = S_0, K = K, num_steps = num_steps, T = T, call_or_put = call_or_put, 
+                                     payOff_features = payOff_features, features = features, integration_method = integration_method, ant_variates = ant_variates, sampler = sampler, control = control, 
+                                     dtype = dtype)
+    else: 
+        batch_fn = functools.partial(_paths_chunk, r = r, sigma = sigma, S_0 = S_0, K = K, num_steps = num_steps, T = T, call_or_put = call_or_put, 
+                                     payOff = payOff, integration_method = integration_method, ant_variates = ant_variates, sampler = sampler, control = control, dtype = dtype)
+
+    if control is None: 
+        finish = payOffs.mean_std_error 
+    else: 
+        finish = functools.partial(controls.cv_mean_std_error, control_mean = control['mean']) 
+
+    return adaptive.run_adaptive(batch_fn, target_std_error = target_std_error, target_rel_error = target_rel_error, time_budget = time_budget, batch_size = batch_size, 
+                                 max_simulations = max_simulations, seed = seed, finish = finish, discount = np.exp(-r*T)) 
+
+
+def _multi_chunk(n, seed_seq, r, sigma, S_0, num_steps, T, spec, integration_method, ant_variates, sampler, dtype = np.float64): 
+    """
+    Simulate one chunk of paths with its own random stream and sum the payoffs of every contract of a spec (see parallel.run_chunks) 
+
+    : return : running sums, as in payOffs.multi_payOff_sums 
+    """
+    chunks = GBM_chunks(r, sigma, S_0, num_steps, T, num_simulations = n, integration_method = integration_method, ant_variates = ant_variates, chunk_size = n, 
+                        features = payOffs.spec_features(spec), rng = np.random.default_rng(seed_seq), sampler = sampler, dtype = dtype)
+    return payOffs.multi_payOff_sums(chunks, spec) 
+
+def multi_GBM(r, sigma, S_0, num_steps, T, spec, num_simulations = 10000, integration_method = 'exact', ant_variates = False, seed = None, num_workers = 1, sampler = 'random', 
+              dtype = np.float64): 
+    """
+    Computes the values of many options on the same underlying under GBM from a single set of paths 
+
+    The path features needed by the spec are accumulated once, so pricing a whole strike chain costs 
+    about as much as pricing one option 
+
+    : param r                   : Risk-free interest rate 
+    : param sigma               : Volatility 
+    : param S_0                 : Spot price
+    : param num_steps           : Number of steps on the generation of paths
+    : param T                   : Maturity 
+    : param spec                : List of (payOff, K, call_or_put) contracts, e.g. from payOffs.strike_ladder 
+    : param num_simulations     : Number of paths generated for MC (default value: 10000) 
+    : param integration_method  : SDE integration method, as in GBM (default value: 'exact') 
+    : param ant_variates        : Boolean indicating whether antithetic variates are to be used
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+    : param dtype               : Floating point type of the simulation (default value: numpy.float64) 
+    : returns                   : numpy array with the value of each contract, numpy array with their standard errors 
+    """
+    features = payOffs.spec_features(spec) 
+    if seed is None and num_workers == 1: 
+        chunks = GBM_chunks(r, sigma, S_0, num_steps, T, num_simulations = num_simulations, integration_method = integration_method, ant_variates = ant_variates, features = features, sampler = sampler, 
+                            dtype = dtype)
+        mean, std_error = payOffs.stream_multi_payOff(chunks, spec) 
+    else: 
+        chunk_fn = functools.partial(_multi_chunk, r = r, sigma = sigma, S_0 = S_0, num_steps = num_steps, T = T, spec = spec, integration_method = integration_method, 
+                                     ant_variates = ant_variates, sampler = sampler, dtype = dtype)
+        mean, std_error = parallel.run_chunks(chunk_fn, num_simulations, seed = seed, num_workers = num_workers) 
+    return np.exp(-r*T)*mean, np.exp(-r*T)*std_error 
+
+
+def _lsm_step(S, v, Z, delta_t, r, sigma, integration_method): 
+    return _step(S, np.sqrt(delta_t)*Z[0], r, sigma, delta_t, integration_method), None 
+
+def lsm_model(r, sigma, S_0, integration_method = 'exact'): 
+    """
+    Describe GBM as a model for least squares Monte Carlo (see lsm.py) 
+
+    : param r                  : The drift 
+    : param sigma              : The volatility 
+    : param S_0                : The initial price 
+    : param integration_method : SDE integration method, as in GBM (default value: 'exact') 
+    : return                   : Model dictionary 
+    """
+    step = functools.partial(_lsm_step, r = r, sigma = sigma, integration_method = integration_method) 
+    return {'r': r, 'S_0': S_0, 'v_0': None, 'num_factors': 1, 'step': step} 
 
+def am_GBM(r, sigma, S_0, K, num_steps, T, call_or_put, num_simulations = 10000, num_exercise = None, num_fit = 10000, degree = 3, basis = 'laguerre', 
+           integration_method = 'exact', seed = None, num_workers = 1, sampler = 'random'): 
+    """
+    Computes the value of an American option under GBM using the Longstaff-Schwartz method 
 
+    : param r                   : Risk-free interest rate 
+    : param sigma               : Volatility 
+    : param S_0                 : Spot price
+    : param K                   : Strike price 
+    : param num_steps           : Number of steps on the generation of paths
+    : param T                   : Maturity 
+    : param call_or_put         : Whether the option is a call ('C') or a put ('P') 
+    : param num_simulations     : Number of pricing paths (default value: 10000) 
+    : param num_exercise        : Number of exercise dates, num_steps has to be a multiple of it (default value: None, every step) 
+    : param num_fit             : Number of paths to fit the exercise rule (default value: 10000) 
+    : param degree              : Degree of the regression polynomials (default value: 3) 
+    : param basis               : 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+    : param integration_method  : SDE integration method, as in GBM (default value: 'exact') 
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol' (default value: 'random') 
+    : returns                   : Value of the option 
+    """
+    model = lsm_model(r, sigma, S_0, integration_method = integration_method) 
+    return lsm.longstaff_schwartz(model, K, T, call_or_put, num_steps, num_exercise = num_exercise, num_simulations = num_simulations, num_fit = num_fit, 
+                                  degree = degree, basis = basis, seed = seed, num_workers = num_workers, sampler = sampler)['price'] 
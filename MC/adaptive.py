@@ -0,0 +1,62 @@
+import time 
+from statistics import NormalDist 
+
+import numpy as np 
+
+import payOffs 
+
+
+def run_adaptive(batch_fn, target_std_error = None, target_rel_error = None, time_budget = None, batch_size = 10000, max_simulations = 10**7, 
+                 seed = None, finish = payOffs.mean_std_error, discount = 1.0, confidence = 0.95): 
+    """
+    Run a Monte Carlo simulation in batches until a target standard error or a time budget is reached 
+
+    Batch i always gets the i-th child of SeedSequence(seed), so for a given seed the paths 
+    used do not depend on when the simulation stops. At least two batches are run. 
+
+    : param batch_fn         : Function taking (number of simulations, numpy SeedSequence) and returning a tuple of running sums, as in parallel.run_chunks 
+    : param target_std_error : Stop when the standard error of the price is below this value (default value: None) 
+    : param target_rel_error : Stop when the standard error relative to the price is below this value (default value: None) 
+    : param time_budget      : Stop when this many seconds have elapsed (default value: None) 
+    : param batch_size       : Number of simulations per batch (default value: 10000) 
+    : param max_simulations  : Maximum number of simulations (default value: 10**7) 
+    : param seed             : Seed of the root SeedSequence (default value: None, fresh entropy) 
+    : param finish           : Function turning the combined sums into mean and standard error (default value: payOffs.mean_std_error) 
+    : param discount         : Factor applied to the mean and standard error (default value: 1.0) 
+    : param confidence       : Level of the confidence interval (default value: 0.95) 
+    : return                 : Dictionary with 'price', 'std_error', 'conf_int', 'num_simulations', 'elapsed' and 'converged' (True if a target error was reached) 
+    """
+    if target_std_error is None and target_rel_error is None and time_budget is None: 
+        raise ValueError("Please choose at least one of target_std_error, target_rel_error or time_budget") 
+
+    start  = time.perf_counter() 
+    seeds  = np.random.SeedSequence(seed) 
+    totals = None 
+    num_simulations, num_batches = 0, 0 
+    converged = False 
+
+    while num_simulations < max_simulations: 
+        n = min(batch_size, max_simulations - num_simulations) 
+        sums = batch_fn(n, seeds.spawn(1)[0]) 
+        totals = list(sums) if totals is None else [t + s for t, s in zip(totals, sums)] 
+        num_simulations += n 
+        num_batches     += 1 
+
+        mean, std_error = finish(*totals) 
+        mean, std_error = discount*mean, discount*std_error 
+        if num_batches < 2: 
+            continue 
+        if (target_std_error is not None and std_error <= target_std_error) or \
+           (target_rel_error is not None and std_error <= target_rel_error*abs(mean)): 
+            converged = True 
+            break 
+        if time_budget is not None and time.perf_counter() - start >= time_budget: 
+            break 
+
+    z = NormalDist().inv_cdf((1 + confidence)/2) 
+    return {'price'           : mean, 
+            'std_error'       : std_error, 
+            'conf_int'        : (mean - z*std_error, mean + z*std_error), 
+            'num_simulations' : num_simulations, 
+            'elapsed'         : time.perf_counter() - start, 
+            'converged'       : converged} 
@@ -0,0 +1,141 @@
+import threading 
+from collections import OrderedDict 
+
+import numpy as np 
+
+
+def seed_key(seed): 
+    """
+    Hashable key of a seed (an integer, a sequence of integers or a numpy SeedSequence) 
+    """
+    if isinstance(seed, np.random.SeedSequence): 
+        return ('SeedSequence', seed.entropy, seed.spawn_key) 
+    if isinstance(seed, (list, tuple, np.ndarray)): 
+        return tuple(int(s) for s in seed) 
+    return seed 
+
+
+def _nbytes(value): 
+    """
+    Count the bytes of the numpy arrays of a cached value, looking into tuples and lists 
+
+    : param value : Value to measure 
+    : return      : Number of bytes, 0 for values that are not arrays 
+    """
+    if isinstance(value, np.ndarray): 
+        return value.nbytes 
+    if isinstance(value, (tuple, list)): 
+        return sum(_nbytes(v) for v in value) 
+    return 0 
+
+
+def _freeze(value): 
+    """
+    Make the numpy arrays of a value read-only, looking into tuples and lists 
+
+    Cached arrays are shared between every caller asking for the same key, so an in-place 
+    change by one of them would silently alter the results of the others. Callers that need 
+    to modify a cached array have to copy it. 
+
+    : param value : Value to store 
+    : return      : The same value, with its arrays read-only 
+    """
+    if isinstance(value, np.ndarray): 
+        value.setflags(write = False) 
+    elif isinstance(value, (tuple, list)): 
+        for v in value: 
+            _freeze(v) 
+    return value 
+
+
+class PathCache: 
+    def __init__(self, max_bytes = 256*2**20): 
+        """
+        Least recently used cache of simulated path sets under a memory budget 
+
+        Values are numpy arrays or tuples of them, stored read-only. The cache can be shared between 
+        threads: lookups and insertions hold a lock, while missing values are computed outside it 
+        (two threads missing the same key at once may both compute it, the first one is kept). 
+
+        : param max_bytes : Memory budget in bytes. Values larger than the budget are not stored (default value: 256 MiB) 
+        """
+        self.max_bytes = max_bytes 
+        self._entries  = OrderedDict() 
+        self._lock     = threading.Lock() 
+        self.nbytes    = 0 
+        self.hits      = 0 
+        self.misses    = 0 
+        self.evictions = 0 
+
+    def get(self, key, compute): 
+        """
+        Get the value of a key, computing and storing it if it is not cached 
+
+        : param key     : Hashable key 
+        : param compute : Function without arguments returning the value 
+        : return        : Cached or computed value 
+        """
+        with self._lock: 
+            if key in self._entries: 
+                self._entries.move_to_end(key) 
+                self.hits += 1 
+                return self._entries[key] 
+            self.misses += 1 
+
+        value = _freeze(compute()) 
+        size = _nbytes(value) 
+
+        with self._lock: 
+            if key in self._entries: 
+                return self._entries[key] 
+            if size > self.max_bytes: 
+                return value 
+            self._entries[key] = value 
+            self.nbytes += size 
+            self._evict() 
+        return value 
+
+    def _evict(self): 
+        while self.nbytes > self.max_bytes: 
+            key, value = self._entries.popitem(last = False) 
+            self.nbytes -= _nbytes(value) 
+            self.evictions += 1 
+
+    def resize(self, max_bytes): 
+        """
+        Change the memory budget, evicting the least recently used path sets if needed 
+        """
+        with self._lock: 
+            self.max_bytes = max_bytes 
+            self._evict() 
+
+    def clear(self): 
+        """
+        Remove every path set and reset the statistics 
+        """
+        with self._lock: 
+            self._entries.clear() 
+            self.nbytes = self.hits = self.misses = self.evictions = 0 
+
+    def stats(self): 
+        """
+        Usage statistics of the cache 
+
+        : return : Dictionary with 'hits', 'misses', 'hit_rate', 'evictions', 'entries', 'nbytes' and 'max_bytes' 
+        """
+        with self._lock: 
+            lookups = self.hits + self.misses 
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits/lookups if lookups else 0.0, 'evictions': self.evictions, 
+                    'entries': len(self._entries), 'nbytes': self.nbytes, 'max_bytes': self.max_bytes} 
+
+
+# Cache shared by the pricers of the package. Only simulations with a given seed are cached, as 
+# simulations drawing from fresh randomness are not meant to be repeatable. 
+PATH_CACHE = PathCache() 
+
+
+def cached(key, compute): 
+    """
+    Get a value from the shared path cache (see PathCache.get) 
+    """
+    return PATH_CACHE.get(key, compute) 
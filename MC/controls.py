@@ -0,0 +1,166 @@
+import functools 
+import os 
+import sys 
+
+import numpy as np 
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'BlackScholes')) 
+import BlackScholes 
+from special import norm_cdf 
+
+
+# A control is a dictionary with the path features it needs ('features'), a function returning 
+# its undiscounted value on each path from those features ('values') and its known expectation ('mean'). 
+# Functions are module level partials so that controls can be sent to worker processes. 
+
+def _terminal_values(F): 
+    return F['terminal'] 
+
+def _call_put_values(F, feature, K, call_or_put): 
+    if call_or_put in ('C', 'PC'): 
+        return np.maximum(F[feature] - K, 0) 
+    else: 
+        return np.maximum(K - F[feature], 0) 
+
+
+def terminal_control(r, S_0, T): 
+    """
+    Control variate given by the terminal stock price under GBM 
+
+    : param r   : Risk-free interest rate 
+    : param S_0 : Spot price 
+    : param T   : Maturity 
+    : return    : Control dictionary 
+    """
+    return {'features': ('terminal',), 'values': _terminal_values, 'mean': S_0*np.exp(r*T)} 
+
+
+def european_control(r, sigma, S_0, K, T, call_or_put): 
+    """
+    Control variate given by an European option under GBM, whose value is given by BlackScholes.BSprice 
+
+    : param r           : Risk-free interest rate 
+    : param sigma       : Volatility 
+    : param S_0         : Spot price 
+    : param K           : Strike price 
+    : param T           : Maturity 
+    : param call_or_put : Whether the control is a call ('C') or a put ('P') 
+    : return            : Control dictionary 
+    """
+    if call_or_put not in ('C', 'P'): 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P')") 
+    mean = BlackScholes.BSprice(r, sigma, S_0, K, T, call_or_put)*np.exp(r*T) 
+    return {'features': ('terminal',), 'values': functools.partial(_call_put_values, feature = 'terminal', K = K, call_or_put = call_or_put), 'mean': mean} 
+
+
+def geometric_asian_control(r, sigma, S_0, K, T, num_steps, call_or_put): 
+    """
+    Control variate given by a geometric Asian option under GBM, with closed form value 
+
+    The geometric average uses the same trapezoidal weights as the 'geometric' path feature, so 
+    its logarithm is normal with mean and variance computed from the weights. 
+
+    : param r           : Risk-free interest rate 
+    : param sigma       : Volatility 
+    : param S_0         : Spot price 
+    : param K           : Strike price 
+    : param T           : Maturity 
+    : param num_steps   : Number of steps of the paths 
+    : param call_or_put : Whether the control is a price call ('PC') or a price put ('PP') 
+    : return            : Control dictionary 
+    """
+    if call_or_put not in ('PC', 'PP'): 
+        raise ValueError("Please choose an appropiate value for call_or_put (Price call ('PC') or Price put ('PP'))") 
+
+    delta_t = T/num_steps 
+    t = delta_t*np.arange(num_steps + 1) 
+    w = np.full(num_steps + 1, 1/num_steps) 
+    w[0] = w[-1] = 1/(2*num_steps) 
+
+    # log G = sum_i w_i log S_{t_i}, and the k-th Wiener increment enters with weight sum_{i >= k} w_i 
+    mu  = np.log(S_0) + (r - sigma**2/2)*np.sum(w*t) 
+    var = sigma**2*delta_t*np.sum(np.cumsum(w[::-1])[:-1]**2) 
+
+    d_1 = (mu - np.log(K) + var)/np.sqrt(var) 
+    d_2 = d_1 - np.sqrt(var) 
+    if call_or_put == 'PC': 
+        mean = np.exp(mu + var/2)*norm_cdf(d_1) - K*norm_cdf(d_2) 
+    else: 
+        mean = K*norm_cdf(-d_2) - np.exp(mu + var/2)*norm_cdf(-d_1) 
+    return {'features': ('geometric',), 'values': functools.partial(_call_put_values, feature = 'geometric', K = K, call_or_put = call_or_put), 'mean': mean} 
+
+
+def cv_sums(chunks, payOff_features, K, call_or_put, control): 
+    """
+    Calculate the running sums needed by the control variate estimator over chunks of path features 
+
+    Feature arrays with a leading axis of size 2 (antithetic variates) are averaged pairwise first. 
+
+    : param chunks          : Iterable of dictionaries of path features 
+    : param payOff_features : Payoff function taking path features (e.g. payOffs.AsPayOffFeatures) 
+    : param K               : Strike price 
+    : param call_or_put     : Type of option, as in payOff_features 
+    : param control         : Control dictionary 
+    : return                : n, sum Y, sum Y^2, sum X, sum X^2, sum XY, for payoffs Y and controls X 
+    """
+    n, s_y, s_yy, s_x, s_xx, s_xy = 0, 0.0, 0.0, 0.0, 0.0, 0.0 
+    for F in chunks: 
+        Y = payOff_features(F, K, call_or_put).astype(np.float64, copy = False) 
+        X = control['values'](F).astype(np.float64, copy = False) 
+        if Y.ndim == 2: 
+            Y = Y.mean(axis = 0) 
+            X = X.mean(axis = 0) 
+        n    += Y.size 
+        s_y  += np.sum(Y) 
+        s_yy += np.sum(Y**2) 
+        s_x  += np.sum(X) 
+        s_xx += np.sum(X**2) 
+        s_xy += np.sum(X*Y) 
+    return n, s_y, s_yy, s_x, s_xx, s_xy 
+
+
+def cv_mean_std_error(n, s_y, s_yy, s_x, s_xx, s_xy, control_mean): 
+    """
+    Calculate the control variate estimate and its standard error from running sums 
+
+    The coefficient b = Cov(X, Y)/Var(X) is estimated from the same paths 
+
+    : param n, s_y, s_yy, s_x, s_xx, s_xy : Running sums (see cv_sums) 
+    : param control_mean                  : Known expectation of the control 
+    : return                              : adjusted mean, standard error 
+    """
+    mean_y, mean_x = s_y/n, s_x/n 
+    var_y  = s_yy/n - mean_y**2 
+    var_x  = s_xx/n - mean_x**2 
+    cov_xy = s_xy/n - mean_x*mean_y 
+    b = cov_xy/var_x if var_x > 0 else 0.0 
+
+    mean = mean_y - b*(mean_x - control_mean) 
+    var  = max(var_y - 2*b*cov_xy + b**2*var_x, 0)*n/max(n-1, 1) 
+    return mean, np.sqrt(var/n) 
+
+
+def cv_estimate(Y, X, control_mean): 
+    """
+    Calculate the control variate estimate and its standard error from per-path values 
+
+    : param Y            : Numpy array with the payoff of each path 
+    : param X            : Numpy array with the control of each path 
+    : param control_mean : Known expectation of the control 
+    : return             : adjusted mean, standard error 
+    """
+    return cv_mean_std_error(Y.size, np.sum(Y), np.sum(Y**2), np.sum(X), np.sum(X**2), np.sum(X*Y), control_mean) 
+
+
+def stream_cv_payOff(chunks, payOff_features, K, call_or_put, control): 
+    """
+    Calculate the control variate estimate of the mean payoff and its standard error over chunks of path features 
+
+    : param chunks          : Iterable of dictionaries of path features 
+    : param payOff_features : Payoff function taking path features 
+    : param K               : Strike price 
+    : param call_or_put     : Type of option, as in payOff_features 
+    : param control         : Control dictionary 
+    : return                : adjusted mean payoff, standard error 
+    """
+    return cv_mean_std_error(*cv_sums(chunks, payOff_features, K, call_or_put, control), control_mean = control['mean']) 
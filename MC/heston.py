@@ -1,13 +1,147 @@
+import functools 
+import os 
+import sys 
+
 import numpy as np
-import PayOffs 
+import payOffs 
+import parallel
+import qmc
+import cache
+import adaptive
+import lsm
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'BlackScholes')) 
+from special import norm_cdf 
+
+
+PSI_C = 1.5 
 
 
-def heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = 0, num_simulations = 10000): 
+def _euler_step(S, v, Z_S, Z_v, r, kappa, theta, xi, corr_index, delta_t, out = None, work = None): 
+    """
+    Advance Heston paths by one full truncation Euler-Maruyama step 
+
+    The step is evaluated in place in the output and work buffers, without temporaries 
+
+    : param S, v       : Numpy arrays with the current prices and variances 
+    : param Z_S, Z_v   : Numpy arrays of independent standard normal shocks 
+    : param r          : The drift 
+    : param kappa      : Kappa parameter in Heston model 
+    : param theta      : Theta parameter in Heston model 
+    : param xi         : Xi parameter in Heston model 
+    : param corr_index : Correlation index between the two Wiener processes 
+    : param delta_t    : Time step 
+    : param out        : Tuple of numpy arrays to write the prices and variances after the step to, which must not be S and v (default value: None, new arrays) 
+    : param work       : Tuple of two numpy arrays like S used as scratch space (default value: None, new arrays) 
+    : returns          : Numpy arrays with the prices and variances after the step 
+    """
+    S_next, v_next = (np.empty_like(S), np.empty_like(v)) if out is None else out 
+    sqrt_v, tmp = (np.empty_like(S), np.empty_like(S)) if work is None else work 
+    sqrt_dt = np.sqrt(delta_t) 
+
+    np.maximum(v, 0, out = sqrt_v) 
+    np.sqrt(sqrt_v, out = sqrt_v) 
+
+    # S_next = S*(1 + r*delta_t + sqrt(v)*dW_S) 
+    np.multiply(sqrt_v, Z_S, out = S_next) 
+    S_next *= sqrt_dt 
+    S_next += 1 + r*delta_t 
+    S_next *= S 
+
+    # v_next = v*(1 - kappa*delta_t) + kappa*theta*delta_t + xi*sqrt(v)*dW_v 
+    np.multiply(Z_S, corr_index*sqrt_dt, out = tmp) 
+    np.multiply(Z_v, np.sqrt(1-corr_index**2)*sqrt_dt, out = v_next) 
+    v_next += tmp 
+    v_next *= sqrt_v 
+    v_next *= xi 
+    np.multiply(v, 1 - kappa*delta_t, out = tmp) 
+    tmp += kappa*theta*delta_t 
+    v_next += tmp 
+    return S_next, v_next 
+
+
+def _qe_step(S, v, Z_S, Z_v, r, kappa, theta, xi, corr_index, delta_t, out = None, work = None): 
+    """
+    Advance Heston paths by one step of Andersen's quadratic-exponential scheme 
+
+    The variance is sampled from a moment matched quadratic normal (psi <= PSI_C) or exponential 
+    mixture (psi > PSI_C), and the log-price uses central discretization of the integrated variance 
+    with the drift correction that makes the discounted price a martingale. 
+
+    : param S, v       : Numpy arrays with the current prices and variances 
+    : param Z_S, Z_v   : Numpy arrays of independent standard normal shocks 
+    : param r          : The drift 
+    : param kappa      : Kappa parameter in Heston model 
+    : param theta      : Theta parameter in Heston model 
+    : param xi         : Xi parameter in Heston model 
+    : param corr_index : Correlation index between the two Wiener processes 
+    : param delta_t    : Time step 
+    : param out        : Tuple of numpy arrays to write the prices and variances after the step to (default value: None, new arrays) 
+    : param work       : Unused, for the signature of _euler_step 
+    : returns          : Numpy arrays with the prices and variances after the step 
+    """
+    exp_k = np.exp(-kappa*delta_t) 
+    m   = theta + (v - theta)*exp_k 
+    s2  = v*xi**2*exp_k*(1 - exp_k)/kappa + theta*xi**2*(1 - exp_k)**2/(2*kappa) 
+    psi = s2/m**2 
+    quadratic = psi <= PSI_C 
+
+    # Quadratic branch: v_next = a (b + Z_v)^2 
+    inv_psi = 2/np.where(quadratic, psi, 1) 
+    b2 = np.maximum(inv_psi - 1 + np.sqrt(inv_psi*np.maximum(inv_psi - 1, 0)), 0) 
+    a  = m/(1 + b2) 
+
+    # Exponential branch: v_next = 0 with probability p, exponential with rate beta otherwise 
+    p    = np.where(quadratic, 0, (psi - 1)/(psi + 1)) 
+    beta = (1 - p)/m 
+    U    = norm_cdf(Z_v) 
+    with np.errstate(divide = 'ignore', invalid = 'ignore'): 
+        v_exp = np.where(U <= p, 0, np.log((1 - p)/(1 - U))/beta) 
+    v_next = np.where(quadratic, a*(np.sqrt(b2) + Z_v)**2, v_exp) 
+
+    # Log-price step (gamma_1 = gamma_2 = 1/2) 
+    K_1 = delta_t/2*(kappa*corr_index/xi - 1/2) - corr_index/xi 
+    K_2 = delta_t/2*(kappa*corr_index/xi - 1/2) + corr_index/xi 
+    K_3 = delta_t/2*(1 - corr_index**2) 
+    A   = K_2 + K_3/2 
+
+    # Martingale correction of K_0 
+    with np.errstate(divide = 'ignore', invalid = 'ignore'): 
+        K_0_quad = -A*b2*a/(1 - 2*A*a) + np.log(1 - 2*A*a)/2 
+        K_0_exp  = -np.log(p + beta*(1 - p)/(beta - A)) 
+    K_0 = np.where(quadratic, K_0_quad, K_0_exp) - (K_1 + K_3/2)*v 
+
+    log_step = r*delta_t + K_0 + K_1*v + K_2*v_next + np.sqrt(K_3*(v + v_next))*Z_S 
+    if out is None: 
+        return S*np.exp(log_step), v_next 
+    S_next, v_out = out 
+    np.exp(log_step, out = S_next) 
+    S_next *= S 
+    v_out[...] = v_next 
+    return S_next, v_out 
+
+
+SCHEMES = {'E': _euler_step, 'QE': _qe_step} 
+
+
+def _scheme_step(scheme): 
+    """
+    Get the step function of a Heston integration scheme 
+
+    : param scheme : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) 
+    : returns      : Step function 
+    """
+    if scheme not in SCHEMES: 
+        raise ValueError("Please choose an appropiate scheme (Euler ('E') or quadratic-exponential ('QE'))") 
+    return SCHEMES[scheme] 
+
+
+def heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = 0, num_simulations = 10000, rng = None, sampler = 'random', scheme = 'E', seed = None, dtype = np.float64): 
     """
     Calculate sample paths of Heston model 
 
     : param r                  : The drift 
-    : param sigma_0            : The initial volatility 
+    : param sigma_0            : The initial variance 
     : param S_0                : The initial price 
     : param kappa              : Kappa parameter in Heston model 
     : param theta              : Theta parameter in Heston model 
@@ -16,33 +150,135 @@ def heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = 0, num_
     : param T                  : Time length of the generated path 
     : param corr_index         : Correlation index between the interest rate Wiener process and the volatility Wiener process
     : param num_simulations    : The number of paths generated (default value: 10000)  
+    : param rng                : numpy Generator to draw from (default value: None, the global numpy random state) 
+    : param sampler            : 'random' (pseudo-random numbers) or 'sobol' (scrambled Sobol points with Brownian bridge) (default value: 'random') 
+    : param scheme             : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param seed               : Seed or numpy SeedSequence, used instead of rng. Seeded path sets are kept in the shared path cache (see cache.py) and are read-only (default value: None) 
+    : param dtype              : Floating point type of the paths, numpy.float32 halves memory and bandwidth (default value: numpy.float64) 
     : returns                  : A numpy array containing the generated paths of both the prices and the volatility     
     
     """
+    if seed is not None: 
+        key = ('heston', r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index, num_simulations, sampler, scheme, cache.seed_key(seed), np.dtype(dtype).name) 
+        return cache.cached(key, lambda: heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = num_simulations, 
+                                                rng = np.random.default_rng(seed), sampler = sampler, scheme = scheme, dtype = dtype)) 
+
+    Z = qmc.shock_sampler(num_steps, num_factors = 2, sampler = sampler, rng = rng)(num_simulations)
+    return heston_paths(r, sigma_0, S_0, kappa, theta, xi, T, Z, corr_index = corr_index, scheme = scheme, dtype = dtype)
+
+
+def heston_paths(r, sigma_0, S_0, kappa, theta, xi, T, Z, corr_index = 0, scheme = 'E', dtype = np.float64): 
+    """
+    Calculate sample paths of Heston model from given standard normal shocks 
+
+    Reusing the same shocks with different parameters gives common random numbers 
 
+    : param r                  : The drift 
+    : param sigma_0            : The initial variance 
+    : param S_0                : The initial price 
+    : param kappa              : Kappa parameter in Heston model 
+    : param theta              : Theta parameter in Heston model 
+    : param xi                 ; Xi parameter in Heston model 
+    : param T                  : Time length of the generated path 
+    : param Z                  : Numpy array of independent standard normal shocks with shape (2, num_simulations, num_steps) 
+    : param corr_index         : Correlation index between the price Wiener process and the volatility Wiener process (default value: 0) 
+    : param scheme             : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param dtype              : Floating point type of the paths (default value: numpy.float64) 
+    : returns                  : A numpy array containing the generated paths of both the prices and the volatility     
+    """
+    step = _scheme_step(scheme) 
+    num_steps = Z.shape[2]
     delta_t = T/num_steps
 
-    S = np.zeros((num_simulations, num_steps +1))
-    v = np.zeros((num_simulations, num_steps +1))
-    W = np.sqrt(delta_t)*np.random.normal(0,1,(2,num_simulations, num_steps))
-    W[1,:] = corr_index*W[0,:] + np.sqrt(1-corr_index**2)*W[1,:]
+    S = np.empty((Z.shape[1], num_steps +1), dtype = dtype)
+    v = np.empty((Z.shape[1], num_steps +1), dtype = dtype)
+    work = (np.empty(Z.shape[1], dtype = dtype), np.empty(Z.shape[1], dtype = dtype)) 
+    # The shocks are cast one time step at a time, so no converted copy of the whole array is made 
+    Z_1, Z_2 = np.empty(Z.shape[1], dtype = dtype), np.empty(Z.shape[1], dtype = dtype) 
 
     S[:,0] = S_0
-    v[:,0] = v_0
+    v[:,0] = sigma_0
 
     for j in range(num_steps): 
-        S[:,j+1] = S[:,j] + r*S[:,j]*delta_t + np.sqrt(np.maximum(v[:,j],0))*S[:,j]*W[0,:,j]
-        v[:,j+1] = v[:,j] + kappa*(theta - v[:,j])*delta_t + xi*np.sqrt(np.maximum(v[:,j],0))*W[1,:,j]
+        Z_1[:], Z_2[:] = Z[0,:,j], Z[1,:,j] 
+        step(S[:,j], v[:,j], Z_1, Z_2, r, kappa, theta, xi, corr_index, delta_t, out = (S[:,j+1], v[:,j+1]), work = work)
     
     return (S,v)
 
 
-def eu_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, corr_index, num_simulations = 10000): 
+def heston_chunks(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = 0, num_simulations = 10000, scheme = 'E', chunk_size = 10000, features = ('terminal',), 
+                  rng = None, sampler = 'random', dtype = np.float64): 
+    """
+    Generate Heston paths in chunks and time steps without storing them, yielding path features of the prices 
+
+    Only the current price, variance and one accumulator per requested feature are kept for 
+    each path of the chunk. 
+
+    : param r                  : The drift 
+    : param sigma_0            : The initial variance 
+    : param S_0                : The initial price 
+    : param kappa              : Kappa parameter in Heston model 
+    : param theta              : Theta parameter in Heston model 
+    : param xi                 ; Xi parameter in Heston model 
+    : param num_steps          : Number of steps for the random path generation  
+    : param T                  : Time length of the generated path 
+    : param corr_index         : Correlation index between the two Wiener processes (default value: 0) 
+    : param num_simulations    : The number of paths generated (default value: 10000)  
+    : param scheme             : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param chunk_size         : Number of paths advanced together (default value: 10000) 
+    : param features           : Features to accumulate, any of payOffs.FEATURES (default value: ('terminal',)) 
+    : param rng                : numpy Generator to draw from (default value: None, the global numpy random state) 
+    : param sampler            : 'random' or 'sobol'. With 'sobol' the shocks of a whole chunk are drawn at once (default value: 'random') 
+    : param dtype              : Floating point type of the simulation (default value: numpy.float64) 
+    : returns                  : Generator of dictionaries mapping each feature to a numpy array with its value on each path of the chunk 
+    """
+    for feature in features: 
+        if feature not in payOffs.FEATURES: 
+            raise ValueError("Please choose features from " + str(payOffs.FEATURES))
+
+    step = _scheme_step(scheme) 
+    delta_t = T/num_steps 
+    draw = qmc.shock_sampler(num_steps, num_factors = 2, sampler = sampler, rng = rng) if sampler != 'random' else None 
+    rng = np.random if rng is None else rng 
+
+    for start in range(0, num_simulations, chunk_size): 
+        n = min(chunk_size, num_simulations - start) 
+
+        # Buffers of the chunk, reused at every step 
+        S = np.full(n, S_0, dtype = dtype) 
+        v = np.full(n, sigma_0, dtype = dtype) 
+        S_next, v_next = np.empty(n, dtype = dtype), np.empty(n, dtype = dtype) 
+        Z_j = np.empty((2, n), dtype = dtype) 
+        # Shocks are drawn in float64, as in heston_paths, so a seeded stream gives the same normals for every dtype 
+        Z_64 = Z_j if Z_j.dtype == np.float64 else np.empty((2, n)) 
+        work = (np.empty(n, dtype = dtype), np.empty(n, dtype = dtype)) 
+        acc = payOffs.init_features(S, features) 
+        if draw is not None: 
+            Z = draw(n) 
+
+        for j in range(num_steps): 
+            if draw is None: 
+                qmc.fill_normals(rng, Z_64) 
+                if Z_64 is not Z_j: 
+                    Z_j[...] = Z_64 
+            else: 
+                Z_j[...] = Z[:,:,j] 
+            step(S, v, Z_j[0], Z_j[1], r, kappa, theta, xi, corr_index, delta_t, out = (S_next, v_next), work = work) 
+            S, S_next, v, v_next = S_next, S, v_next, v 
+            payOffs.update_features(acc, S, features, work = work[0]) 
+
+        yield payOffs.finish_features(acc, S, num_steps, features) 
+
+
+def eu_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, corr_index, num_simulations = 10000, seed = None, num_workers = 1, sampler = 'random', scheme = 'E', 
+              dtype = np.float64): 
     """
-    Computes the value of an European option under GBM using Monte Carlo method 
+    Computes the value of an European option under Heston model using Monte Carlo method 
+
+    Only the terminal prices are kept, the paths are never stored 
 
     : param r                   : Risk-free interest rate 
-    : param sigma_0             : The initial volatility 
+    : param sigma_0             : The initial variance 
     : param S_0                 : Spot price
     : param K                   : Strike price 
     : param kappa               : Kappa parameter in Heston model 
@@ -53,22 +289,123 @@ def eu_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, c
     : param call_or_put         : Whether the option is a call ('C') or a put ('P')
     : param corr_index          : Correlation index between the two Wiener processes (default value: 0)  
     : param num_simulations     : Number of paths generated for MC (default value: 10000) 
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol' (default value: 'random') 
+    : param scheme              : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param dtype               : Floating point type of the simulation, numpy.float32 or numpy.float64 (default value: numpy.float64) 
     : returns                   : Value of the option 
 
     """
-    
-    S, v = heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = num_simulations)
-    Vs   = payOffs.EuPayOff(S, K, call_or_put)
-    V    = np.exp(-r*T)*np.mean(Vs) 
-    return V 
+    if seed is None and num_workers == 1: 
+        chunks = heston_chunks(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = num_simulations, scheme = scheme, sampler = sampler, 
+                               dtype = dtype)
+        mean, std_error = payOffs.stream_payOff(chunks, payOffs.EuPayOffFeatures, K, call_or_put)
+        return np.exp(-r*T)*mean 
+
+    chunk_fn = functools.partial(_payOff_chunk, r = r, sigma_0 = sigma_0, S_0 = S_0, K = K, kappa = kappa, theta = theta, xi = xi, num_steps = num_steps, T = T, 
+                                 call_or_put = call_or_put, corr_index = corr_index, payOff = payOffs.EuPayOff, sampler = sampler, scheme = scheme, dtype = dtype)
+    mean, std_error = parallel.run_chunks(chunk_fn, num_simulations, seed = seed, num_workers = num_workers)
+    return np.exp(-r*T)*mean 
+
+def _payOff_chunk(n, seed_seq, r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, corr_index, payOff, sampler, scheme = 'E', dtype = np.float64): 
+    """
+    Simulate one chunk of paths with its own random stream and sum its payoffs (see parallel.run_chunks) 
+
+    Payoffs in payOffs.STREAMING_PAYOFFS are evaluated from streamed path features, any other 
+    payoff from the full paths 
+
+    : param n        : Number of paths of the chunk 
+    : param seed_seq : numpy SeedSequence of the chunk 
+    : return         : number of samples, sum, sum of squares 
+    """
+    rng = np.random.default_rng(seed_seq) 
+    if payOff in payOffs.STREAMING_PAYOFFS: 
+        payOff_features, features = payOffs.STREAMING_PAYOFFS[payOff] 
+        chunks = heston_chunks(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = n, scheme = scheme, chunk_size = n, 
+                               features = features, rng = rng, sampler = sampler, dtype = dtype)
+        return payOffs.payOff_sums(chunks, payOff_features, K, call_or_put) 
+
+    S, v = heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = n, sampler = sampler, scheme = scheme, 
+                  rng = np.random.default_rng(seed_seq), dtype = dtype)
+    Vs   = payOff(S, K, call_or_put).astype(np.float64, copy = False)
+    return Vs.size, np.sum(Vs), np.sum(Vs**2) 
 
-def am_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, corr_index, num_simulations = 10000):
+def _multi_chunk(n, seed_seq, r, sigma_0, S_0, kappa, theta, xi, num_steps, T, spec, corr_index, sampler, scheme, dtype = np.float64): 
+    """
+    Simulate one chunk of paths with its own random stream and sum the payoffs of every contract of a spec (see parallel.run_chunks) 
+
+    : return : running sums, as in payOffs.multi_payOff_sums 
+    """
+    chunks = heston_chunks(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = n, scheme = scheme, chunk_size = n, 
+                           features = payOffs.spec_features(spec), rng = np.random.default_rng(seed_seq), sampler = sampler, dtype = dtype)
+    return payOffs.multi_payOff_sums(chunks, spec) 
+
+def multi_heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, spec, corr_index = 0, num_simulations = 10000, seed = None, num_workers = 1, sampler = 'random', scheme = 'E', 
+                 dtype = np.float64): 
+    """
+    Computes the values of many options on the same underlying under Heston model from a single set of paths 
+
+    : param r                   : Risk-free interest rate 
+    : param sigma_0             : The initial variance 
+    : param S_0                 : Spot price
+    : param kappa               : Kappa parameter in Heston model 
+    : param theta               : Theta parameter in Heston model 
+    : param xi                  : Xi parameter in Heston model 
+    : param num_steps           : Number of steps on the generation of paths
+    : param T                   : Maturity 
+    : param spec                : List of (payOff, K, call_or_put) contracts, e.g. from payOffs.strike_ladder 
+    : param corr_index          : Correlation index between the two Wiener processes (default value: 0)  
+    : param num_simulations     : Number of paths generated for MC (default value: 10000) 
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+    : param scheme              : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param dtype               : Floating point type of the simulation (default value: numpy.float64) 
+    : returns                   : numpy array with the value of each contract, numpy array with their standard errors 
+    """
+    features = payOffs.spec_features(spec) 
+    if seed is None and num_workers == 1: 
+        chunks = heston_chunks(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = num_simulations, scheme = scheme, 
+                               features = features, sampler = sampler, dtype = dtype)
+        mean, std_error = payOffs.stream_multi_payOff(chunks, spec) 
+    else: 
+        chunk_fn = functools.partial(_multi_chunk, r = r, sigma_0 = sigma_0, S_0 = S_0, kappa = kappa, theta = theta, xi = xi, num_steps = num_steps, T = T, 
+                                     spec = spec, corr_index = corr_index, sampler = sampler, scheme = scheme, dtype = dtype)
+        mean, std_error = parallel.run_chunks(chunk_fn, num_simulations, seed = seed, num_workers = num_workers) 
+    return np.exp(-r*T)*mean, np.exp(-r*T)*std_error 
+
+def _lsm_step(S, v, Z, delta_t, r, kappa, theta, xi, corr_index, scheme): 
+    return _scheme_step(scheme)(S, v, Z[0], Z[1], r, kappa, theta, xi, corr_index, delta_t) 
+
+def lsm_model(r, sigma_0, S_0, kappa, theta, xi, corr_index = 0, scheme = 'E'): 
+    """
+    Describe Heston model as a model for least squares Monte Carlo (see lsm.py) 
+
+    : param r                  : The drift 
+    : param sigma_0            : The initial variance 
+    : param S_0                : The initial price 
+    : param kappa              : Kappa parameter in Heston model 
+    : param theta              : Theta parameter in Heston model 
+    : param xi                 : Xi parameter in Heston model 
+    : param corr_index         : Correlation index between the two Wiener processes (default value: 0) 
+    : param scheme             : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : return                   : Model dictionary 
+    """
+    _scheme_step(scheme) 
+    step = functools.partial(_lsm_step, r = r, kappa = kappa, theta = theta, xi = xi, corr_index = corr_index, scheme = scheme) 
+    return {'r': r, 'S_0': S_0, 'v_0': sigma_0, 'num_factors': 2, 'step': step} 
+
+def am_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, corr_index = 0, num_simulations = 10000, num_exercise = None, num_fit = 10000, 
+              degree = 3, basis = 'laguerre', seed = None, num_workers = 1, sampler = 'random', scheme = 'E'):
     
     """
-    Computes the value of an European option under GBM using Monte Carlo method 
+    Computes the value of an American option under Heston model using the Longstaff-Schwartz method 
+
+    The continuation value is regressed on polynomials of the price and the variance 
 
     : param r                   : Risk-free interest rate 
-    : param sigma_0             : The initial Volatility 
+    : param sigma_0             : The initial variance 
     : param S_0                 : Spot price
     : param K                   : Strike price 
     : param kappa               : Kappa parameter in Heston model 
@@ -76,14 +413,53 @@ def am_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, c
     : param xi                  : Xi parameter in Heston model 
     : param num_steps           : Number of steps on the generation of paths
     : param T                   : Maturity 
-    : param call_or_put         : Whether the option is a Price call ('PC'), a Price put ('PP'), a strike call ('SC') or a strike put ('SP') 
+    : param call_or_put         : Whether the option is a call ('C') or a put ('P') 
     : param corr_index          : Correlation index between the two Wiener processes (default value: 0)  
-    : param num_simulations     : Number of paths generated for MC (default value: 10000) 
+    : param num_simulations     : Number of pricing paths (default value: 10000) 
+    : param num_exercise        : Number of exercise dates, num_steps has to be a multiple of it (default value: None, every step) 
+    : param num_fit             : Number of paths to fit the exercise rule (default value: 10000) 
+    : param degree              : Degree of the regression polynomials (default value: 3) 
+    : param basis               : 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+    : param seed                : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers         : Number of worker processes (default value: 1) 
+    : param sampler             : 'random' or 'sobol' (default value: 'random') 
+    : param scheme              : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
     : returns                   : Value of the option 
 
     """
-    
-    S, v = heston(r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = corr_index, num_simulations = num_simulations)
-    Vs   = payOffs.AmPayOff(S, K, call_or_put)
-    V    = np.exp(-r*T)*np.mean(Vs) 
-    return V 
+    model = lsm_model(r, sigma_0, S_0, kappa, theta, xi, corr_index = corr_index, scheme = scheme) 
+    return lsm.longstaff_schwartz(model, K, T, call_or_put, num_steps, num_exercise = num_exercise, num_simulations = num_simulations, num_fit = num_fit, 
+                                  degree = degree, basis = basis, seed = seed, num_workers = num_workers, sampler = sampler)['price'] 
+
+def adaptive_heston(r, sigma_0, S_0, K, kappa, theta, xi, num_steps, T, call_or_put, corr_index = 0, payOff = payOffs.EuPayOff, target_std_error = None, target_rel_error = None, 
+                    time_budget = None, batch_size = 10000, max_simulations = 10**7, sampler = 'random', seed = None, scheme = 'E', dtype = np.float64): 
+    """
+    Computes the value of an option under Heston model simulating in batches until a target standard error or a time budget is reached 
+
+    : param r                   : Risk-free interest rate 
+    : param sigma_0             : The initial variance 
+    : param S_0                 : Spot price
+    : param K                   : Strike price 
+    : param kappa               : Kappa parameter in Heston model 
+    : param theta               : Theta parameter in Heston model 
+    : param xi                  : Xi parameter in Heston model 
+    : param num_steps           : Number of steps on the generation of paths
+    : param T                   : Maturity 
+    : param call_or_put         : Type of option, as in payOff 
+    : param corr_index          : Correlation index between the two Wiener processes (default value: 0)  
+    : param payOff              : Payoff function of the paths (default value: payOffs.EuPayOff) 
+    : param target_std_error    : Stop when the standard error of the price is below this value (default value: None) 
+    : param target_rel_error    : Stop when the standard error relative to the price is below this value (default value: None) 
+    : param time_budget         : Stop when this many seconds have elapsed (default value: None) 
+    : param batch_size          : Number of paths per batch (default value: 10000) 
+    : param max_simulations     : Maximum number of paths (default value: 10**7) 
+    : param sampler             : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+    : param seed                : Seed for reproducible results (default value: None) 
+    : param scheme              : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param dtype               : Floating point type of the simulation (default value: numpy.float64) 
+    : returns                   : Dictionary with 'price', 'std_error', 'conf_int', 'num_simulations', 'elapsed' and 'converged' (see adaptive.run_adaptive) 
+    """
+    batch_fn = functools.partial(_payOff_chunk, r = r, sigma_0 = sigma_0, S_0 = S_0, K = K, kappa = kappa, theta = theta, xi = xi, num_steps = num_steps, T = T, 
+                                 call_or_put = call_or_put, corr_index = corr_index, payOff = payOff, sampler = sampler, scheme = scheme, dtype = dtype)
+    return adaptive.run_adaptive(batch_fn, target_std_error = target_std_error, target_rel_error = target_rel_error, time_budget = time_budget, batch_size = batch_size, 
+                                 max_simulations = max_simulations, seed = seed, discount = np.exp(-r*T)) 
@@ -0,0 +1,206 @@
+import functools 
+
+import numpy as np 
+from numpy.polynomial import hermite_e, laguerre, polynomial 
+
+import parallel 
+import qmc 
+
+
+# A model is a dictionary with the risk-free rate ('r'), the initial price ('S_0') and variance ('v_0', 
+# None for one factor models), the number of normal shocks per step ('num_factors') and a module level 
+# function ('step') advancing (S, v) by one time step from shocks Z of shape (num_factors, n). 
+# GBM.lsm_model and heston.lsm_model build them. 
+
+BASES = {'power': polynomial.polyvander, 'laguerre': laguerre.lagvander, 'hermite': hermite_e.hermevander} 
+
+
+def basis_functions(S, v, K, degree = 3, basis = 'laguerre'): 
+    """
+    Calculate the regressors of the continuation value 
+
+    Polynomials of the moneyness S/K up to the given degree and, if the variance is given, its 
+    powers up to degree - 1 and its product with the moneyness 
+
+    : param S      : Numpy array of prices 
+    : param v      : Numpy array of variances, or None 
+    : param K      : Strike price 
+    : param degree : Degree of the polynomials (default value: 3) 
+    : param basis  : Polynomial family: 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+    : return       : Numpy array of shape (len(S), number of regressors) 
+    """
+    if basis not in BASES: 
+        raise ValueError("Please choose an appropiate basis ('power', 'laguerre' or 'hermite')") 
+    x = S/K 
+    X = BASES[basis](x, degree) 
+    if v is None: 
+        return X 
+    columns = [X] + [v**k for k in range(1, max(degree - 1, 1) + 1)] 
+    if degree >= 2: 
+        columns.append(x*v) 
+    return np.column_stack(columns) 
+
+
+def exercise_value(S, K, call_or_put): 
+    """
+    Calculate the value of exercising the option at prices S 
+
+    : param S           : Numpy array of prices 
+    : param K           : Strike price 
+    : param call_or_put : Whether the option is a call ('C') or a put ('P') 
+    : return            : Numpy array with the exercise values 
+    """
+    if call_or_put == 'C': 
+        return np.maximum(S - K, 0) 
+    elif call_or_put == 'P': 
+        return np.maximum(K - S, 0) 
+    else: 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))") 
+
+
+def exercise_states(model, num_simulations, num_steps, T, num_exercise, rng = None, sampler = 'random'): 
+    """
+    Simulate paths forward in time without storing them, yielding the state at each exercise date 
+
+    : param model           : Model dictionary (see above) 
+    : param num_simulations : Number of paths 
+    : param num_steps       : Number of time steps, a multiple of num_exercise 
+    : param T               : Maturity 
+    : param num_exercise    : Number of exercise dates, equally spaced up to T 
+    : param rng             : numpy Generator to draw from (default value: None, the global numpy random state) 
+    : param sampler         : 'random' or 'sobol'. With 'sobol' the shocks of all paths are drawn at once (default value: 'random') 
+    : returns               : Generator of (time, prices, variances) at each exercise date. Variances are None for one factor models 
+    """
+    if num_steps % num_exercise != 0: 
+        raise ValueError("num_steps has to be a multiple of num_exercise") 
+
+    delta_t = T/num_steps 
+    stride = num_steps//num_exercise 
+    num_factors = model['num_factors'] 
+    draw = qmc.shock_sampler(num_steps, num_factors = num_factors, sampler = sampler, rng = rng) if sampler != 'random' else None 
+    rng = np.random if rng is None else rng 
+
+    S = np.full(num_simulations, float(model['S_0'])) 
+    v = None if model['v_0'] is None else np.full(num_simulations, float(model['v_0'])) 
+    if draw is not None: 
+        Z = draw(num_simulations) 
+
+    for j in range(num_steps): 
+        Z_j = rng.normal(0,1,(num_factors, num_simulations)) if draw is None else Z[:,:,j] 
+        S, v = model['step'](S, v, Z_j, delta_t) 
+        if (j + 1) % stride == 0: 
+            yield (j + 1)*delta_t, S, v 
+
+
+def lsm_fit(model, K, T, call_or_put, num_steps, num_exercise, num_simulations = 10000, degree = 3, basis = 'laguerre', rng = None, sampler = 'random'): 
+    """
+    Fit the Longstaff-Schwartz exercise rule by backward regression of the realized cash flows 
+
+    Only the states at the exercise dates are stored. At each date the discounted cash flows of 
+    the in-the-money paths are regressed on the basis functions, and the paths where the exercise 
+    value beats the fitted continuation value are exercised. 
+
+    : param model           : Model dictionary (see above) 
+    : param K               : Strike price 
+    : param T               : Maturity 
+    : param call_or_put     : Whether the option is a call ('C') or a put ('P') 
+    : param num_steps       : Number of time steps, a multiple of num_exercise 
+    : param num_exercise    : Number of exercise dates, equally spaced up to T 
+    : param num_simulations : Number of paths of the fit (default value: 10000) 
+    : param degree          : Degree of the basis polynomials (default value: 3) 
+    : param basis           : 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+    : param rng             : numpy Generator to draw from (default value: None, the global numpy random state) 
+    : param sampler         : 'random' or 'sobol' (default value: 'random') 
+    : return                : List with the regression coefficients of each exercise date (None where there was no regression), in-sample value 
+    """
+    r = model['r'] 
+    states = list(exercise_states(model, num_simulations, num_steps, T, num_exercise, rng = rng, sampler = sampler)) 
+
+    t, S, v = states[-1] 
+    cash = exercise_value(S, K, call_or_put) 
+    coefficients = [None]*num_exercise 
+
+    for m in range(num_exercise - 2, -1, -1): 
+        t_next = t 
+        t, S, v = states[m] 
+        cash = np.exp(-r*(t_next - t))*cash 
+
+        exercise = exercise_value(S, K, call_or_put) 
+        itm = np.nonzero(exercise > 0)[0] 
+        X = basis_functions(S[itm], None if v is None else v[itm], K, degree, basis) 
+        # Too few paths in the money to regress: keep the cash flows 
+        if len(itm) <= X.shape[1]: 
+            continue 
+        coefficients[m] = np.linalg.lstsq(X, cash[itm], rcond = None)[0] 
+        stop = itm[exercise[itm] > X @ coefficients[m]] 
+        cash[stop] = exercise[stop] 
+
+    return coefficients, np.exp(-r*t)*np.mean(cash) 
+
+
+def _price_chunk(n, seed_seq, model, coefficients, K, T, call_or_put, num_steps, num_exercise, degree, basis, sampler): 
+    """
+    Price one chunk of independent paths with a fitted exercise rule, streaming over time (see parallel.run_chunks) 
+
+    : param n        : Number of paths of the chunk 
+    : param seed_seq : numpy SeedSequence of the chunk 
+    : return         : number of samples, sum, sum of squares of the discounted cash flows 
+    """
+    r = model['r'] 
+    value = np.zeros(n) 
+    alive = np.ones(n, dtype = bool) 
+    states = exercise_states(model, n, num_steps, T, num_exercise, rng = np.random.default_rng(seed_seq), sampler = sampler) 
+
+    for m, (t, S, v) in enumerate(states): 
+        exercise = exercise_value(S, K, call_or_put) 
+        candidates = np.nonzero(alive & (exercise > 0))[0] 
+        if m < num_exercise - 1: 
+            if coefficients[m] is None: 
+                continue 
+            X = basis_functions(S[candidates], None if v is None else v[candidates], K, degree, basis) 
+            candidates = candidates[exercise[candidates] > X @ coefficients[m]] 
+        value[candidates] = np.exp(-r*t)*exercise[candidates] 
+        alive[candidates] = False 
+
+    return n, np.sum(value), np.sum(value**2) 
+
+
+def longstaff_schwartz(model, K, T, call_or_put, num_steps, num_exercise = None, num_simulations = 10000, num_fit = 10000, degree = 3, basis = 'laguerre', 
+                       seed = None, num_workers = 1, sampler = 'random', chunk_size = 10000): 
+    """
+    Computes the value of an American (Bermudan) option with the Longstaff-Schwartz least squares Monte Carlo method 
+
+    The exercise rule is fitted on num_fit paths and the option is priced on num_simulations independent 
+    paths, streamed in chunks over the time steps, so the price is a low biased estimate and memory 
+    only depends on num_fit*num_exercise and chunk_size. 
+
+    : param model           : Model dictionary, from GBM.lsm_model or heston.lsm_model 
+    : param K               : Strike price 
+    : param T               : Maturity 
+    : param call_or_put     : Whether the option is a call ('C') or a put ('P') 
+    : param num_steps       : Number of time steps of the paths 
+    : param num_exercise    : Number of exercise dates, equally spaced up to T. num_steps has to be a multiple of it (default value: None, every step) 
+    : param num_simulations : Number of pricing paths (default value: 10000) 
+    : param num_fit         : Number of paths to fit the exercise rule (default value: 10000) 
+    : param degree          : Degree of the basis polynomials (default value: 3) 
+    : param basis           : 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+    : param seed            : Seed for reproducible results, independent of num_workers (default value: None) 
+    : param num_workers     : Number of worker processes for the pricing paths (default value: 1) 
+    : param sampler         : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+    : param chunk_size      : Number of pricing paths advanced together (default value: 10000) 
+    : return                : Dictionary with 'price', 'std_error', 'fit_price' (in-sample, high biased) and 'coefficients' 
+    """
+    if num_exercise is None: 
+        num_exercise = num_steps 
+    if call_or_put not in ('C', 'P'): 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))") 
+
+    # Independent random streams for the fit and the pricing paths 
+    fit_seq, price_seq = np.random.SeedSequence(seed).spawn(2) 
+    coefficients, fit_price = lsm_fit(model, K, T, call_or_put, num_steps, num_exercise, num_simulations = num_fit, degree = degree, basis = basis, 
+                                      rng = np.random.default_rng(fit_seq), sampler = sampler) 
+
+    chunk_fn = functools.partial(_price_chunk, model = model, coefficients = coefficients, K = K, T = T, call_or_put = call_or_put, num_steps = num_steps, 
+                                 num_exercise = num_exercise, degree = degree, basis = basis, sampler = sampler) 
+    price, std_error = parallel.run_chunks(chunk_fn, num_simulations, chunk_size = chunk_size, seed = price_seq.generate_state(1)[0], num_workers = num_workers) 
+    return {'price': price, 'std_error': std_error, 'fit_price': fit_price, 'coefficients': coefficients} 
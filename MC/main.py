@@ -1,8 +1,18 @@
 import GBM 
 import heston 
 import payOffs
+import sensitivities
+import qmc
+import controls
+import lsm
+import store
+import os 
+import sys 
 import numpy as np 
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Fourier')) 
+import fft 
+
 EuPayOff = payOffs.EuPayOff 
 AsPayOff = payOffs.AsPayOff 
 
@@ -32,42 +42,188 @@ class MCGBMOption:
         self.CoP        = call_or_put
 
 
-    def generate_paths(self, num_steps, num_simulations = 10**4, integration_method = 'E', ant_variates = False):
-        S = GBM.GBM(self.r, self.sig, self.S, num_steps, self.T, num_simulations, integration_method, ant_variates)
+    def generate_paths(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, sampler = 'random', seed = None, dtype = np.float64):
+        S = GBM.GBM(self.r, self.sig, self.S, num_steps, self.T, num_simulations, integration_method, ant_variates, sampler = sampler, seed = seed, dtype = dtype)
      
         return S 
     
 
-    def price(self, num_steps, num_simulations = 10**4, integration_method = 'E', ant_variates = False): 
+    def price(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, sampler = 'random', control = None, return_std_error = False, seed = None, 
+              dtype = np.float64): 
+        """
+        Calculates the price of the option 
 
+        : param num_steps          : Number of steps of the paths 
+        : param num_simulations    : Number of paths (default value: 10**4) 
+        : param integration_method : SDE integration method, as in GBM.GBM (default value: 'exact') 
+        : param ant_variates       : Boolean indicating whether antithetic variates are to be used 
+        : param sampler            : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+        : param control            : Control variate: 'geometric' (Asian price calls and puts), 'terminal', 'european' or a control dictionary from controls.py (default value: None) 
+        : param return_std_error   : Boolean indicating whether the standard error is returned too (default value: False) 
+        : param seed               : Seed for reproducible results. Seeded path sets are reused from the path cache (default value: None) 
+        : param dtype              : Floating point type of the simulation, numpy.float32 or numpy.float64 (default value: numpy.float64) 
+        : return                   : Price of the option (and its standard error) 
+        """
+        control = GBM._control(control, self.r, self.sig, self.S, self.K, num_steps, self.T, self.CoP) 
 
+        # Payoffs that only depend on path features are priced without storing the paths
+        if self.payOff in payOffs.STREAMING_PAYOFFS: 
+            payOff_features, features = payOffs.STREAMING_PAYOFFS[self.payOff]
+            if control is not None: 
+                features = tuple(set(features) | set(control['features'])) 
+            rng = None if seed is None else np.random.default_rng(seed) 
+            chunks = GBM.GBM_chunks(self.r, self.sig, self.S, num_steps, self.T, num_simulations = num_simulations, integration_method = integration_method, ant_variates = ant_variates, 
+                                    features = features, rng = rng, sampler = sampler, dtype = dtype)
+            if control is None: 
+                mean, std_error = payOffs.stream_payOff(chunks, payOff_features, self.K, self.CoP)
+            else: 
+                mean, std_error = controls.stream_cv_payOff(chunks, payOff_features, self.K, self.CoP, control)
+        else: 
+            S =  self.generate_paths(num_steps, num_simulations = num_simulations, integration_method = integration_method, ant_variates = ant_variates, sampler = sampler, seed = seed, 
+                                     dtype = dtype)
+            Y = self.payOff(S, self.K, self.CoP).astype(np.float64, copy = False) 
+            if control is None: 
+                mean, std_error = np.mean(Y), np.std(Y, ddof = 1)/np.sqrt(Y.size) 
+            else: 
+                X = control['values'](payOffs.path_features(S, control['features'])).astype(np.float64, copy = False) 
+                mean, std_error = controls.cv_estimate(Y, X, control['mean']) 
 
-        S =  self.generate_paths(num_steps, num_simulations = num_simulations, integration_method = integration_method, ant_variates = ant_variates)
-        
-        return np.exp(-self.r*self.T)*(np.mean(self.payOff(S, self.K, self.CoP))) 
+        if return_std_error: 
+            return np.exp(-self.r*self.T)*mean, np.exp(-self.r*self.T)*std_error 
+        return np.exp(-self.r*self.T)*mean 
+
+    def price_from_store(self, path_store, num_steps, integration_method = 'exact', block_size = 10**4, return_std_error = False): 
+        """
+        Calculates the price of the option from paths saved in an out-of-core path store, streaming them in blocks 
+
+        : param path_store         : store.PathStore or its directory, simulated with the parameters of the option 
+        : param num_steps          : Number of steps of the paths, checked against the store 
+        : param integration_method : SDE integration method of the paths, checked against the store (default value: 'exact') 
+        : param block_size         : Number of paths read at a time (default value: 10**4) 
+        : param return_std_error   : Boolean indicating whether the standard error is returned too (default value: False) 
+        : return                   : Price of the option (and its standard error) 
+        """
+        path_store = store.PathStore(path_store) if isinstance(path_store, str) else path_store 
+        if path_store.model != 'GBM': 
+            raise ValueError("The path store does not contain GBM paths") 
+        path_store.check_params(r = self.r, sigma = self.sig, S_0 = self.S, T = self.T, num_steps = num_steps, integration_method = integration_method) 
+        V, std_error = path_store.price(self.payOff, self.K, self.CoP, block_size = block_size) 
+        if return_std_error: 
+            return V, std_error 
+        return V 
 
-    def delta(self, num_steps, num_simulations = 10**4, integration_method = 'E', ant_variates = False):
-        new_S0 = self.S*1.01
+    def price_strikes(self, strikes, num_steps, num_simulations = 10**4, call_or_put = None, integration_method = 'exact', ant_variates = False, sampler = 'random', seed = None): 
+        """
+        Calculates the price of the option for many strikes (and option types) from a single set of paths 
+
+        : param strikes            : Iterable of strike prices 
+        : param num_steps          : Number of steps of the paths 
+        : param num_simulations    : Number of paths (default value: 10**4) 
+        : param call_or_put        : Iterable of option types to price for each strike (default value: None, the type of the option) 
+        : param integration_method : SDE integration method, as in GBM.GBM (default value: 'exact') 
+        : param ant_variates       : Boolean indicating whether antithetic variates are to be used 
+        : param sampler            : 'random' or 'sobol' (default value: 'random') 
+        : param seed               : Seed for reproducible results (default value: None) 
+        : return                   : numpy array of prices and numpy array of standard errors, strikes varying fastest within each option type 
+        """
+        call_or_put = (self.CoP,) if call_or_put is None else call_or_put 
+        spec = payOffs.strike_ladder(self.payOff, strikes, call_or_put) 
+        return GBM.multi_GBM(self.r, self.sig, self.S, num_steps, self.T, spec, num_simulations = num_simulations, integration_method = integration_method, 
+                             ant_variates = ant_variates, seed = seed, sampler = sampler) 
 
-        price = self.price(num_steps, num_simulations, integration_method, ant_variates) 
+    def price_american(self, num_steps, num_simulations = 10**4, num_exercise = None, num_fit = 10**4, degree = 3, basis = 'laguerre', integration_method = 'exact', 
+                       seed = None, sampler = 'random', return_std_error = False): 
+        """
+        Calculates the price of the option with early exercise using the Longstaff-Schwartz method (calls and puts only) 
 
-        new_S = GBM.GBM(self.r, self.sig, new_S0, num_steps, self.T, num_simulations, integration_method, ant_variates)
-        new_price = np.exp(-self.r*self.T)*(np.mean(self.payOff(new_S, self.K, self.CoP)))
-         
-        return (new_price - price)/(new_S0 - self.S) 
+        : param num_steps          : Number of steps of the paths 
+        : param num_simulations    : Number of pricing paths (default value: 10**4) 
+        : param num_exercise       : Number of exercise dates, num_steps has to be a multiple of it (default value: None, every step) 
+        : param num_fit            : Number of paths to fit the exercise rule (default value: 10**4) 
+        : param degree             : Degree of the regression polynomials (default value: 3) 
+        : param basis              : 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+        : param integration_method : SDE integration method, as in GBM.GBM (default value: 'exact') 
+        : param seed               : Seed for reproducible results (default value: None) 
+        : param sampler            : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+        : param return_std_error   : Boolean indicating whether the standard error is returned too (default value: False) 
+        : return                   : Price of the option (and its standard error) 
+        """
+        model = GBM.lsm_model(self.r, self.sig, self.S, integration_method = integration_method) 
+        result = lsm.longstaff_schwartz(model, self.K, self.T, self.CoP, num_steps, num_exercise = num_exercise, num_simulations = num_simulations, num_fit = num_fit, 
+                                        degree = degree, basis = basis, seed = seed, sampler = sampler) 
+        if return_std_error: 
+            return result['price'], result['std_error'] 
+        return result['price'] 
 
-    def vega(self, num_steps, num_simulations = 10**4, integration_method = 'E', ant_variates = False): 
-        new_sig = self.sig*1.01
-        price = self.price(num_steps, num_simulations, integration_method, ant_variates) 
+    def price_adaptive(self, num_steps, target_std_error = None, target_rel_error = None, time_budget = None, batch_size = 10**4, max_simulations = 10**7, 
+                       integration_method = 'exact', ant_variates = False, sampler = 'random', control = None, seed = None): 
+        """
+        Calculates the price of the option simulating in batches until a target standard error or a time budget is reached 
 
-        new_S = GBM.GBM(self.r, new_sig, self.S, num_steps, self.T, num_simulations, integration_method, ant_variates)
-        new_price = np.exp(-self.r*self.T)*(np.mean(self.payOff(new_S, self.K, self.CoP)))
+        : param num_steps        : Number of steps of the paths 
+        : param target_std_error : Stop when the standard error of the price is below this value (default value: None) 
+        : param target_rel_error : Stop when the standard error relative to the price is below this value (default value: None) 
+        : param time_budget      : Stop when this many seconds have elapsed (default value: None) 
+        : return                 : Dictionary with 'price', 'std_error', 'conf_int', 'num_simulations', 'elapsed' and 'converged' 
+        """
+        return GBM.adaptive_GBM(self.r, self.sig, self.S, self.K, num_steps, self.T, self.CoP, payOff = self.payOff, target_std_error = target_std_error, 
+                                target_rel_error = target_rel_error, time_budget = time_budget, batch_size = batch_size, max_simulations = max_simulations, 
+                                integration_method = integration_method, ant_variates = ant_variates, sampler = sampler, control = control, seed = seed) 
 
-        return -(new_price - price)/(new_sig- self.sig) 
+    def greeks(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, greeks = ('delta', 'gamma', 'vega', 'theta'), sampler = 'random', seed = None): 
+        """
+        Calculates the price and greeks of the option from a single set of random shocks 
+
+        European payoffs with exact sampling use pathwise and likelihood ratio estimators, 
+        any other payoff central differences with common random numbers. 
+
+        : param num_steps          : Number of steps of the paths 
+        : param num_simulations    : Number of paths (default value: 10**4) 
+        : param integration_method : SDE integration method, as in GBM.GBM (default value: 'exact') 
+        : param ant_variates       : Boolean indicating whether antithetic variates are to be used 
+        : param greeks             : Greeks to calculate, any of 'delta', 'gamma', 'vega' and 'theta' (default value: all of them) 
+        : param sampler            : 'random' or 'sobol' (default value: 'random') 
+        : param seed               : Seed for reproducible results. Seeded shocks are reused from the path cache (default value: None) 
+        : return                   : Dictionary mapping 'price' and each greek to a tuple (value, standard error) 
+        """
+        if self.payOff is EuPayOff and integration_method == 'exact': 
+            Z = qmc.shocks(1, num_simulations, sampler = sampler, seed = seed)[0, :, 0] 
+            if ant_variates: 
+                Z = np.concatenate((Z, -Z)) 
+            return sensitivities.GBM_pathwise_greeks(self.r, self.sig, self.S, self.K, self.T, self.CoP, Z, paired = ant_variates) 
+
+        Z = qmc.shocks(num_steps, num_simulations, sampler = sampler, seed = seed)[0] 
+        simulate = lambda S_0, sigma, T: GBM.GBM_paths(self.r, sigma, S_0, T, Z, integration_method = integration_method, ant_variates = ant_variates) 
+        base = {'S_0': self.S, 'sigma': self.sig, 'T': self.T} 
+        return sensitivities.crn_greeks(simulate, self.payOff, self.K, self.CoP, self.r, base, greeks = greeks, paired = ant_variates) 
+
+    def delta(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, seed = None):
+        """
+        Calculates the delta of the option 
+        : return : Delta 
+        """
+        return self.greeks(num_steps, num_simulations, integration_method, ant_variates, greeks = ('delta',), seed = seed)['delta'][0] 
+
+    def gamma(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, seed = None):
+        """
+        Calculates the gamma of the option 
+        : return : Gamma 
+        """
+        return self.greeks(num_steps, num_simulations, integration_method, ant_variates, greeks = ('gamma',), seed = seed)['gamma'][0] 
+
+    def vega(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, seed = None): 
+        """
+        Calculates the vega of the option 
+        : return : Vega 
+        """
+        return self.greeks(num_steps, num_simulations, integration_method, ant_variates, greeks = ('vega',), seed = seed)['vega'][0] 
     
-    def theta(self, num_steps, num_simulations = 10**4, integration_method = 'E', ant_variates = False): 
-        # Still need to define the function 
-        pass 
+    def theta(self, num_steps, num_simulations = 10**4, integration_method = 'exact', ant_variates = False, seed = None): 
+        """
+        Calculates the theta of the option, as the derivative of the value with respect to maturity 
+        : return : Theta 
+        """
+        return self.greeks(num_steps, num_simulations, integration_method, ant_variates, greeks = ('theta',), seed = seed)['theta'][0] 
         
 class MCHestonOption: 
     def __init__(self,  risk_free_rate, volatility_0, spot_price, strike_price, maturity, kappa, theta, xi,call_or_put, payOff = EuPayOff): 
@@ -77,31 +233,156 @@ class MCHestonOption:
         self.r     = risk_free_rate
         self.v_0    = volatility_0
         self.kappa = kappa 
-        self.theta = theta 
+        self.long_term_var = theta 
         self.xi    = xi 
         self.payOff = payOff
         self.CoP   = call_or_put
 
-    def generate_paths(self, num_steps, num_simulations = 10**4, corr_index = 0): 
-        S, v = heston.heston(self.r, self.v_0, self.S, self.theta, self.xi, num_steps, corr_index = corr_index, num_simulations = num_simulations) 
+    def generate_paths(self, num_steps, num_simulations = 10**4, corr_index = 0, sampler = 'random', scheme = 'E', seed = None, dtype = np.float64): 
+        S, v = heston.heston(self.r, self.v_0, self.S, self.kappa, self.long_term_var, self.xi, num_steps, self.T, corr_index = corr_index, num_simulations = num_simulations, 
+                             sampler = sampler, scheme = scheme, seed = seed, dtype = dtype) 
         return S, v
 
-    def price(self, num_steps, num_simulations = 10**4, corr_index = 0): 
+    def price(self, num_steps, num_simulations = 10**4, corr_index = 0, sampler = 'random', scheme = 'E', seed = None, dtype = np.float64): 
+        """
+        Calculates the price of the option 
 
-        S, v = self.generate_paths(num_steps, num_simulations = num_simulations, corr_index= corr_index)
-        
-        return np.exp(-self.r*self.T)*(np.mean(self.payOff(S, self.K, self.CoP)))
-    
-    def delta(self, num_steps, num_simulations = 10**4, corr_index = 0): 
-        new_S0 = self.S*1.01
-        
-        price = self.price(num_steps, num_simulations, corr_index) 
+        : param num_steps       : Number of steps of the paths 
+        : param num_simulations : Number of paths (default value: 10**4) 
+        : param corr_index      : Correlation index between the two Wiener processes (default value: 0) 
+        : param sampler         : 'random' or 'sobol' (default value: 'random') 
+        : param scheme          : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+        : param seed            : Seed for reproducible results. Seeded path sets are reused from the path cache (default value: None) 
+        : param dtype           : Floating point type of the simulation, numpy.float32 or numpy.float64 (default value: numpy.float64) 
+        : return                : Price of the option 
+        """
+        # Payoffs that only depend on path features are priced without storing the paths
+        if self.payOff in payOffs.STREAMING_PAYOFFS: 
+            payOff_features, features = payOffs.STREAMING_PAYOFFS[self.payOff]
+            rng = None if seed is None else np.random.default_rng(seed) 
+            chunks = heston.heston_chunks(self.r, self.v_0, self.S, self.kappa, self.long_term_var, self.xi, num_steps, self.T, corr_index = corr_index, 
+                                          num_simulations = num_simulations, scheme = scheme, features = features, rng = rng, sampler = sampler, dtype = dtype)
+            mean, std_error = payOffs.stream_payOff(chunks, payOff_features, self.K, self.CoP)
+            return np.exp(-self.r*self.T)*mean 
 
-        new_S, new_v = heston.heston(self.r, self.v_0, new_S0, self.theta, self.xi, num_steps, corr_index, num_simulations) 
+        S, v = self.generate_paths(num_steps, num_simulations = num_simulations, corr_index= corr_index, sampler = sampler, scheme = scheme, seed = seed, dtype = dtype)
         
-        new_price = np.exp(-self.r*self.T)*np.mean(self.payOff(new_S, self.K, self.CoP)) 
+        return np.exp(-self.r*self.T)*(np.mean(self.payOff(S, self.K, self.CoP), dtype = np.float64))
+
+    def price_from_store(self, path_store, num_steps, corr_index = 0, scheme = 'E', block_size = 10**4, return_std_error = False): 
+        """
+        Calculates the price of the option from paths saved in an out-of-core path store, streaming them in blocks 
+
+        : param path_store       : store.PathStore or its directory, simulated with the parameters of the option 
+        : param num_steps        : Number of steps of the paths, checked against the store 
+        : param corr_index       : Correlation index between the two Wiener processes, checked against the store (default value: 0) 
+        : param scheme           : 'E' or 'QE', the discretization scheme of the paths, checked against the store (default value: 'E') 
+        : param block_size       : Number of paths read at a time (default value: 10**4) 
+        : param return_std_error : Boolean indicating whether the standard error is returned too (default value: False) 
+        : return                 : Price of the option (and its standard error) 
+        """
+        path_store = store.PathStore(path_store) if isinstance(path_store, str) else path_store 
+        if path_store.model != 'heston': 
+            raise ValueError("The path store does not contain Heston paths") 
+        path_store.check_params(r = self.r, sigma_0 = self.v_0, S_0 = self.S, kappa = self.kappa, theta = self.long_term_var, xi = self.xi, T = self.T, 
+                                num_steps = num_steps, corr_index = corr_index, scheme = scheme) 
+        V, std_error = path_store.price(self.payOff, self.K, self.CoP, block_size = block_size) 
+        if return_std_error: 
+            return V, std_error 
+        return V 
+
+    def price_american(self, num_steps, num_simulations = 10**4, corr_index = 0, num_exercise = None, num_fit = 10**4, degree = 3, basis = 'laguerre', 
+                       seed = None, sampler = 'random', scheme = 'E', return_std_error = False): 
+        """
+        Calculates the price of the option with early exercise using the Longstaff-Schwartz method (calls and puts only) 
+
+        : param num_steps          : Number of steps of the paths 
+        : param num_simulations    : Number of pricing paths (default value: 10**4) 
+        : param corr_index         : Correlation index between the two Wiener processes (default value: 0) 
+        : param num_exercise       : Number of exercise dates, num_steps has to be a multiple of it (default value: None, every step) 
+        : param num_fit            : Number of paths to fit the exercise rule (default value: 10**4) 
+        : param degree             : Degree of the regression polynomials (default value: 3) 
+        : param basis              : 'power', 'laguerre' or 'hermite' (default value: 'laguerre') 
+        : param seed               : Seed for reproducible results (default value: None) 
+        : param sampler            : 'random' or 'sobol'. With 'sobol' the std_error comes from a single scrambled sequence and is not a valid error estimate, use qmc.rqmc_price for one (default value: 'random') 
+        : param scheme             : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+        : param return_std_error   : Boolean indicating whether the standard error is returned too (default value: False) 
+        : return                   : Price of the option (and its standard error) 
+        """
+        model = heston.lsm_model(self.r, self.v_0, self.S, self.kappa, self.long_term_var, self.xi, corr_index = corr_index, scheme = scheme) 
+        result = lsm.longstaff_schwartz(model, self.K, self.T, self.CoP, num_steps, num_exercise = num_exercise, num_simulations = num_simulations, num_fit = num_fit, 
+                                        degree = degree, basis = basis, seed = seed, sampler = sampler) 
+        if return_std_error: 
+            return result['price'], result['std_error'] 
+        return result['price'] 
+
+    def price_adaptive(self, num_steps, target_std_error = None, target_rel_error = None, time_budget = None, batch_size = 10**4, max_simulations = 10**7, 
+                       corr_index = 0, sampler = 'random', seed = None, scheme = 'E'): 
+        """
+        Calculates the price of the option simulating in batches until a target standard error or a time budget is reached 
 
-        return (new_price - price)/(new_S0 - self.S) 
+        : param num_steps        : Number of steps of the paths 
+        : param target_std_error : Stop when the standard error of the price is below this value (default value: None) 
+        : param target_rel_error : Stop when the standard error relative to the price is below this value (default value: None) 
+        : param time_budget      : Stop when this many seconds have elapsed (default value: None) 
+        : return                 : Dictionary with 'price', 'std_error', 'conf_int', 'num_simulations', 'elapsed' and 'converged' 
+        """
+        return heston.adaptive_heston(self.r, self.v_0, self.S, self.K, self.kappa, self.long_term_var, self.xi, num_steps, self.T, self.CoP, corr_index = corr_index, 
+                                      payOff = self.payOff, target_std_error = target_std_error, target_rel_error = target_rel_error, time_budget = time_budget, 
+                                      batch_size = batch_size, max_simulations = max_simulations, sampler = sampler, seed = seed, scheme = scheme) 
+
+    def value_fft(self, corr_index = 0, strikes = None, alpha = 1.5, N = 4096, eta = 0.25): 
+        """
+        Calculates the semi-analytic price of the option with the Carr-Madan FFT (only for European payoffs) 
+
+        : param corr_index : Correlation index between the two Wiener processes (default value: 0) 
+        : param strikes    : Strike price or numpy array of strike prices to price instead of the option strike (default value: None) 
+        : param alpha      : Damping factor (default value: 1.5) 
+        : param N          : Number of FFT points (default value: 4096) 
+        : param eta        : Spacing of the integration grid (default value: 0.25) 
+        : return           : Price of the option (or prices for each strike) 
+        """
+        if self.payOff is not EuPayOff: 
+            raise ValueError("FFT pricing is only available for European options (payOff = EuPayOff)")
+        K = self.K if strikes is None else strikes 
+        return fft.heston_fft(self.r, self.v_0, self.S, K, self.kappa, self.long_term_var, self.xi, self.T, call_or_put = self.CoP, corr_index = corr_index, 
+                              alpha = alpha, N = N, eta = eta) 
+
+    def greeks(self, num_steps, num_simulations = 10**4, corr_index = 0, greeks = ('delta', 'gamma', 'theta'), sampler = 'random', scheme = 'E', seed = None): 
+        """
+        Calculates the price and greeks of the option by central differences with common random numbers 
+
+        : param num_steps       : Number of steps of the paths 
+        : param num_simulations : Number of paths (default value: 10**4) 
+        : param corr_index      : Correlation index between the two Wiener processes (default value: 0) 
+        : param greeks          : Greeks to calculate, any of 'delta', 'gamma' and 'theta' (default value: all of them) 
+        : param sampler         : 'random' or 'sobol' (default value: 'random') 
+        : param scheme          : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+        : param seed            : Seed for reproducible results. Seeded shocks are reused from the path cache (default value: None) 
+        : return                : Dictionary mapping 'price' and each greek to a tuple (value, standard error) 
+        """
+        Z = qmc.shocks(num_steps, num_simulations, num_factors = 2, sampler = sampler, seed = seed) 
+        simulate = lambda S_0, T: heston.heston_paths(self.r, self.v_0, S_0, self.kappa, self.long_term_var, self.xi, T, Z, corr_index = corr_index, scheme = scheme) 
+        base = {'S_0': self.S, 'T': self.T} 
+        return sensitivities.crn_greeks(simulate, self.payOff, self.K, self.CoP, self.r, base, greeks = greeks) 
     
+    def delta(self, num_steps, num_simulations = 10**4, corr_index = 0, scheme = 'E', seed = None): 
+        """
+        Calculates the delta of the option 
+        : return : Delta 
+        """
+        return self.greeks(num_steps, num_simulations, corr_index, greeks = ('delta',), scheme = scheme, seed = seed)['delta'][0] 
 
+    def gamma(self, num_steps, num_simulations = 10**4, corr_index = 0, scheme = 'E', seed = None): 
+        """
+        Calculates the gamma of the option 
+        : return : Gamma 
+        """
+        return self.greeks(num_steps, num_simulations, corr_index, greeks = ('gamma',), scheme = scheme, seed = seed)['gamma'][0] 
 
+    def theta(self, num_steps, num_simulations = 10**4, corr_index = 0, scheme = 'E', seed = None): 
+        """
+        Calculates the theta of the option, as the derivative of the value with respect to maturity 
+        : return : Theta 
+        """
+        return self.greeks(num_steps, num_simulations, corr_index, greeks = ('theta',), scheme = scheme, seed = seed)['theta'][0] 
@@ -0,0 +1,58 @@
+import numpy as np 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor 
+
+import payOffs 
+
+
+def chunk_sizes(num_simulations, chunk_size): 
+    """
+    Split a number of simulations into chunks 
+
+    : param num_simulations : Total number of simulations 
+    : param chunk_size      : Maximum number of simulations per chunk 
+    : return                : List with the number of simulations of each chunk 
+    """
+    return [min(chunk_size, num_simulations - start) for start in range(0, num_simulations, chunk_size)] 
+
+
+def run_chunks(chunk_fn, num_simulations, chunk_size = 10000, seed = None, num_workers = 1, executor = 'process', finish = payOffs.mean_std_error): 
+    """
+    Run a Monte Carlo simulation split in chunks, each one with an independent random stream 
+
+    Chunk i always gets the i-th child of SeedSequence(seed) and the chunk sums are combined 
+    in chunk order, so for a given seed the result does not depend on num_workers. 
+
+    : param chunk_fn        : Function taking (number of simulations, numpy SeedSequence) and returning a tuple of running sums, by default (number of samples, sum, sum of squares). Must be picklable for the process executor 
+    : param num_simulations : Total number of simulations 
+    : param chunk_size      : Number of simulations per chunk (default value: 10000) 
+    : param seed            : Seed of the root SeedSequence (default value: None, fresh entropy) 
+    : param num_workers     : Number of workers. 1 runs the chunks in the calling process (default value: 1) 
+    : param executor        : Pool used when num_workers > 1, 'process' or 'thread' (default value: 'process') 
+    : param finish          : Function turning the combined sums into the result (default value: payOffs.mean_std_error) 
+    : return                : finish applied to the combined sums, by default mean and standard error of the mean 
+    """
+    # The shape of the sums is only known from the chunks, so at least one chunk has to run 
+    if num_simulations < 1: 
+        raise ValueError("Please choose an appropiate value for num_simulations (at least 1)") 
+    if chunk_size < 1: 
+        raise ValueError("Please choose an appropiate value for chunk_size (at least 1)") 
+    sizes = chunk_sizes(num_simulations, chunk_size) 
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes)) 
+
+    if num_workers == 1: 
+        results = list(map(chunk_fn, sizes, seeds)) 
+    else: 
+        if executor == 'process': 
+            pool = ProcessPoolExecutor(num_workers) 
+        elif executor == 'thread': 
+            pool = ThreadPoolExecutor(num_workers) 
+        else: 
+            raise ValueError("Please choose an appropiate executor ('process' or 'thread')") 
+        with pool: 
+            results = list(pool.map(chunk_fn, sizes, seeds)) 
+
+    totals = list(results[0]) 
+    for sums in results[1:]: 
+        for k, s in enumerate(sums): 
+            totals[k] += s 
+    return finish(*totals) 
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def EuPayOff(S, K, call_or_put):
     """
     Calculate the payoff of random paths of an European option
@@ -17,26 +20,290 @@ def EuPayOff(S, K, call_or_put):
 
 def AsPayOff(S, K, call_or_put):
     """
-    Calculate the payoff of random paths of an American option
+    Calculate the payoff of random paths of an Asian option
 
     : param S           : Numpy array of the paths 
     : param K           : Strike price
     : param call_or_put : Whether the option is a price call ('PC'), a price put ('PP'), a strike call ('SC') or a strike put ('SP')  
     : return            : numpy array containing the payoff of each path 
     """
-    
-    
-    A = np.zeros(S.shape[0]) 
-    for i in range(len(A)): 
-        A[i] = np.mean(S[i,:]) - S[i,0]/2 - S[i,-1]/2
+    return AsPayOffFeatures(path_features(S, ('terminal', 'average')), K, call_or_put) 
+
+
+# Path features are the per-path statistics payoffs depend on. Averages use the trapezoidal 
+# rule over the num_steps intervals of the path, the geometric one on log prices.
+FEATURES = ('terminal', 'average', 'geometric', 'max', 'min')
+
+def path_features(S, features): 
+    """
+    Calculate path features from a numpy array of paths 
+
+    : param S        : Numpy array of the paths 
+    : param features : Features to calculate, any of 'terminal', 'average', 'geometric', 'max' and 'min' 
+    : return         : Dictionary mapping each feature to a numpy array with its value on each path 
+    """
+    num_steps = S.shape[-1] - 1
+    F = {'terminal': S[..., -1]}
+    if 'average' in features: 
+        F['average'] = (np.sum(S, axis = -1) - S[..., 0]/2 - S[..., -1]/2)/num_steps
+    if 'geometric' in features: 
+        log_S = np.log(S)
+        F['geometric'] = np.exp((np.sum(log_S, axis = -1) - log_S[..., 0]/2 - log_S[..., -1]/2)/num_steps)
+    if 'max' in features: 
+        F['max'] = np.max(S, axis = -1) 
+    if 'min' in features: 
+        F['min'] = np.min(S, axis = -1) 
+    return F 
+
+def init_features(S_0, features): 
+    """
+    Initialize the running accumulators of path features 
+
+    : param S_0      : Numpy array with the initial price of each path 
+    : param features : Features to accumulate 
+    : return         : Dictionary of accumulators 
+    """
+    acc = {} 
+    if 'average' in features: 
+        acc['average'] = S_0/2 
+    if 'geometric' in features: 
+        acc['geometric'] = np.log(S_0)/2 
+    if 'max' in features: 
+        acc['max'] = S_0.copy() 
+    if 'min' in features: 
+        acc['min'] = S_0.copy() 
+    return acc 
+
+def update_features(acc, S, features, work = None): 
+    """
+    Update in place the running accumulators of path features with the prices of a new time step 
+
+    : param acc      : Dictionary of accumulators (see init_features) 
+    : param S        : Numpy array with the current price of each path 
+    : param features : Features to accumulate 
+    : param work     : Numpy array like S to use as scratch space (default value: None, a temporary array) 
+    """
+    if 'average' in features: 
+        acc['average'] += S 
+    if 'geometric' in features: 
+        acc['geometric'] += np.log(S, out = work) 
+    if 'max' in features: 
+        np.maximum(acc['max'], S, out = acc['max']) 
+    if 'min' in features: 
+        np.minimum(acc['min'], S, out = acc['min']) 
+
+def finish_features(acc, S, num_steps, features): 
+    """
+    Turn the running accumulators into path features once the last time step has been added 
+
+    : param acc       : Dictionary of accumulators (see init_features) 
+    : param S         : Numpy array with the terminal price of each path 
+    : param num_steps : Number of time steps of the paths 
+    : param features  : Features accumulated 
+    : return          : Dictionary mapping each feature to a numpy array with its value on each path 
+    """
+    F = {'terminal': S} 
+    if 'average' in features: 
+        F['average'] = (acc['average'] - S/2)/num_steps 
+    if 'geometric' in features: 
+        F['geometric'] = np.exp((acc['geometric'] - np.log(S)/2)/num_steps) 
+    if 'max' in features: 
+        F['max'] = acc['max'] 
+    if 'min' in features: 
+        F['min'] = acc['min'] 
+    return F 
+
+
+def EuPayOffFeatures(F, K, call_or_put): 
+    """
+    Calculate the payoff of an European option from path features 
+
+    : param F           : Dictionary of path features, containing 'terminal' 
+    : param K           : Strike price
+    : param call_or_put : Whether the option is a call ('C') or a put ('P') 
+    : return            : numpy array containing the payoff of each path 
+    """
+    if call_or_put == 'C':
+        return np.maximum(F['terminal'] - K, 0) 
+    elif call_or_put =='P': 
+        return np.maximum(K - F['terminal'], 0) 
+    else: 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P')") 
+
+def AsPayOffFeatures(F, K, call_or_put): 
+    """
+    Calculate the payoff of an Asian option from path features 
+
+    : param F           : Dictionary of path features, containing 'terminal' and 'average' 
+    : param K           : Strike price
+    : param call_or_put : Whether the option is a price call ('PC'), a price put ('PP'), a strike call ('SC') or a strike put ('SP')  
+    : return            : numpy array containing the payoff of each path 
+    """
+    A = F['average'] 
 
     if call_or_put == 'PC': 
         return np.maximum(A - K, 0) 
     elif call_or_put == 'PP': 
         return np.maximum(K - A, 0) 
     elif call_or_put == 'SC': 
-        return np.maximum(S[:,-1] - A, 0)
+        return np.maximum(F['terminal'] - A, 0)
     elif call_or_put == 'SP':
-        return np.maximum(A - S[:, -1], 0) 
+        return np.maximum(A - F['terminal'], 0) 
     else: 
-        raise ValueError("Please choose an appropiate value for call_or_Put (Price call ('PC'), Price put ('PP'), Strike call ('SK') or Strike put ('SP')") 
+        raise ValueError("Please choose an appropiate value for call_or_Put (Price call ('PC'), Price put ('PP'), Strike call ('SK') or Strike put ('SP')")
+
+
+# Payoffs that can be evaluated from streamed path features: payOff -> (feature payOff, features needed)
+STREAMING_PAYOFFS = {
+    EuPayOff : (EuPayOffFeatures, ('terminal',)), 
+    AsPayOff : (AsPayOffFeatures, ('terminal', 'average')), 
+}
+
+
+def payOff_sums(chunks, payOff_features, K, call_or_put): 
+    """
+    Calculate the number of samples, sum and sum of squares of the payoff over chunks of path features 
+
+    Feature arrays with a leading axis of size 2 (antithetic variates) are averaged pairwise first, 
+    so every sample is independent. 
+
+    : param chunks          : Iterable of dictionaries of path features 
+    : param payOff_features : Payoff function taking path features (e.g. EuPayOffFeatures) 
+    : param K               : Strike price 
+    : param call_or_put     : Type of option, as in payOff_features 
+    : return                : number of samples, sum, sum of squares 
+    """
+    n, total, total_sq = 0, 0.0, 0.0
+    for F in chunks: 
+        # Sums are accumulated in double precision whatever the precision of the paths 
+        V = payOff_features(F, K, call_or_put).astype(np.float64, copy = False) 
+        if V.ndim == 2: 
+            V = V.mean(axis = 0) 
+        n        += V.size 
+        total    += np.sum(V) 
+        total_sq += np.sum(V**2) 
+    return n, total, total_sq 
+
+def mean_std_error(n, total, total_sq): 
+    """
+    Calculate the sample mean and its standard error from running sums 
+
+    : param n        : Number of samples 
+    : param total    : Sum of the samples 
+    : param total_sq : Sum of the squares of the samples (numpy arrays of sums give arrays of means and errors) 
+    : return         : mean, standard error of the mean 
+    """
+    mean = total/n 
+    var  = np.maximum(total_sq/n - mean**2, 0)*n/max(n-1, 1)
+    return mean, np.sqrt(var/n) 
+
+def stream_payOff(chunks, payOff_features, K, call_or_put): 
+    """
+    Calculate the mean payoff and its standard error over chunks of path features 
+
+    Only the running sum and sum of squares are kept, so memory does not grow with the number of chunks. 
+
+    : param chunks          : Iterable of dictionaries of path features 
+    : param payOff_features : Payoff function taking path features (e.g. EuPayOffFeatures) 
+    : param K               : Strike price 
+    : param call_or_put     : Type of option, as in payOff_features 
+    : return                : mean payoff, standard error of the mean 
+    """
+    return mean_std_error(*payOff_sums(chunks, payOff_features, K, call_or_put)) 
+
+
+# A payoff spec is a list of (payOff, K, call_or_put) contracts, with payOff in STREAMING_PAYOFFS. 
+# All of them are evaluated on the same paths, computing every path feature once. 
+
+def strike_ladder(payOff, strikes, call_or_put = ('C', 'P')): 
+    """
+    Build a payoff spec with every combination of strike and option type 
+
+    : param payOff      : Payoff function, in STREAMING_PAYOFFS 
+    : param strikes     : Iterable of strike prices 
+    : param call_or_put : Iterable of option types, as in payOff (default value: ('C', 'P')) 
+    : return            : Payoff spec, strikes varying fastest within each option type 
+    """
+    return [(payOff, K, cp) for cp in call_or_put for K in strikes] 
+
+def spec_features(spec): 
+    """
+    Path features needed by a payoff spec 
+
+    : param spec : Payoff spec 
+    : return     : Tuple of features 
+    """
+    features = [] 
+    for payOff, K, call_or_put in spec: 
+        if payOff not in STREAMING_PAYOFFS: 
+            raise ValueError("Please choose payoffs from STREAMING_PAYOFFS") 
+        features += [f for f in STREAMING_PAYOFFS[payOff][1] if f not in features] 
+    return tuple(features) 
+
+def _spec_groups(spec): 
+    """
+    Group the contracts of a payoff spec by payoff and option type 
+
+    : return : Dictionary mapping (payOff, call_or_put) to (numpy array of positions in the spec, numpy array of strikes) 
+    """
+    groups = {} 
+    for i, (payOff, K, call_or_put) in enumerate(spec): 
+        positions, strikes = groups.setdefault((payOff, call_or_put), ([], [])) 
+        positions.append(i) 
+        strikes.append(K) 
+    return {key: (np.array(positions), np.array(strikes, dtype = float)) for key, (positions, strikes) in groups.items()} 
+
+def multi_payOff_values(F, spec): 
+    """
+    Calculate the payoffs of every contract of a spec from path features 
+
+    Each group of contracts sharing payoff and option type is evaluated at once, broadcasting the strikes. 
+    Feature arrays with a leading axis of size 2 (antithetic variates) are averaged pairwise. 
+
+    : param F    : Dictionary of path features 
+    : param spec : Payoff spec 
+    : return     : numpy array of shape (len(spec), number of paths) 
+    """
+    shape = F['terminal'].shape 
+    V = np.empty((len(spec),) + shape) 
+    for (payOff, call_or_put), (positions, strikes) in _spec_groups(spec).items(): 
+        V[positions] = STREAMING_PAYOFFS[payOff][0](F, strikes.reshape((-1,) + (1,)*len(shape)), call_or_put) 
+    if len(shape) == 2: 
+        V = V.mean(axis = 1) 
+    return V 
+
+def multi_payOff_sums(chunks, spec): 
+    """
+    Calculate the number of samples and the sums and sums of squares of the payoffs of every contract of a spec over chunks of path features 
+
+    : param chunks : Iterable of dictionaries of path features 
+    : param spec   : Payoff spec 
+    : return       : number of samples, numpy array of sums, numpy array of sums of squares 
+    """
+    n, total, total_sq = 0, np.zeros(len(spec)), np.zeros(len(spec)) 
+    for F in chunks: 
+        V = multi_payOff_values(F, spec).astype(np.float64, copy = False) 
+        n        += V.shape[1] 
+        total    += np.sum(V, axis = 1) 
+        total_sq += np.sum(V**2, axis = 1) 
+    return n, total, total_sq 
+
+def stream_multi_payOff(chunks, spec): 
+    """
+    Calculate the mean payoff and its standard error for every contract of a spec over chunks of path features 
+
+    : param chunks : Iterable of dictionaries of path features 
+    : param spec   : Payoff spec 
+    : return       : numpy array of mean payoffs, numpy array of standard errors 
+    """
+    return mean_std_error(*multi_payOff_sums(chunks, spec)) 
+
+def multi_payOff(S, spec): 
+    """
+    Calculate the mean payoff and its standard error for every contract of a spec from a numpy array of paths 
+
+    : param S    : Numpy array of the paths 
+    : param spec : Payoff spec 
+    : return     : numpy array of mean payoffs, numpy array of standard errors 
+    """
+    return stream_multi_payOff([path_features(S, spec_features(spec))], spec) 
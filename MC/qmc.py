@@ -0,0 +1,138 @@
+import numpy as np
+
+import cache 
+
+
+SAMPLERS = ('random', 'sobol')
+
+
+def _bridge_plan(num_steps): 
+    """
+    Calculate the order in which a Brownian bridge fills the points of a time grid 
+
+    The terminal point comes first and every interval is then bisected breadth-first, so the 
+    first quasi-random dimensions drive the large scale shape of the path. 
+
+    : param num_steps : Number of steps of the grid 
+    : return          : List of tuples (point, left point, right point), right being None for the terminal point 
+    """
+    plan  = [(num_steps, 0, None)] 
+    queue = [(0, num_steps)] 
+    while queue: 
+        left, right = queue.pop(0) 
+        if right - left > 1: 
+            mid = (left + right)//2 
+            plan.append((mid, left, right)) 
+            queue += [(left, mid), (mid, right)] 
+    return plan 
+
+
+def brownian_bridge(Z): 
+    """
+    Turn standard normal draws into Brownian increments using a Brownian bridge 
+
+    : param Z : Numpy array of standard normal draws with shape (num_simulations, num_steps), dimensions in order of importance 
+    : return  : Numpy array of standard normal increments with shape (num_simulations, num_steps), in time order 
+    """
+    num_steps = Z.shape[1] 
+    # Brownian motion on the grid 0, 1, ..., num_steps (unit time steps) 
+    W = np.zeros((Z.shape[0], num_steps + 1)) 
+    for dim, (k, left, right) in enumerate(_bridge_plan(num_steps)): 
+        if right is None: 
+            W[:, k] = np.sqrt(k)*Z[:, dim] 
+        else: 
+            mean = ((right - k)*W[:, left] + (k - left)*W[:, right])/(right - left) 
+            std  = np.sqrt((k - left)*(right - k)/(right - left)) 
+            W[:, k] = mean + std*Z[:, dim] 
+    return np.diff(W, axis = 1) 
+
+
+def shock_sampler(num_steps, num_factors = 1, sampler = 'random', rng = None): 
+    """
+    Create a function drawing standard normal shocks for the paths of a model 
+
+    With 'sobol' a single scrambled Sobol sequence is used for all the draws, so consecutive 
+    calls continue the sequence. The sequence is generated in power of 2 blocks whatever the 
+    sizes of the draws. The dimensions of the factors are interleaved and each factor is built 
+    with a Brownian bridge. As the points of one sequence are not independent, the sample 
+    standard error of a price computed from them is not a valid error estimate: use rqmc_price. 
+
+    : param num_steps   : Number of time steps of the paths 
+    : param num_factors : Number of Wiener processes of the model (default value: 1) 
+    : param sampler     : 'random' (pseudo-random numbers) or 'sobol' (scrambled Sobol points) (default value: 'random') 
+    : param rng         : numpy Generator to draw from or to scramble with (default value: None, the global numpy random state or a fresh scramble) 
+    : return            : Function taking a number of paths n and returning shocks with shape (num_factors, n, num_steps) 
+    """
+    if sampler == 'random': 
+        source = np.random if rng is None else rng 
+        return lambda n: source.normal(0, 1, (num_factors, n, num_steps)) 
+
+    elif sampler == 'sobol': 
+        # scipy is only needed for quasi-random sampling 
+        from scipy.stats import qmc as scipy_qmc 
+        from scipy.special import ndtri 
+
+        engine = scipy_qmc.Sobol(num_factors*num_steps, scramble = True, seed = rng) 
+        # Sobol points keep their balance properties only when generated in blocks of 2^m with 
+        # a power of 2 total, so the engine is always advanced by doubling and the points not 
+        # used yet are kept for the next call 
+        pending = [np.empty((0, num_factors*num_steps))] 
+
+        def draw(n): 
+            U = pending[0] 
+            while U.shape[0] < n: 
+                m = max(int(np.ceil(np.log2(n - U.shape[0]))), 0) if engine.num_generated == 0 else int(np.log2(engine.num_generated)) 
+                U = np.concatenate([U, engine.random_base2(m)]) 
+            pending[0] = U[n:] 
+            Z = ndtri(U[:n]).reshape(n, num_steps, num_factors) 
+            return np.stack([brownian_bridge(Z[:, :, f]) for f in range(num_factors)]) 
+        return draw 
+
+    else: 
+        raise ValueError("Please choose an appropiate sampler ('random' or 'sobol')") 
+
+
+def fill_normals(rng, out): 
+    """
+    Fill a numpy array with standard normal draws, in place when rng is a numpy Generator 
+
+    : param rng : numpy Generator or the numpy.random module 
+    : param out : Numpy array to fill 
+    : return    : out 
+    """
+    if isinstance(rng, np.random.Generator): 
+        return rng.standard_normal(out.shape, dtype = out.dtype, out = out) 
+    out[...] = rng.normal(0, 1, out.shape) 
+    return out 
+
+
+def shocks(num_steps, num_simulations, num_factors = 1, sampler = 'random', seed = None): 
+    """
+    Draw standard normal shocks for the paths of a model. With a seed the shocks are reproducible 
+    and kept in the shared path cache (see cache.py) 
+
+    : param num_steps       : Number of time steps of the paths 
+    : param num_simulations : Number of paths 
+    : param num_factors     : Number of Wiener processes of the model (default value: 1) 
+    : param sampler         : 'random' or 'sobol' (default value: 'random') 
+    : param seed            : Seed, or numpy SeedSequence (default value: None, fresh randomness and no caching) 
+    : return                : Numpy array of shocks with shape (num_factors, num_simulations, num_steps) 
+    """
+    if seed is None: 
+        return shock_sampler(num_steps, num_factors = num_factors, sampler = sampler)(num_simulations) 
+    key = ('shocks', num_steps, num_simulations, num_factors, sampler, cache.seed_key(seed)) 
+    return cache.cached(key, lambda: shock_sampler(num_steps, num_factors = num_factors, sampler = sampler, rng = np.random.default_rng(seed))(num_simulations)) 
+
+
+def rqmc_price(price_fn, num_replications = 16, seed = None): 
+    """
+    Calculate a price and its standard error from independent randomized QMC replications 
+
+    : param price_fn         : Function taking an integer seed and returning a price (e.g. a pricer called with sampler = 'sobol') 
+    : param num_replications : Number of independent scrambles (default value: 16) 
+    : param seed             : Seed of the root SeedSequence (default value: None) 
+    : return                 : mean price, standard error 
+    """
+    seeds  = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(num_replications)] 
+    prices = np.array([price_fn(s) for s in seeds]) 
+    return np.mean(prices), np.std(prices, ddof = 1)/np.sqrt(num_replications) 
@@ -0,0 +1,106 @@
+import numpy as np 
+
+
+def _mean_std_error(X, paired = False): 
+    """
+    Calculate the sample mean and its standard error 
+
+    : param X      : Numpy array with one estimate per path 
+    : param paired : Boolean indicating whether the second half of X holds the antithetic paths of the first half (default value: False) 
+    : return       : mean, standard error of the mean 
+    """
+    if paired: 
+        n = X.shape[0]//2 
+        X = (X[:n] + X[n:])/2 
+    return np.mean(X), np.std(X, ddof = 1)/np.sqrt(X.shape[0]) 
+
+
+def crn_greeks(simulate, payOff, K, call_or_put, r, base, greeks = ('delta', 'gamma', 'vega', 'theta'), rel_bump = 0.01, paired = False): 
+    """
+    Calculate the price and greeks of an option by finite differences with common random numbers 
+
+    Every bumped scenario is simulated from the same shocks, so the differences between 
+    scenarios are taken path by path and most of the MC noise cancels out. 
+
+    : param simulate    : Function taking the keyword arguments of base (S_0, T and optionally sigma) and returning the simulated paths, always from the same shocks 
+    : param payOff      : Payoff function of the paths (e.g. payOffs.EuPayOff) 
+    : param K           : Strike price 
+    : param call_or_put : Type of option, as in payOff 
+    : param r           : Risk-free interest rate 
+    : param base        : Dictionary with the unbumped values of 'S_0', 'T' and optionally 'sigma' 
+    : param greeks      : Greeks to calculate, any of 'delta', 'gamma', 'vega' and 'theta' (default value: all of them) 
+    : param rel_bump    : Relative size of the central differences bumps (default value: 0.01) 
+    : param paired      : Boolean indicating whether the paths contain antithetic pairs (default value: False) 
+    : return            : Dictionary mapping 'price' and each greek to a tuple (value, standard error) 
+    """
+    def discounted_payOff(**bumped): 
+        params = dict(base, **bumped) 
+        S = simulate(**params) 
+        if isinstance(S, tuple): 
+            S = S[0] 
+        return np.exp(-r*params['T'])*payOff(S, K, call_or_put) 
+
+    X = discounted_payOff() 
+    result = {'price': _mean_std_error(X, paired)} 
+
+    if 'delta' in greeks or 'gamma' in greeks: 
+        h = rel_bump*base['S_0'] 
+        X_up = discounted_payOff(S_0 = base['S_0'] + h) 
+        X_dn = discounted_payOff(S_0 = base['S_0'] - h) 
+        if 'delta' in greeks: 
+            result['delta'] = _mean_std_error((X_up - X_dn)/(2*h), paired) 
+        if 'gamma' in greeks: 
+            result['gamma'] = _mean_std_error((X_up - 2*X + X_dn)/h**2, paired) 
+
+    if 'vega' in greeks: 
+        h = rel_bump*base['sigma'] 
+        X_up = discounted_payOff(sigma = base['sigma'] + h) 
+        X_dn = discounted_payOff(sigma = base['sigma'] - h) 
+        result['vega'] = _mean_std_error((X_up - X_dn)/(2*h), paired) 
+
+    if 'theta' in greeks: 
+        h = rel_bump*base['T'] 
+        X_up = discounted_payOff(T = base['T'] + h) 
+        X_dn = discounted_payOff(T = base['T'] - h) 
+        result['theta'] = _mean_std_error((X_up - X_dn)/(2*h), paired) 
+
+    return result 
+
+
+def GBM_pathwise_greeks(r, sigma, S_0, K, T, call_or_put, Z, paired = False): 
+    """
+    Calculate the price and greeks of an European option under GBM from a single simulation 
+
+    Delta, vega and theta use pathwise derivatives of the exactly sampled terminal price, 
+    gamma the mixed likelihood ratio - pathwise estimator. 
+
+    : param r           : Risk-free interest rate 
+    : param sigma       : Volatility 
+    : param S_0         : Spot price 
+    : param K           : Strike price 
+    : param T           : Maturity 
+    : param call_or_put : Whether the option is a call ('C') or a put ('P') 
+    : param Z           : Numpy array of standard normal draws, one per path 
+    : param paired      : Boolean indicating whether the second half of Z is the antithetic of the first half (default value: False) 
+    : return            : Dictionary mapping 'price', 'delta', 'gamma', 'vega' and 'theta' to a tuple (value, standard error) 
+    """
+    if call_or_put == 'C': 
+        w = 1 
+    elif call_or_put == 'P': 
+        w = -1 
+    else: 
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P')") 
+
+    disc = np.exp(-r*T) 
+    S_T  = S_0*np.exp((r - sigma**2/2)*T + sigma*np.sqrt(T)*Z) 
+    # w times the derivative of the payoff with respect to S_T 
+    itm  = w*(w*(S_T - K) > 0) 
+
+    price = disc*np.maximum(w*(S_T - K), 0) 
+    delta = disc*itm*S_T/S_0 
+    gamma = disc*itm*K*Z/(S_0**2*sigma*np.sqrt(T)) 
+    vega  = disc*itm*S_T*(np.sqrt(T)*Z - sigma*T) 
+    theta = -r*price + disc*itm*S_T*(r - sigma**2/2 + sigma*Z/(2*np.sqrt(T))) 
+
+    return {name: _mean_std_error(X, paired) for name, X in 
+            (('price', price), ('delta', delta), ('gamma', gamma), ('vega', vega), ('theta', theta))} 
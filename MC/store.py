@@ -0,0 +1,222 @@
+import json 
+import numbers 
+import os 
+
+import numpy as np 
+
+import GBM 
+import heston 
+import parallel 
+import payOffs 
+import qmc 
+
+
+# A path store is a directory with the prices ('S.npy'), the variances for Heston model ('v.npy') 
+# and the metadata ('meta.json'). The metadata is written last, so a store whose generation was 
+# interrupted cannot be opened. 
+
+def _seed_entropy(seed): 
+    """
+    Turn the seed of a store into an integer that reproduces the paths and can be saved in the metadata 
+
+    The seed is checked before anything is written, so an unusable seed does not leave paths without metadata 
+
+    : param seed : None (fresh entropy), a non negative integer or a numpy SeedSequence that was not spawned 
+    : return     : integer seed 
+    """
+    if seed is None: 
+        return np.random.SeedSequence().entropy 
+    if isinstance(seed, np.random.SeedSequence) and not seed.spawn_key: 
+        return seed.entropy 
+    if isinstance(seed, (int, np.integer)) and not isinstance(seed, bool) and seed >= 0: 
+        return int(seed) 
+    raise ValueError("Please choose an appropiate value for seed (None, a non negative integer or a numpy SeedSequence that was not spawned)") 
+
+
+def _write_store(directory, model, params, shape, simulate_chunk, chunk_size, dtype, extra_arrays = ()): 
+    """
+    Write paths chunk by chunk into memory-mapped .npy files 
+
+    : param directory      : Directory of the store, created if needed 
+    : param model          : Name of the model 
+    : param params         : Dictionary with the parameters of the simulation, saved in the metadata 
+    : param shape          : Shape of the price array (num_simulations, num_steps + 1) 
+    : param simulate_chunk : Function taking a number of paths and returning a tuple of arrays, prices first 
+    : param chunk_size     : Number of paths simulated and written at a time 
+    : param dtype          : dtype of the stored paths 
+    : param extra_arrays   : Names of the arrays returned after the prices 
+    """
+    os.makedirs(directory, exist_ok = True) 
+    meta_path = os.path.join(directory, 'meta.json') 
+    if os.path.exists(meta_path): 
+        os.remove(meta_path) 
+
+    names = ('S',) + tuple(extra_arrays) 
+    arrays = [np.lib.format.open_memmap(os.path.join(directory, name + '.npy'), mode = 'w+', dtype = dtype, shape = shape) for name in names] 
+    for start, n in zip(range(0, shape[0], chunk_size), parallel.chunk_sizes(shape[0], chunk_size)): 
+        for array, values in zip(arrays, simulate_chunk(n)): 
+            array[start:start + n] = values 
+    for array in arrays: 
+        array.flush() 
+    del arrays 
+
+    meta = {'model': model, 'params': params, 'arrays': list(names), 'shape': list(shape), 'dtype': np.dtype(dtype).name, 'chunk_size': chunk_size} 
+    with open(meta_path, 'w') as f: 
+        json.dump(meta, f, indent = 1) 
+    return PathStore(directory) 
+
+
+def write_GBM_store(directory, r, sigma, S_0, num_steps, T, num_simulations = 10000, integration_method = 'exact', seed = None, sampler = 'random', 
+                    chunk_size = 10000, dtype = np.float64): 
+    """
+    Simulate GBM paths and write them into an out-of-core path store 
+
+    Only one chunk of paths is in memory at a time. For a given seed and chunk_size the stored 
+    paths are reproducible. 
+
+    : param directory          : Directory of the store 
+    : param r                  : The drift 
+    : param sigma              : The volatility 
+    : param S_0                : The initial price 
+    : param num_steps          : Number of steps for the random path generation  
+    : param T                  : Time length of the generated path 
+    : param num_simulations    : The number of paths generated (default value: 10000) 
+    : param integration_method : SDE integration method, as in GBM.GBM (default value: 'exact') 
+    : param seed               : Seed of the simulation, a non negative integer or a numpy SeedSequence that was not spawned, saved in the metadata as an integer (default value: None, fresh entropy) 
+    : param sampler            : 'random' or 'sobol' (default value: 'random') 
+    : param chunk_size         : Number of paths simulated and written at a time (default value: 10000) 
+    : param dtype              : dtype of the stored paths (default value: numpy.float64) 
+    : return                   : PathStore 
+    """
+    seed = _seed_entropy(seed) 
+    draw = qmc.shock_sampler(num_steps, sampler = sampler, rng = np.random.default_rng(seed)) 
+    simulate_chunk = lambda n: (GBM.GBM_paths(r, sigma, S_0, T, draw(n)[0], integration_method = integration_method),) 
+    params = {'r': r, 'sigma': sigma, 'S_0': S_0, 'num_steps': num_steps, 'T': T, 'num_simulations': num_simulations, 
+              'integration_method': integration_method, 'sampler': sampler, 'seed': seed} 
+    return _write_store(directory, 'GBM', params, (num_simulations, num_steps + 1), simulate_chunk, chunk_size, dtype) 
+
+
+def write_heston_store(directory, r, sigma_0, S_0, kappa, theta, xi, num_steps, T, corr_index = 0, num_simulations = 10000, scheme = 'E', seed = None, 
+                       sampler = 'random', chunk_size = 10000, dtype = np.float64): 
+    """
+    Simulate Heston paths (prices and variances) and write them into an out-of-core path store 
+
+    : param directory          : Directory of the store 
+    : param r                  : The drift 
+    : param sigma_0            : The initial variance 
+    : param S_0                : The initial price 
+    : param kappa              : Kappa parameter in Heston model 
+    : param theta              : Theta parameter in Heston model 
+    : param xi                 : Xi parameter in Heston model 
+    : param num_steps          : Number of steps for the random path generation  
+    : param T                  : Time length of the generated path 
+    : param corr_index         : Correlation index between the two Wiener processes (default value: 0) 
+    : param num_simulations    : The number of paths generated (default value: 10000) 
+    : param scheme             : 'E' (full truncation Euler-Maruyama) or 'QE' (Andersen quadratic-exponential) (default value: 'E') 
+    : param seed               : Seed of the simulation, a non negative integer or a numpy SeedSequence that was not spawned, saved in the metadata as an integer (default value: None, fresh entropy) 
+    : param sampler            : 'random' or 'sobol' (default value: 'random') 
+    : param chunk_size         : Number of paths simulated and written at a time (default value: 10000) 
+    : param dtype              : dtype of the stored paths (default value: numpy.float64) 
+    : return                   : PathStore 
+    """
+    seed = _seed_entropy(seed) 
+    draw = qmc.shock_sampler(num_steps, num_factors = 2, sampler = sampler, rng = np.random.default_rng(seed)) 
+    simulate_chunk = lambda n: heston.heston_paths(r, sigma_0, S_0, kappa, theta, xi, T, draw(n), corr_index = corr_index, scheme = scheme) 
+    params = {'r': r, 'sigma_0': sigma_0, 'S_0': S_0, 'kappa': kappa, 'theta': theta, 'xi': xi, 'num_steps': num_steps, 'T': T, 'corr_index': corr_index, 
+              'num_simulations': num_simulations, 'scheme': scheme, 'sampler': sampler, 'seed': seed} 
+    return _write_store(directory, 'heston', params, (num_simulations, num_steps + 1), simulate_chunk, chunk_size, dtype, extra_arrays = ('v',)) 
+
+
+class PathStore: 
+    def __init__(self, directory): 
+        """
+        Open an out-of-core path store for reading. The paths are memory-mapped, nothing is loaded until used 
+
+        : param directory : Directory of the store 
+        """
+        meta_path = os.path.join(directory, 'meta.json') 
+        if not os.path.exists(meta_path): 
+            raise ValueError("No complete path store in " + str(directory)) 
+        with open(meta_path) as f: 
+            self.meta = json.load(f) 
+
+        self.directory = directory 
+        self.model     = self.meta['model'] 
+        self.params    = self.meta['params'] 
+        self.S = np.load(os.path.join(directory, 'S.npy'), mmap_mode = 'r') 
+        self.v = np.load(os.path.join(directory, 'v.npy'), mmap_mode = 'r') if 'v' in self.meta['arrays'] else None 
+
+    def __len__(self): 
+        """
+        Number of stored paths 
+        """
+        return self.S.shape[0] 
+
+    def discount(self): 
+        """
+        Discount factor exp(-r T) from the parameters of the simulation 
+
+        : return : float 
+        """
+        return np.exp(-self.params['r']*self.params['T']) 
+
+    def blocks(self, block_size = 10000): 
+        """
+        Read the price paths in blocks 
+
+        : param block_size : Number of paths per block (default value: 10000) 
+        : return           : Generator of numpy arrays of paths 
+        """
+        for start in range(0, len(self), block_size): 
+            yield np.asarray(self.S[start:start + block_size]) 
+
+    def feature_chunks(self, features, block_size = 10000): 
+        """
+        Read the price paths in blocks and reduce them to path features, as GBM.GBM_chunks does for fresh paths 
+
+        : return : Generator of dictionaries of path features 
+        """
+        for S in self.blocks(block_size): 
+            yield payOffs.path_features(S, features) 
+
+    def price(self, payOff, K, call_or_put, block_size = 10000): 
+        """
+        Calculate the value of an option from the stored paths, streaming them in blocks 
+
+        : param payOff      : Payoff function of the paths, e.g. payOffs.EuPayOff 
+        : param K           : Strike price 
+        : param call_or_put : Type of option, as in payOff 
+        : param block_size  : Number of paths per block (default value: 10000) 
+        : return            : Value of the option, standard error 
+        """
+        n, total, total_sq = 0, 0.0, 0.0 
+        for S in self.blocks(block_size): 
+            V = payOff(S, K, call_or_put) 
+            n        += V.size 
+            total    += np.sum(V) 
+            total_sq += np.sum(V**2) 
+        mean, std_error = payOffs.mean_std_error(n, total, total_sq) 
+        return self.discount()*mean, self.discount()*std_error 
+
+    def multi_price(self, spec, block_size = 10000): 
+        """
+        Calculate the values of every contract of a payoff spec from the stored paths (see payOffs.strike_ladder) 
+
+        : return : numpy array of values, numpy array of standard errors 
+        """
+        mean, std_error = payOffs.stream_multi_payOff(self.feature_chunks(payOffs.spec_features(spec), block_size), spec) 
+        return self.discount()*mean, self.discount()*std_error 
+
+    def check_params(self, **params): 
+        """
+        Raise a ValueError if the store was not simulated with the given parameters. Numbers are compared 
+        up to rounding, other values (e.g. integration_method, scheme or sampler) must be equal 
+        """
+        for name, value in params.items(): 
+            stored = self.params[name] 
+            if isinstance(stored, numbers.Number) and isinstance(value, numbers.Number): 
+                same = np.isclose(stored, value) 
+            else: 
+                same = stored == value 
+            if not same: 
+                raise ValueError("The path store was simulated with " + name + " = " + str(self.params[name]) + ", not " + str(value)) 
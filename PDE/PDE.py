@@ -0,0 +1,167 @@
+import numpy as np
+
+
+def _boundary_values(y, tau, r, call_or_put, optionType, div):
+    """
+    Values at the ends of the grid of the option with unit strike, from their asymptotic behaviour
+
+    : param y   : Log-moneyness log(S/K) of the lower and upper ends of the grid
+    : param tau : Time to maturity
+    : return    : value at the lower end, value at the upper end
+    """
+    S = np.exp(y)
+    forward = S*np.exp(-div*tau) - np.exp(-r*tau)
+    if call_or_put == 'C':
+        V = np.array([0, forward[1]])
+        if optionType == 'A':
+            V[1] = max(V[1], S[1] - 1)
+    else:
+        V = np.array([-forward[0], 0])
+        if optionType == 'A':
+            V[0] = max(V[0], 1 - S[0])
+    return V
+
+
+def _solve_tridiagonal(ab, rhs):
+    """
+    Solve a tridiagonal system given in banded form (upper diagonal, diagonal, lower diagonal)
+
+    Uses scipy.linalg.solve_banded when scipy is installed, and the Thomas algorithm otherwise
+    """
+    try:
+        from scipy.linalg import solve_banded
+    except ImportError:
+        upper, diag, lower = ab[0, 1:], ab[1].copy(), ab[2, :-1]
+        x = rhs.astype(float)
+        for i in range(1, diag.size):
+            w = lower[i-1]/diag[i-1]
+            diag[i] -= w*upper[i-1]
+            x[i] -= w*x[i-1]
+        x[-1] /= diag[-1]
+        for i in range(diag.size - 2, -1, -1):
+            x[i] = (x[i] - upper[i]*x[i+1])/diag[i]
+        return x
+    return solve_banded((1, 1), ab, rhs, check_finite = False)
+
+
+def _solve(r, sigma, T, call_or_put, optionType, div, y_min, y_max, num_space, num_time, rannacher_steps, penalty, max_penalty_iter):
+    """
+    Solve the Black-Scholes PDE for an option with unit strike on a log-moneyness grid
+
+    In time to maturity tau and y = log(S/K) the PDE has constant coefficients:
+        V_tau = sigma^2/2 V_yy + (r - div - sigma^2/2) V_y - r V
+    It is discretized with central differences, and stepped with Crank-Nicolson after rannacher_steps steps
+    that are each replaced by two fully implicit half steps, which damp the oscillations caused by the kink of
+    the payoff. The early exercise constraint of American options is enforced with the penalty method of
+    Forsyth and Vetzal: every step is solved again with a large penalty on the nodes below the payoff until
+    the set of exercised nodes does not change.
+
+    : return : grid of y, values at tau = T, values one and two steps before, time step
+    """
+    # Grid with the strike (y = 0) on a node
+    dy = (y_max - y_min)/num_space
+    y = np.arange(np.floor(y_min/dy), np.ceil(y_max/dy) + 1)*dy
+    n = y.size
+    payOff = np.maximum(np.exp(y) - 1, 0) if call_or_put == 'C' else np.maximum(1 - np.exp(y), 0)
+
+    # Tridiagonal operator of the PDE on the interior nodes: a V_{j-1} + b V_j + c V_{j+1}
+    drift = r - div - sigma**2/2
+    a = sigma**2/(2*dy**2) - drift/(2*dy)
+    b = -sigma**2/dy**2 - r
+    c = sigma**2/(2*dy**2) + drift/(2*dy)
+
+    def step(V, tau, dt, theta):
+        # (I - theta dt A) V_new = (I + (1 - theta) dt A) V, with the boundary rows set to the boundary values
+        rhs = V.copy()
+        rhs[1:-1] += (1 - theta)*dt*(a*V[:-2] + b*V[1:-1] + c*V[2:])
+        rhs[[0, -1]] = _boundary_values(y[[0, -1]], tau, r, call_or_put, optionType, div)
+        ab = np.zeros((3, n))
+        ab[0, 2:]   = -theta*dt*c
+        ab[1]       = 1
+        ab[1, 1:-1] = 1 - theta*dt*b
+        ab[2, :-2]  = -theta*dt*a
+        V_new = _solve_tridiagonal(ab, rhs)
+        if optionType == 'A':
+            exercised = None
+            for _ in range(max_penalty_iter):
+                below = V_new < payOff
+                below[[0, -1]] = False
+                if exercised is not None and np.array_equal(below, exercised):
+                    break
+                exercised = below
+                ab_p = ab.copy()
+                ab_p[1] += penalty*below
+                V_new = _solve_tridiagonal(ab_p, rhs + penalty*below*payOff)
+        return V_new
+
+    dt = T/num_time
+    V, tau = payOff, 0.0
+    history = [V]
+    for i in range(num_time):
+        if i < rannacher_steps:
+            for _ in range(2):
+                V = step(V, tau + dt/2, dt/2, 1)
+                tau += dt/2
+        else:
+            V = step(V, tau + dt, dt, 0.5)
+            tau += dt
+        history = history[-2:] + [V]
+    return y, history[-1], history[-2], history[-3], dt
+
+
+def fd_price(r, sigma, S, K, T, call_or_put, optionType = 'E', div = 0, num_space = 400, num_time = 200, width = 6, rannacher_steps = 2, penalty = 1e8,
+             max_penalty_iter = 20):
+    """
+    Calculate the value and greeks of European or American options on a grid of spots with the Crank-Nicolson method
+
+    One PDE is solved on a log-moneyness grid for the unit strike option. As the Black-Scholes PDE in log(S/K) does not
+    depend on K, the values of all the spots and strikes requested follow from that single solve (V(S, K) = K v(log(S/K)))
+
+    : param r                : Risk-free interest rate
+    : param sigma            : Volatility
+    : param S                : Spot price or numpy array of spot prices
+    : param K                : Strike price or numpy array of strike prices (broadcast against S)
+    : param T                : Time for maturity
+    : param call_or_put      : Type of option: Call ('C') or Put ('P')
+    : param optionType       : European ('E') or American ('A') (default value: 'E')
+    : param div              : Dividends (default value: 0)
+    : param num_space        : Number of space steps across the range of log-moneyness (default value: 400)
+    : param num_time         : Number of time steps (default value: 200)
+    : param width            : Half width of the grid beyond the requested log-moneyness, in standard deviations sigma*sqrt(T) (default value: 6)
+    : param rannacher_steps  : Number of initial time steps replaced by two implicit half steps (default value: 2)
+    : param penalty          : Penalty factor enforcing early exercise for American options (default value: 1e8)
+    : param max_penalty_iter : Maximum number of penalty iterations per time step (default value: 20)
+    : returns                : Dictionary of numpy arrays (shaped as S and K broadcast) with keys 'value', 'delta', 'gamma' and 'theta'. 
+                               As BlackScholes.theta, theta is dV/dt (negative for most options), PDEOption.theta returns -dV/dt 
+    """
+    if call_or_put not in ('C', 'P'):
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))")
+    if optionType not in ('E', 'A'):
+        raise ValueError("optionType has to be European ('E') or American ('A')")
+    if num_time < rannacher_steps + 2:
+        raise ValueError("Please choose an appropiate value for num_time (at least rannacher_steps + 2)")
+
+    S, K = np.broadcast_arrays(np.asarray(S, dtype = float), np.asarray(K, dtype = float))
+    y_req = np.log(S/K)
+    half_width = width*sigma*np.sqrt(T)
+    y_min = min(np.min(y_req), 0) - half_width + min(r - div - sigma**2/2, 0)*T
+    y_max = max(np.max(y_req), 0) + half_width + max(r - div - sigma**2/2, 0)*T
+
+    y, v, v_1, v_2, dt = _solve(r, sigma, T, call_or_put, optionType, div, y_min, y_max, num_space, num_time, rannacher_steps, penalty, max_penalty_iter)
+
+    dy = y[1] - y[0]
+    v_y  = np.gradient(v, dy)
+    v_yy = np.empty_like(v)
+    v_yy[1:-1] = (v[2:] - 2*v[1:-1] + v[:-2])/dy**2
+    v_yy[[0, -1]] = v_yy[[1, -2]]
+    # dV/dt = -dV/dtau, with the second order backward difference of the last steps
+    v_t = -(3*v - 4*v_1 + v_2)/(2*dt)
+
+    # Linear interpolation in log-moneyness keeps the O(dy^2) accuracy of the scheme
+    value, delta_y, gamma_y, theta = (np.interp(y_req, y, f) for f in (v, v_y, v_yy, v_t))
+    return {
+        'value': K*value,
+        'delta': K*delta_y/S,
+        'gamma': K*(gamma_y - delta_y)/S**2,
+        'theta': K*theta,
+    }
@@ -0,0 +1,65 @@
+import numpy as np 
+
+import PDE
+
+class PDEOption: 
+    def __init__(self, risk_free_rate, volatility, spot_price, strike_price, maturity, call_or_put, option_type = 'E', div = 0, num_space = 400, num_time = 200): 
+        self.r         = risk_free_rate
+        self.sigma     = volatility 
+        self.S         = spot_price
+        self.K         = strike_price
+        self.T         = maturity 
+        self.CoP       = call_or_put
+        self.OT        = option_type
+        self.div       = div 
+        self.num_space = num_space
+        self.num_time  = num_time
+
+        # A single PDE solve gives the value and greeks of every spot price (spot_price may be an array)
+        self.results = PDE.fd_price(self.r, self.sigma, self.S, self.K, self.T, self.CoP, self.OT, div = self.div, num_space = self.num_space, num_time = self.num_time)
+
+    def value(self): 
+        """
+        Get the value of the option 
+        : return : The value of the option
+        """
+        return self.results['value']
+
+    def delta(self): 
+        """
+        Get the delta of the option 
+        : return : Delta of the option
+        """
+        return self.results['delta']
+
+    def gamma(self): 
+        """
+        Get the gamma of the option 
+        : return : Gamma of the option
+        """
+        return self.results['gamma']
+
+    def theta(self): 
+        """
+        Get the theta of the option, with the sign convention of the other option classes (minus dV/dt, 
+        the derivative of the value with respect to maturity) 
+        : return : Theta of the option
+        """
+        return -self.results['theta']
+
+    def vega(self): 
+        """
+        Calculates the vega of the option 
+        : return : Vega of the option
+        """
+        new_sigma = 1.01*self.sigma
+        new_results = PDE.fd_price(self.r, new_sigma, self.S, self.K, self.T, self.CoP, self.OT, div = self.div, num_space = self.num_space, num_time = self.num_time)
+
+        return (new_results['value'] - self.results['value'])/(new_sigma - self.sigma) 
+
+    def greeks(self): 
+        """
+        Get the main greeks of the option 
+        : return : Dictionary with the delta, gamma, theta (same sign convention as the theta method) and vega of the option 
+        """
+        return {'delta': self.delta(), 'gamma': self.gamma(), 'theta': self.theta(), 'vega': self.vega()}
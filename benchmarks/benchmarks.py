@@ -0,0 +1,308 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for folder in ('BinOP', 'BlackScholes', 'MC', 'Fourier', 'PDE'):
+    sys.path.append(os.path.join(ROOT, folder))
+
+import BinOP
+import BlackScholes
+import GBM
+import heston
+import cos
+import PDE
+import profiling
+
+
+# Reference contract used by every benchmark. Heston parameters follow MC/heston.py
+OPTION = {'r': 0.05, 'sigma': 0.2, 'S_0': 100, 'K': 100, 'T': 1}
+HESTON = {'sigma_0': 0.04, 'kappa': 2, 'theta': 0.04, 'xi': 0.3, 'corr_index': -0.7}
+
+# Parameter grids. QUICK_GRIDS is a smaller version for a fast check
+GRIDS = {
+    'tree_steps'         : [25, 50, 100, 200, 400, 800, 1600],
+    'reference_steps'    : 10000,
+    'num_strikes'        : [10, 100, 1000, 10000],
+    'num_simulations'    : [10**3, 10**4, 10**5],
+    'num_steps'          : [10, 50, 250],
+    'integration_methods': ['exact', 'E', 'M', 'RK'],
+    'heston_schemes'     : ['E', 'QE'],
+    'num_repeats'        : 5,
+}
+QUICK_GRIDS = {
+    'tree_steps'         : [25, 50, 100, 200],
+    'reference_steps'    : 2000,
+    'num_strikes'        : [10, 1000],
+    'num_simulations'    : [10**3, 10**4],
+    'num_steps'          : [10, 50],
+    'integration_methods': ['exact', 'E', 'M', 'RK'],
+    'heston_schemes'     : ['E', 'QE'],
+    'num_repeats'        : 3,
+}
+
+
+def measure(f, *args, **kwargs):
+    """
+    Run a function measuring its wall time and its peak memory
+
+    The peak memory is measured with tracemalloc in a first run, which also warms up imports and caches. 
+    The wall time is measured in a second, untraced run 
+
+    : param f : Function to run, followed by its arguments
+    : return  : value returned by f, wall time in seconds, peak memory in MiB
+    """
+    tracemalloc.start()
+    f(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    value = f(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    return value, elapsed, peak/2**20
+
+def repeat(f, seeds, **kwargs):
+    """
+    Run a Monte Carlo pricer once per seed
+
+    : param f     : Pricer taking a seed keyword
+    : param seeds : Iterable of seeds
+    : return      : numpy array of values, median wall time in seconds, peak memory in MiB of the first run
+    """
+    values, times, peak = [], [], None
+    for seed in seeds:
+        if peak is None:
+            value, elapsed, peak = measure(f, seed = seed, **kwargs)
+        else:
+            start = time.perf_counter()
+            value = f(seed = seed, **kwargs)
+            elapsed = time.perf_counter() - start
+        values.append(value)
+        times.append(elapsed)
+    return np.array(values), float(np.median(times)), peak
+
+def _row(engine, case, params, value, reference, elapsed, peak, std_error = None):
+    """
+    Build a result row. For Monte Carlo value is an array of repeated estimates, the error is their root mean square error
+    """
+    value = np.atleast_1d(np.asarray(value, dtype = float))
+    reference = np.broadcast_to(np.asarray(reference, dtype = float), value.shape)
+    row = {'engine': engine, 'case': case}
+    row.update(params)
+    row.update({
+        'value'    : float(np.mean(value)),
+        'reference': float(np.mean(reference)),
+        'error'    : float(np.sqrt(np.mean((value - reference)**2))),
+        'std_error': None if std_error is None else float(std_error),
+        'time'     : elapsed,
+        'memory'   : peak,
+    })
+    return row
+
+
+def bench_binop(grids):
+    """
+    Benchmark valueBinOp against Black-Scholes for European options and against a tree with grids['reference_steps'] steps for American options
+
+    : param grids : Parameter grids (see GRIDS)
+    : return      : list of result rows
+    """
+    r, sigma, S_0, K, T = (OPTION[key] for key in ('r', 'sigma', 'S_0', 'K', 'T'))
+    rows = []
+    for call_or_put in ('C', 'P'):
+        reference = BlackScholes.BSprice(r, sigma, S_0, K, T, call_or_put)
+        for M in grids['tree_steps']:
+            value, elapsed, peak = measure(BinOP.valueBinOp, r, sigma, S_0, K, T, call_or_put, 'E', M)
+            rows.append(_row('valueBinOp', 'european ' + call_or_put, {'M': M}, value, reference, elapsed, peak))
+
+    reference = BinOP.valueBinOp(r, sigma, S_0, K, T, 'P', 'A', grids['reference_steps'])
+    for M in grids['tree_steps']:
+        value, elapsed, peak = measure(BinOP.valueBinOp, r, sigma, S_0, K, T, 'P', 'A', M)
+        rows.append(_row('valueBinOp', 'american P', {'M': M}, value, reference, elapsed, peak))
+    for num_exercise in (8, 16, 32, 64):
+        value, elapsed, peak = measure(cos.gbm_american_cos, r, sigma, S_0, K, T, 'P', num_exercise = num_exercise)
+        rows.append(_row('gbm_american_cos', 'american P', {'num_exercise': num_exercise}, value, reference, elapsed, peak))
+    for num_space in (100, 200, 400, 800):
+        result, elapsed, peak = measure(PDE.fd_price, r, sigma, S_0, K, T, 'P', 'A', num_space = num_space, num_time = num_space//2)
+        rows.append(_row('fd_price', 'american P', {'num_space': num_space}, result['value'], reference, elapsed, peak))
+    return rows
+
+def bench_black_scholes(grids):
+    """
+    Benchmark BSprice and implied_vol on strike chains of growing size. The price error is measured against a high resolution 
+    COS price (cos.gbm_cos) and the implied volatility error against the input volatility
+
+    : param grids : Parameter grids (see GRIDS)
+    : return      : list of result rows
+    """
+    r, sigma, S_0, T = (OPTION[key] for key in ('r', 'sigma', 'S_0', 'T'))
+    rows = []
+    for num_strikes in grids['num_strikes']:
+        K = np.linspace(0.7*S_0, 1.3*S_0, num_strikes)
+        prices, elapsed, peak = measure(BlackScholes.BSprice, r, sigma, S_0, K, T, 'C')
+        # Independent reference: the COS method with many terms converges to the exact price to rounding error
+        reference = cos.gbm_cos(r, sigma, S_0, K, T, 'C', N = 1024, L = 12)
+        rows.append(_row('BSprice', 'european C', {'num_strikes': num_strikes}, prices, reference, elapsed, peak))
+
+        (vols, status), elapsed, peak = measure(BlackScholes.implied_vol, prices, r, S_0, K, T, 'C')
+        rows.append(_row('implied_vol', 'european C', {'num_strikes': num_strikes, 'num_failed': int(np.sum(status != 0))}, vols, sigma, elapsed, peak))
+    return rows
+
+def bench_gbm(grids):
+    """
+    Benchmark eu_GBM against Black-Scholes over path counts, step counts, integration methods and antithetic variates
+
+    : param grids : Parameter grids (see GRIDS)
+    : return      : list of result rows
+    """
+    r, sigma, S_0, K, T = (OPTION[key] for key in ('r', 'sigma', 'S_0', 'K', 'T'))
+    reference = BlackScholes.BSprice(r, sigma, S_0, K, T, 'C')
+    seeds = range(grids['num_repeats'])
+    rows = []
+    for integration_method in grids['integration_methods']:
+        for ant_variates in (False, True):
+            for num_steps in grids['num_steps']:
+                for num_simulations in grids['num_simulations']:
+                    values, elapsed, peak = repeat(GBM.eu_GBM, seeds, r = r, sigma = sigma, S_0 = S_0, K = K, num_steps = num_steps, T = T, call_or_put = 'C',
+                                                   num_simulations = num_simulations, integration_method = integration_method, ant_variates = ant_variates)
+                    params = {'integration_method': integration_method, 'ant_variates': ant_variates, 'num_steps': num_steps, 'num_simulations': num_simulations}
+                    rows.append(_row('eu_GBM', 'european C', params, values, reference, elapsed, peak, std_error = np.std(values, ddof = 1)))
+    return rows
+
+def bench_heston(grids):
+    """
+    Benchmark eu_heston against the COS method over path counts, step counts and discretization schemes
+
+    : param grids : Parameter grids (see GRIDS)
+    : return      : list of result rows
+    """
+    r, S_0, K, T = (OPTION[key] for key in ('r', 'S_0', 'K', 'T'))
+    sigma_0, kappa, theta, xi, corr_index = (HESTON[key] for key in ('sigma_0', 'kappa', 'theta', 'xi', 'corr_index'))
+    reference = cos.heston_cos(r, sigma_0, S_0, K, kappa, theta, xi, T, 'C', corr_index, N = 1024)
+    seeds = range(grids['num_repeats'])
+    rows = []
+    for scheme in grids['heston_schemes']:
+        for num_steps in grids['num_steps']:
+            for num_simulations in grids['num_simulations']:
+                values, elapsed, peak = repeat(heston.eu_heston, seeds, r = r, sigma_0 = sigma_0, S_0 = S_0, K = K, kappa = kappa, theta = theta, xi = xi, num_steps = num_steps,
+                                               T = T, call_or_put = 'C', corr_index = corr_index, num_simulations = num_simulations, scheme = scheme)
+                params = {'scheme': scheme, 'num_steps': num_steps, 'num_simulations': num_simulations}
+                rows.append(_row('eu_heston', 'european C', params, values, reference, elapsed, peak, std_error = np.std(values, ddof = 1)))
+    return rows
+
+
+BENCHMARKS = {
+    'binop'        : bench_binop,
+    'black_scholes': bench_black_scholes,
+    'gbm'          : bench_gbm,
+    'heston'       : bench_heston,
+}
+
+
+def run(benchmarks = None, quick = False, verbose = True):
+    """
+    Run benchmarks
+
+    : param benchmarks : Names of the benchmarks to run, keys of BENCHMARKS (default value: None, all of them)
+    : param quick      : Whether to use the small QUICK_GRIDS instead of GRIDS (default value: False)
+    : param verbose    : Whether to print each result row (default value: True)
+    : return           : list of result rows
+    """
+    grids = QUICK_GRIDS if quick else GRIDS
+    rows = []
+    for name in (BENCHMARKS if benchmarks is None else benchmarks):
+        if name not in BENCHMARKS:
+            raise ValueError("Please choose benchmarks from " + str(tuple(BENCHMARKS)))
+        for row in BENCHMARKS[name](grids):
+            if verbose:
+                print(format_row(row))
+            rows.append(row)
+    return rows
+
+def format_row(row):
+    """
+    Format a result row as one line of text
+    """
+    params = ', '.join(key + '=' + str(value) for key, value in row.items() if key not in ('engine', 'case', 'value', 'reference', 'error', 'std_error', 'time', 'memory'))
+    return '{:<17}{:<13}error {:.2e}  time {:.2e}s  memory {:8.2f}MiB  {}'.format(row['engine'], row['case'], row['error'], row['time'], row['memory'], params)
+
+
+def write_json(rows, path):
+    """
+    Write result rows to a JSON file, together with the machine they were obtained on
+    """
+    meta = {'python': sys.version.split()[0], 'numpy': np.__version__, 'platform': sys.platform, 'cpu_count': os.cpu_count(), 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+    with open(path, 'w') as f:
+        json.dump({'meta': meta, 'results': rows}, f, indent = 1)
+
+def write_csv(rows, path):
+    """
+    Write result rows to a CSV file, with one column per key appearing in any row
+    """
+    fields = []
+    for row in rows:
+        fields += [key for key in row if key not in fields]
+    with open(path, 'w', newline = '') as f:
+        writer = csv.DictWriter(f, fieldnames = fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def plot_error_vs_time(rows, path):
+    """
+    Plot the error against the wall time of every engine and case on log-log axes. Requires matplotlib
+
+    : return : Whether the plot was written (False if matplotlib is not installed)
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+
+    groups = {}
+    for row in rows:
+        label = row['engine'] + ' ' + row['case']
+        for key in ('integration_method', 'ant_variates', 'scheme', 'num_steps'):
+            if key in row:
+                label += ' ' + key + '=' + str(row[key])
+        groups.setdefault(label, []).append((row['time'], row['error']))
+
+    fig, ax = plt.subplots(figsize = (10, 7))
+    for label, points in groups.items():
+        points.sort()
+        ax.loglog([p[0] for p in points], [max(p[1], 1e-16) for p in points], marker = 'o', label = label)
+    ax.set_xlabel('Wall time (s)')
+    ax.set_ylabel('Error')
+    ax.legend(fontsize = 'x-small', ncol = 2)
+    fig.savefig(path, dpi = 120, bbox_inches = 'tight')
+    plt.close(fig)
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Time the pricing engines over parameter grids and measure their error against reference prices')
+    parser.add_argument('benchmarks', nargs = '*', help = 'Benchmarks to run: ' + ', '.join(BENCHMARKS) + ' (default: all)')
+    parser.add_argument('--quick', action = 'store_true', help = 'Use small parameter grids')
+    parser.add_argument('--output', default = 'results', help = 'Directory for results.json, results.csv and error_vs_time.png (default: results)')
+    parser.add_argument('--profile', action = 'store_true', help = 'Record per-stage timings of the pricers and write them to profile.json (timings include the profiling overhead)')
+    args = parser.parse_args()
+
+    if args.profile:
+        profiling.enable()
+    rows = run(args.benchmarks or None, quick = args.quick)
+    os.makedirs(args.output, exist_ok = True)
+    if args.profile:
+        profiler = profiling.disable()
+        print(profiler.table(limit = 30))
+        profiler.to_json(os.path.join(args.output, 'profile.json'))
+    write_json(rows, os.path.join(args.output, 'results.json'))
+    write_csv(rows, os.path.join(args.output, 'results.csv'))
+    if not plot_error_vs_time(rows, os.path.join(args.output, 'error_vs_time.png')):
+        print('matplotlib is not installed, error_vs_time.png was not written')
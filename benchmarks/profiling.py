@@ -0,0 +1,328 @@
+import sys
+import json
+import time
+import inspect
+import functools
+import threading
+import tracemalloc
+import numpy as np
+
+
+# Modules of the library that are instrumented by default, when they have been imported. Folders are
+# imported as flat modules, so option classes are found in whichever 'main' module is loaded
+DEFAULT_MODULES = ('GBM', 'heston', 'payOffs', 'qmc', 'controls', 'sensitivities', 'lsm', 'adaptive', 'parallel', 'store', 'main',
+                   'BinOP', 'BlackScholes', 'special', 'characteristic', 'fft', 'cos')
+
+FIELDS = ('calls', 'time', 'self_time', 'out_size', 'out_bytes', 'peak_bytes')
+
+_ACTIVE = None
+
+
+def _array_sizes(value):
+    """
+    Count the elements and bytes of the numpy arrays returned by a function, looking into tuples, lists and dictionaries
+
+    : param value : Returned value
+    : return      : number of elements, number of bytes
+    """
+    if isinstance(value, np.ndarray):
+        return value.size, value.nbytes
+    if isinstance(value, dict):
+        value = tuple(value.values())
+    if isinstance(value, (tuple, list)) and len(value) <= 16:
+        size, nbytes = 0, 0
+        for item in value:
+            s, b = _array_sizes(item)
+            size, nbytes = size + s, nbytes + b
+        return size, nbytes
+    return 0, 0
+
+
+class Profiler:
+    """
+    Record per-stage wall time, call counts, returned array sizes and (optionally) peak allocated memory of the pricing functions
+
+    While active, every function and method defined in the instrumented modules is replaced by a timing wrapper, and
+    functions held in module level dictionaries (e.g. heston.SCHEMES) are wrapped in place. Everything is restored on
+    exit, so a disabled profiler adds no overhead at all. Functions used as dictionary keys (e.g. payOffs.EuPayOff in
+    payOffs.STREAMING_PAYOFFS) keep their identity and are not instrumented.
+
+    Stages are named module.function. time includes the stages called from a stage, self_time does not. Time spent
+    inside generator functions (e.g. GBM.GBM_chunks) is added up over all resumptions. Work done in worker processes
+    (num_workers > 1) is only seen as the time of the parent call.
+
+    Use it as a context manager:
+
+        with Profiler() as prof:
+            GBM.eu_GBM(...)
+        print(prof.table())
+
+    or through the global switch enable()/disable().
+    """
+    def __init__(self, modules = None, trace_memory = False):
+        """
+        : param modules      : Modules (or names of modules) to instrument (default value: None, the DEFAULT_MODULES that have been imported)
+        : param trace_memory : Whether to record the peak memory allocated by each stage with tracemalloc. This slows down numpy allocations (default value: False)
+        """
+        self.modules      = modules
+        self.trace_memory = trace_memory
+        self.stats        = {}
+        self._lock        = threading.Lock()
+        self._local       = threading.local()
+        self._patches     = []
+        self._started_tracemalloc = False
+
+    # ---- Instrumentation ----
+
+    def _targets(self):
+        names = DEFAULT_MODULES if self.modules is None else self.modules
+        modules = []
+        for module in names:
+            if isinstance(module, str):
+                module = sys.modules.get(module)
+            if module is not None and module not in modules:
+                modules.append(module)
+        return modules
+
+    def _wrap(self, f):
+        name = f.__module__ + '.' + f.__qualname__
+        if inspect.isgeneratorfunction(f):
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                generator = f(*args, **kwargs)
+                self._record(name, 0, 0, 0, 0, calls = 1)
+                while True:
+                    frame = self._enter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        self._exit(name, frame, None, calls = 0)
+                        return
+                    self._exit(name, frame, item, calls = 0)
+                    yield item
+        else:
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                frame = self._enter()
+                try:
+                    result = f(*args, **kwargs)
+                except BaseException:
+                    self._exit(name, frame, None)
+                    raise
+                self._exit(name, frame, result)
+                return result
+        wrapper.__profiled__ = f
+        return wrapper
+
+    def _patch(self, owner, key, value):
+        if isinstance(owner, dict):
+            self._patches.append((owner, key, owner[key]))
+            owner[key] = value
+        else:
+            self._patches.append((owner, key, owner.__dict__[key]))
+            setattr(owner, key, value)
+
+    def _instrument(self):
+        modules = self._targets()
+        module_names = {module.__name__ for module in modules}
+
+        def instrumented(f):
+            return inspect.isfunction(f) and f.__module__ in module_names and not hasattr(f, '__profiled__')
+
+        # Functions that are dictionary keys must keep their identity, or lookups by them would fail
+        keys = {id(key) for module in modules for value in vars(module).values() if isinstance(value, dict) for key in value if inspect.isfunction(key)}
+        wrappers = {}
+        def wrap(f):
+            if id(f) not in wrappers:
+                wrappers[id(f)] = self._wrap(f)
+            return wrappers[id(f)]
+
+        for module in modules:
+            for attr, value in list(vars(module).items()):
+                if instrumented(value) and id(value) not in keys:
+                    self._patch(module, attr, wrap(value))
+                elif inspect.isclass(value) and value.__module__ == module.__name__:
+                    for method, f in list(vars(value).items()):
+                        if instrumented(f) and not method.startswith('__'):
+                            self._patch(value, method, wrap(f))
+                elif isinstance(value, dict):
+                    for key, item in list(value.items()):
+                        if instrumented(item):
+                            self._patch(value, key, wrap(item))
+                        elif isinstance(item, tuple) and any(instrumented(x) for x in item):
+                            self._patch(value, key, tuple(wrap(x) if instrumented(x) else x for x in item))
+
+    def _restore(self):
+        for owner, key, value in reversed(self._patches):
+            if isinstance(owner, dict):
+                owner[key] = value
+            else:
+                setattr(owner, key, value)
+        self._patches = []
+
+    # ---- Timing ----
+
+    def _enter(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = [time.perf_counter(), 0.0, 0, 0] # start, time of children, memory at start, peak memory seen
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][3] = max(stack[-1][3], peak)
+            tracemalloc.reset_peak()
+            frame[2] = frame[3] = current
+        stack.append(frame)
+        return frame
+
+    def _exit(self, name, frame, result, calls = 1):
+        elapsed = time.perf_counter() - frame[0]
+        stack = self._local.stack
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        peak_bytes = 0
+        if self.trace_memory:
+            peak = max(frame[3], tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - frame[2]
+            if stack:
+                stack[-1][3] = max(stack[-1][3], peak)
+        self._record(name, elapsed, elapsed - frame[1], *_array_sizes(result), peak_bytes = peak_bytes, calls = calls)
+
+    def _record(self, name, elapsed, self_time, out_size, out_bytes, peak_bytes = 0, calls = 1):
+        with self._lock:
+            s = self.stats.get(name)
+            if s is None:
+                s = self.stats[name] = dict.fromkeys(FIELDS, 0)
+            s['calls']      += calls
+            s['time']       += elapsed
+            s['self_time']  += self_time
+            s['out_size']   += out_size
+            s['out_bytes']  += out_bytes
+            s['peak_bytes']  = max(s['peak_bytes'], peak_bytes)
+
+    # ---- Switching on and off ----
+
+    def start(self):
+        """
+        Instrument the modules. Only one profiler can be active at a time
+        """
+        global _ACTIVE
+        if _ACTIVE is not None:
+            raise RuntimeError("A profiler is already active")
+        _ACTIVE = self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._instrument()
+        return self
+
+    def stop(self):
+        """
+        Restore the original functions
+        """
+        global _ACTIVE
+        self._restore()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if _ACTIVE is self:
+            _ACTIVE = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset(self):
+        """
+        Clear the recorded statistics
+        """
+        with self._lock:
+            self.stats = {}
+
+    # ---- Reports ----
+
+    def summary(self, sort = 'self_time'):
+        """
+        Recorded statistics as a list of rows
+
+        : param sort : Field to sort the stages by, in decreasing order, or 'name' (default value: 'self_time')
+        : return     : list of dictionaries with the stage name and the FIELDS
+        """
+        if sort != 'name' and sort not in FIELDS:
+            raise ValueError("Please choose an appropiate value for sort ('name' or one of " + str(FIELDS) + ")")
+        with self._lock:
+            rows = [dict(name = name, **s) for name, s in self.stats.items()]
+        if sort == 'name':
+            return sorted(rows, key = lambda row: row['name'])
+        return sorted(rows, key = lambda row: row[sort], reverse = True)
+
+    def table(self, sort = 'self_time', limit = None):
+        """
+        Recorded statistics as a text table
+
+        : param sort  : Field to sort the stages by (see summary) (default value: 'self_time')
+        : param limit : Maximum number of stages shown (default value: None, all)
+        : return      : string
+        """
+        rows = self.summary(sort)[:limit]
+        width = max([len(row['name']) for row in rows] + [5])
+        lines = ['{:<{w}} {:>9} {:>11} {:>11} {:>12} {:>11} {:>11}'.format('stage', 'calls', 'time (s)', 'self (s)', 'out size', 'out MiB', 'peak MiB', w = width)]
+        for row in rows:
+            lines.append('{:<{w}} {:>9d} {:>11.4f} {:>11.4f} {:>12d} {:>11.2f} {:>11.2f}'.format(row['name'], row['calls'], row['time'], row['self_time'],
+                                                                                                 row['out_size'], row['out_bytes']/2**20, row['peak_bytes']/2**20, w = width))
+        return '\n'.join(lines)
+
+    def to_json(self, path = None, sort = 'self_time'):
+        """
+        Recorded statistics as JSON
+
+        : param path : File to write to (default value: None, only return the string)
+        : param sort : Field to sort the stages by (see summary) (default value: 'self_time')
+        : return     : JSON string
+        """
+        text = json.dumps({'trace_memory': self.trace_memory, 'stages': self.summary(sort)}, indent = 1)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+
+def profile(modules = None, trace_memory = False):
+    """
+    Create a profiler, to be used as a context manager (see Profiler)
+
+    : param modules      : Modules (or names of modules) to instrument (default value: None, the DEFAULT_MODULES that have been imported)
+    : param trace_memory : Whether to record the peak memory allocated by each stage (default value: False)
+    : return             : Profiler
+    """
+    return Profiler(modules, trace_memory)
+
+def enable(modules = None, trace_memory = False):
+    """
+    Switch profiling on globally until disable() is called
+
+    : return : The active Profiler
+    """
+    return Profiler(modules, trace_memory).start()
+
+def disable():
+    """
+    Switch global profiling off
+
+    : return : The Profiler that was active, with its statistics (None if profiling was off)
+    """
+    profiler = _ACTIVE
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+def active():
+    """
+    The active Profiler, or None if profiling is off
+    """
+    return _ACTIVE
@@ -0,0 +1,419 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import collections
+import concurrent.futures
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for folder in ('BinOP', 'BlackScholes', 'MC', 'Fourier'):
+    sys.path.append(os.path.join(ROOT, folder))
+
+import BinOP
+import BlackScholes
+import GBM
+import heston
+import payOffs
+import cos
+
+
+# ---- Engines ----
+# Every engine prices a whole group of requests with one vectorized call. Requests are grouped by
+# engine and by the values of the engine's 'key' parameters (the model), the rest may differ.
+
+def _columns(requests, names):
+    """
+    Turn a list of request parameter dictionaries into numpy arrays, one per parameter
+    """
+    return [np.array([request[name] for request in requests]) for name in names]
+
+def _bs_batch(requests):
+    r, sigma, S_0, K, T, call_or_put, div = _columns(requests, ('r', 'sigma', 'S_0', 'K', 'T', 'call_or_put', 'div'))
+    if not np.all(np.isin(call_or_put, ('C', 'P'))):
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))")
+    calls = BlackScholes.BSprice(r, sigma, S_0, K, T, 'C', div = div)
+    # Put-call parity gives the puts from the calls
+    V = np.where(call_or_put == 'C', calls, calls - S_0*np.exp(-div*T) + K*np.exp(-r*T))
+    return [float(v) for v in V]
+
+def _binop_batch(requests):
+    columns = _columns(requests, ('r', 'sigma', 'S_0', 'K', 'T', 'call_or_put', 'optionType', 'M', 'gamma_par'))
+    result = BinOP.valueBinOpBatch(*columns)
+    return [{key: float(result[key][i]) for key in ('value', 'delta', 'gamma', 'theta')} for i in range(len(requests))]
+
+MC_PAYOFFS = {'E': payOffs.EuPayOff, 'A': payOffs.AsPayOff}
+
+def _spec(requests):
+    for request in requests:
+        if request['payOff'] not in MC_PAYOFFS:
+            raise ValueError("Please choose an appropiate value for payOff (European ('E') or Asian ('A'))")
+    return [(MC_PAYOFFS[request['payOff']], request['K'], request['call_or_put']) for request in requests]
+
+def _mc_results(V, std_error):
+    return [{'value': float(v), 'std_error': float(e)} for v, e in zip(V, std_error)]
+
+def _gbm_batch(requests):
+    p = requests[0]
+    V, std_error = GBM.multi_GBM(p['r'], p['sigma'], p['S_0'], p['num_steps'], p['T'], _spec(requests), num_simulations = p['num_simulations'],
+                                 integration_method = p['integration_method'], seed = p['seed'])
+    return _mc_results(V, std_error)
+
+def _heston_batch(requests):
+    p = requests[0]
+    V, std_error = heston.multi_heston(p['r'], p['sigma_0'], p['S_0'], p['kappa'], p['theta'], p['xi'], p['num_steps'], p['T'], _spec(requests),
+                                       corr_index = p['corr_index'], num_simulations = p['num_simulations'], seed = p['seed'], scheme = p['scheme'])
+    return _mc_results(V, std_error)
+
+def _heston_cos_batch(requests):
+    p = requests[0]
+    K, call_or_put = _columns(requests, ('K', 'call_or_put'))
+    V = cos.heston_cos(p['r'], p['sigma_0'], p['S_0'], K, p['kappa'], p['theta'], p['xi'], p['T'], call_or_put, p['corr_index'], N = p['N'])
+    return [float(v) for v in V]
+
+
+_OPTION = ('K', 'call_or_put')
+_HESTON = ('r', 'sigma_0', 'S_0', 'kappa', 'theta', 'xi', 'T', 'corr_index')
+
+# name -> batch function, required parameters, default parameters, key parameters and whether it is sent to the worker pool
+ENGINES = {
+    'BS'        : {'batch': _bs_batch, 'required': ('r', 'sigma', 'S_0', 'T') + _OPTION, 'defaults': {'div': 0}, 'key': (), 'cpu': False},
+    'BinOP'     : {'batch': _binop_batch, 'required': ('r', 'sigma', 'S_0', 'T') + _OPTION, 'defaults': {'optionType': 'A', 'M': 200, 'gamma_par': 1},
+                   'key': (), 'cpu': True},
+    'GBM'       : {'batch': _gbm_batch, 'required': ('r', 'sigma', 'S_0', 'T') + _OPTION,
+                   'defaults': {'payOff': 'E', 'num_steps': 50, 'num_simulations': 10**4, 'integration_method': 'exact', 'seed': None},
+                   'key': ('r', 'sigma', 'S_0', 'T', 'num_steps', 'num_simulations', 'integration_method', 'seed'), 'cpu': True},
+    'heston'    : {'batch': _heston_batch, 'required': _HESTON[:-1] + _OPTION,
+                   'defaults': {'corr_index': 0, 'payOff': 'E', 'num_steps': 50, 'num_simulations': 10**4, 'scheme': 'QE', 'seed': None},
+                   'key': _HESTON + ('num_steps', 'num_simulations', 'scheme', 'seed'), 'cpu': True},
+    'heston_cos': {'batch': _heston_cos_batch, 'required': _HESTON[:-1] + _OPTION, 'defaults': {'corr_index': 0, 'N': 256},
+                   'key': _HESTON + ('N',), 'cpu': False},
+}
+
+
+def _request(engine, params):
+    """
+    Check the parameters of a request and fill in the defaults
+
+    : return : complete parameters, grouping key
+    """
+    if engine not in ENGINES:
+        raise ValueError("Please choose an engine from " + str(tuple(ENGINES)))
+    spec = ENGINES[engine]
+    missing = [name for name in spec['required'] if name not in params]
+    if missing:
+        raise ValueError("Missing parameters for engine " + engine + ": " + ', '.join(missing))
+    unknown = [name for name in params if name not in spec['required'] and name not in spec['defaults']]
+    if unknown:
+        raise ValueError("Unknown parameters for engine " + engine + ": " + ', '.join(unknown))
+    params = dict(spec['defaults'], **params)
+
+    # Categorical parameters are checked here, so an invalid request fails on its own instead of failing its whole batch
+    if 'payOff' in params and params['payOff'] not in MC_PAYOFFS:
+        raise ValueError("Please choose an appropiate value for payOff (European ('E') or Asian ('A'))")
+    if params.get('payOff') == 'A':
+        if params['call_or_put'] not in ('PC', 'PP', 'SC', 'SP'):
+            raise ValueError("Please choose an appropiate value for call_or_put (Price call ('PC'), Price put ('PP'), Strike call ('SC') or Strike put ('SP'))")
+    elif params['call_or_put'] not in ('C', 'P'):
+        raise ValueError("Please choose an appropiate value for call_or_put (Call ('C') or Put ('P'))")
+    if 'optionType' in params and params['optionType'] not in ('E', 'A'):
+        raise ValueError("optionType has to be European ('E') or American ('A')")
+    return params, (engine,) + tuple(params[name] for name in spec['key'])
+
+
+def _percentiles(values):
+    if not values:
+        return {'count': 0}
+    values = np.array(values)
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {'count': len(values), 'mean': float(np.mean(values)), 'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(np.max(values))}
+
+
+class PricingServer:
+    """
+    Asyncio pricing service that micro-batches single option requests
+
+    Requests arriving within window seconds of the first pending one are collected, grouped by engine and
+    model, and each group is priced with one vectorized call (see ENGINES). Engines marked 'cpu' (the binomial
+    tree and Monte Carlo) run on a worker pool so they do not block the event loop, the others run inline.
+
+    Use it as an async context manager, from within a running event loop:
+
+        async with PricingServer() as server:
+            client = InProcessClient(server)
+            value = await client.price('BS', r = 0.05, sigma = 0.2, S_0 = 100, K = 100, T = 1, call_or_put = 'C')
+    """
+    def __init__(self, window = 0.002, max_batch = 4096, executor = None, num_workers = None, stats_window = 100000):
+        """
+        : param window       : Time in seconds requests are collected for before a batch is dispatched (default value: 0.002)
+        : param max_batch    : Maximum number of requests dispatched at once (default value: 4096)
+        : param executor     : concurrent.futures executor for the 'cpu' engines (default value: None, a process pool created on start)
+        : param num_workers  : Number of processes of the default pool (default value: None, the number of CPUs)
+        : param stats_window : Number of most recent latencies and batch sizes kept for the statistics (default value: 100000)
+        """
+        if window < 0:
+            raise ValueError("Please choose an appropiate value for window (non negative)")
+        if max_batch < 1:
+            raise ValueError("Please choose an appropiate value for max_batch (at least 1)")
+        self.window      = window
+        self.max_batch   = max_batch
+        self.num_workers = num_workers
+        self._executor   = executor
+        self._own_executor = executor is None
+        self._queue      = None
+        self._collector  = None
+        self._tasks      = set()
+        self._latency    = collections.defaultdict(lambda: collections.deque(maxlen = stats_window))
+        self._batch_size = collections.defaultdict(lambda: collections.deque(maxlen = stats_window))
+        self._counts     = collections.defaultdict(lambda: {'requests': 0, 'batches': 0, 'errors': 0})
+
+    async def start(self):
+        if self._collector is not None:
+            return self
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.num_workers)
+        self._queue = asyncio.Queue()
+        self._collector = asyncio.create_task(self._collect())
+        return self
+
+    async def stop(self):
+        """
+        Stop collecting requests once the pending ones have been priced, and shut down the default worker pool
+
+        New requests are refused from the start. A sentinel queued behind the pending requests ends the collector
+        once it has dispatched them, including the batch it may be holding during its window.
+        """
+        if self._collector is None:
+            return
+        collector, self._collector = self._collector, None
+        self._queue.put_nowait(None)
+        try:
+            await collector
+        except asyncio.CancelledError:
+            pass
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions = True)
+        if self._own_executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def submit(self, engine, **params):
+        """
+        Queue a pricing request
+
+        : param engine : Name of the engine, in ENGINES
+        : param params : Parameters of the option and model
+        : return       : asyncio Future with the result
+        """
+        if self._collector is None:
+            raise RuntimeError("The server is not running")
+        params, key = _request(engine, params)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((key, params, future, time.perf_counter()))
+        return future
+
+    async def price(self, engine, **params):
+        """
+        Price one option
+
+        : param engine : Name of the engine, in ENGINES
+        : param params : Parameters of the option and model
+        : return       : Value of the option (a dictionary for 'BinOP' and the Monte Carlo engines, see ENGINES)
+        """
+        return await self.submit(engine, **params)
+
+    async def _collect(self):
+        # batch holds the requests taken from the queue and not dispatched yet. A None in the queue (sent by stop) ends the loop
+        batch = []
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                if self.window > 0:
+                    await asyncio.sleep(self.window)
+                stopping = False
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                groups = {}
+                for item in batch:
+                    groups.setdefault(item[0], []).append(item)
+                batch = []
+                for key, items in groups.items():
+                    task = asyncio.create_task(self._dispatch(key[0], items))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                if stopping:
+                    return
+        except asyncio.CancelledError:
+            # Requests that will never be dispatched are failed, so their clients do not wait forever
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for item in batch:
+                if item is not None and not item[2].done():
+                    item[2].set_exception(RuntimeError("The server was stopped before pricing the request"))
+            raise
+
+    async def _dispatch(self, engine, items):
+        spec = ENGINES[engine]
+        requests = [item[1] for item in items]
+        try:
+            if spec['cpu']:
+                results = await asyncio.get_running_loop().run_in_executor(self._executor, spec['batch'], requests)
+            else:
+                results = spec['batch'](requests)
+        except Exception as error:
+            if len(items) > 1:
+                # Price the requests of a failed batch one by one, so only the ones that fail on their own get the error
+                await asyncio.gather(*(self._dispatch(engine, [item]) for item in items))
+                return
+            self._counts[engine]['errors'] += 1
+            if not items[0][2].done():
+                items[0][2].set_exception(error)
+            return
+
+        now = time.perf_counter()
+        self._counts[engine]['requests'] += len(items)
+        self._counts[engine]['batches']  += 1
+        self._batch_size[engine].append(len(items))
+        for item, result in zip(items, results):
+            self._latency[engine].append(now - item[3])
+            if not item[2].done():
+                item[2].set_result(result)
+
+    def stats(self):
+        """
+        Latency and batch size statistics, overall and per engine
+
+        : return : Dictionary with 'requests', 'batches', 'errors', 'latency' (seconds: count, mean, p50, p90, p99 and max),
+                   'batch_size' (same fields) and 'engines', with the same statistics for each engine
+        """
+        engines = {}
+        for engine in self._counts:
+            engines[engine] = dict(self._counts[engine], latency = _percentiles(self._latency[engine]), batch_size = _percentiles(self._batch_size[engine]))
+        return {
+            'requests'  : sum(c['requests'] for c in self._counts.values()),
+            'batches'   : sum(c['batches'] for c in self._counts.values()),
+            'errors'    : sum(c['errors'] for c in self._counts.values()),
+            'latency'   : _percentiles([x for d in self._latency.values() for x in d]),
+            'batch_size': _percentiles([x for d in self._batch_size.values() for x in d]),
+            'engines'   : engines,
+        }
+
+    def reset_stats(self):
+        self._latency.clear()
+        self._batch_size.clear()
+        self._counts.clear()
+
+
+class InProcessClient:
+    """
+    Client calling a PricingServer running in the same event loop
+    """
+    def __init__(self, server):
+        self.server = server
+
+    async def price(self, engine, **params):
+        """
+        Price one option (see PricingServer.price)
+        """
+        return await self.server.price(engine, **params)
+
+    async def price_many(self, requests, return_exceptions = False):
+        """
+        Send many requests concurrently, so they can be batched together
+
+        : param requests          : Iterable of (engine, params dictionary) pairs
+        : param return_exceptions : Whether failed requests return their exception instead of raising it (default value: False)
+        : return                  : list of results, in the order of the requests
+        """
+        futures = []
+        for engine, params in requests:
+            try:
+                futures.append(self.server.submit(engine, **params))
+            except ValueError as error:
+                if not return_exceptions:
+                    raise
+                future = asyncio.get_running_loop().create_future()
+                future.set_exception(error)
+                futures.append(future)
+        return await asyncio.gather(*futures, return_exceptions = return_exceptions)
+
+
+# ---- JSON lines over TCP ----
+
+async def _handle(server, reader, writer):
+    async def reply(line):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return {'error': 'Invalid JSON'}
+        if not isinstance(message, dict):
+            return {'error': 'Requests have to be JSON objects'}
+        if message.get('engine') == 'stats':
+            return {'id': message.get('id'), 'result': server.stats()}
+        try:
+            return {'id': message.get('id'), 'result': await server.price(message.get('engine'), **message.get('params', {}))}
+        except Exception as error:
+            return {'id': message.get('id'), 'error': str(error)}
+
+    async def answer(line):
+        response = await reply(line)
+        writer.write((json.dumps(response) + '\n').encode())
+
+    pending = set()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        # Requests of a connection are answered as they finish, so they can be batched with each other
+        task = asyncio.create_task(answer(line))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    await writer.drain()
+    writer.close()
+
+async def serve(host = '127.0.0.1', port = 8765, **kwargs):
+    """
+    Run a PricingServer behind a TCP socket speaking JSON lines, until cancelled
+
+    Each request is a line {"id": ..., "engine": ..., "params": {...}}, answered (possibly out of order) by {"id": ..., "result": ...}
+    or {"id": ..., "error": ...}. The engine "stats" returns PricingServer.stats()
+
+    : param host   : Host to listen on (default value: '127.0.0.1')
+    : param port   : Port to listen on (default value: 8765)
+    : param kwargs : Arguments of PricingServer
+    """
+    async with PricingServer(**kwargs) as server:
+        tcp_server = await asyncio.start_server(lambda reader, writer: _handle(server, reader, writer), host, port)
+        async with tcp_server:
+            await tcp_server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run the micro-batching pricing server, speaking JSON lines over TCP')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8765)
+    parser.add_argument('--window', type = float, default = 0.002, help = 'Batching window in seconds (default: 0.002)')
+    parser.add_argument('--num_workers', type = int, default = None, help = 'Number of worker processes (default: number of CPUs)')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, window = args.window, num_workers = args.num_workers))
+    except KeyboardInterrupt:
+        pass